@@ -1,23 +1,86 @@
 import os
-import httpx
 from fastapi import HTTPException
 from dotenv import load_dotenv
 import logging
 import json
+import asyncio
+import calendar
+import math
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from core import deadline
+from core.resilience import CircuitOpenError, UpstreamProvider, get_rate_limiter
+from core.single_flight import SingleFlight
+from core.token_manager import TokenError, get_token_manager
+from core.tracing import set_attribute, traced
+from core.ttl_cache import TTLCache
+from geo.airports import get_airport_index
+from agents.flight_agent.offers import MAX_PAGE_SIZE, compact_result, offers_for, sort_offers
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
 AMADEUS_API_KEY = os.getenv("AMADEUS_API_KEY")
 AMADEUS_API_SECRET = os.getenv("AMADEUS_API_SECRET")
+# Point at a local stand-in (backend/loadtest/mock_amadeus.py) for offline load tests
+AMADEUS_BASE_URL = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com").rstrip("/")
+
+# Offers requested per search; enough for several pages of sorted, filtered results
+FLIGHT_SEARCH_MAX = int(os.getenv("FLIGHT_SEARCH_MAX", str(MAX_PAGE_SIZE)))
+
+# Shared across agent instances so identical concurrent searches hit Amadeus once
+flight_search_coalescer = SingleFlight("flight_search")
+
+# Offers are served fresh for FLIGHT_CACHE_TTL seconds, then served stale for up to
+# FLIGHT_CACHE_STALE_TTL more while refreshed in the background. FLIGHT_CACHE_PATH
+# (a SQLite file) keeps them across restarts.
+flight_offer_cache = TTLCache(
+    "flight_offers",
+    ttl=float(os.getenv("FLIGHT_CACHE_TTL", "300")),
+    stale_ttl=float(os.getenv("FLIGHT_CACHE_STALE_TTL", "1800")),
+    max_entries=int(os.getenv("FLIGHT_CACHE_MAX_ENTRIES", "1000")),
+    persist_path=os.getenv("FLIGHT_CACHE_PATH") or None,
+)
+
+# Amadeus' quota is per API key, so flights and hotels share one limiter; each
+# gets its own bulkhead so a slow hotel API can't starve flight searches
+flight_upstream = UpstreamProvider(
+    "amadeus_flights",
+    rate_limiter=get_rate_limiter("amadeus", rate=float(os.getenv("AMADEUS_RATE_LIMIT", "10")),
+                                  burst=int(os.getenv("AMADEUS_RATE_BURST", "1"))),
+    max_concurrency=int(os.getenv("FLIGHT_MAX_CONCURRENCY", "8")),
+)
+
+# Price-calendar searches fan out to at most this many concurrent upstream calls
+CALENDAR_CONCURRENCY = int(os.getenv("FLIGHT_CALENDAR_CONCURRENCY", "5"))
+MAX_CALENDAR_DAYS = 31
+
+
+def calendar_dates(center_date: Optional[str] = None, window_days: int = 3, month: Optional[str] = None) -> List[str]:
+    """
+    Dates for a price calendar: every day of month ("YYYY-MM"), or center_date
+    plus/minus window_days. Past dates are dropped.
+    """
+    if month:
+        first = datetime.strptime(month, "%Y-%m").date()
+        days = [first.replace(day=d) for d in range(1, calendar.monthrange(first.year, first.month)[1] + 1)]
+    else:
+        center = datetime.strptime(center_date, "%Y-%m-%d").date()
+        window_days = max(0, min(window_days, MAX_CALENDAR_DAYS // 2))
+        days = [center + timedelta(days=offset) for offset in range(-window_days, window_days + 1)]
+    today = date.today()
+    return [d.isoformat() for d in days if d >= today]
+
 
 class FlightAgent:
     def __init__(self):
-        self.token_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-        self.search_url = "https://test.api.amadeus.com/v2/shopping/flight-offers"
+        self.token_url = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
+        self.search_url = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
         self.api_key = AMADEUS_API_KEY
         self.api_secret = AMADEUS_API_SECRET
-        self.access_token = None
+        # Shared by all agents; tokens are fetched lazily, never in the constructor
+        self.tokens = get_token_manager("amadeus", self.token_url, self.api_key, self.api_secret)
         
         # Safe logging of API key (check if it exists first)
         if self.api_key:
@@ -26,51 +89,71 @@ class FlightAgent:
             logging.warning("FlightAgent initialized with missing API key!")
 
     async def authenticate(self):
+        """Get an access token from the shared token manager, fetching one only if needed"""
         if not self.api_key or not self.api_secret:
             error_msg = "Missing Amadeus API credentials. Check your .env file."
             logging.error(error_msg)
             return {"error": error_msg}
-            
-        data = (
-            f"grant_type=client_credentials&client_id={self.api_key}&client_secret={self.api_secret}"
-        )
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
         try:
-            logging.info(f"Authenticating with Amadeus API")
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.post(self.token_url, data=data, headers=headers)
-                logging.info(f"Amadeus auth response: {response.status_code}")
-                
-                if response.status_code == 200:
-                    token_data = response.json()
-                    self.access_token = token_data["access_token"]
-                    logging.info(f"Authentication successful, token received")
-                    return token_data
-                else:
-                    error_msg = f"Amadeus authentication failed: {response.text}"
-                    logging.error(error_msg)
-                    return {"error": error_msg}
-        except Exception as e:
-            error_msg = f"Amadeus authentication error: {str(e)}"
+            return {"access_token": await self.tokens.get_token()}
+        except TokenError as e:
+            error_msg = str(e)
             logging.error(error_msg)
             return {"error": error_msg}
 
+    def _validate_search(self, origin, destination, departure_date, adults, children, infants):
+        """
+        Resolve origin/destination to IATA codes and check the request against
+        Amadeus' constraints locally. Returns (origin_code, destination_code, error).
+        """
+        airport_index = get_airport_index()
+        origin_code = airport_index.resolve_code(origin) if origin else None
+        if not origin_code:
+            return None, None, f"Unknown origin location: {origin}"
+        destination_code = airport_index.resolve_code(destination) if destination else None
+        if not destination_code:
+            return None, None, f"Unknown destination location: {destination}"
+        if origin_code == destination_code:
+            return None, None, f"Origin and destination resolve to the same location: {origin_code}"
+        
+        try:
+            departure = datetime.strptime(str(departure_date), "%Y-%m-%d").date()
+        except ValueError:
+            return None, None, f"Invalid departure date (expected YYYY-MM-DD): {departure_date}"
+        if departure < date.today():
+            return None, None, f"Departure date is in the past: {departure_date}"
+        
+        # Amadeus allows at most 9 seated travellers and one infant per adult
+        if adults < 1 or children < 0 or infants < 0:
+            return None, None, "At least one adult is required and passenger counts cannot be negative"
+        if adults + children > 9:
+            return None, None, "A maximum of 9 seated passengers is allowed per search"
+        if infants > adults:
+            return None, None, "Each infant must be accompanied by an adult"
+        
+        return origin_code, destination_code, None
+
+    @traced("flight.search")
     async def search_flights(self, origin, destination, departure_date, return_date=None, adults=1, children=0, infants=0):
         try:
-            if not self.access_token:
-                logging.info("No access token found, authenticating first")
-                auth_result = await self.authenticate()
-                if "error" in auth_result:
-                    return {"data": [], "error": auth_result["error"]}
-                
+            # Reject unresolvable or invalid searches before any upstream call
+            origin_code, destination_code, validation_error = self._validate_search(
+                origin, destination, departure_date, adults, children, infants
+            )
+            if validation_error:
+                logging.info(f"Rejected flight search locally: {validation_error}")
+                return {"offers": [], "error": validation_error}
+            if (origin_code, destination_code) != (origin, destination):
+                logging.info(f"Resolved {origin} -> {origin_code}, {destination} -> {destination_code}")
+            origin, destination = origin_code, destination_code
+            
             logging.info(f"Searching flights from {origin} to {destination} on {departure_date}")
-            headers = {"Authorization": f"Bearer {self.access_token}"}
             params = {
                 "originLocationCode": origin,
                 "destinationLocationCode": destination,
                 "departureDate": departure_date,
                 "adults": adults,
-                "max": 10,  # Limit results for faster response
+                "max": FLIGHT_SEARCH_MAX,
                 "currencyCode": "INR"  # Return prices in Indian Rupees
             }
             
@@ -83,40 +166,123 @@ class FlightAgent:
             if infants > 0:
                 params["infants"] = infants
             
-            async with httpx.AsyncClient(timeout=30) as client:
-                logging.info(f"Making request to {self.search_url} with params: {params}")
-                response = await client.get(self.search_url, headers=headers, params=params)
-                logging.info(f"Amadeus flight search response: {response.status_code}")
+            # Recent identical searches are answered from cache; identical searches
+            # already in flight (including background refreshes) share one upstream call.
+            # Only the compact offers are cached, never the raw Amadeus response.
+            key = json.dumps(params, sort_keys=True, default=str)
+
+            async def fetch():
+                return compact_result(await self._fetch_flight_offers(params))
+
+            return await flight_offer_cache.get_or_fetch(
+                key,
+                lambda: flight_search_coalescer.do(key, fetch),
+                cacheable=lambda result: "error" not in result,
+            )
+        except Exception as e:
+            error_msg = f"Flight search exception: {str(e)}"
+            logging.error(error_msg)
+            return {"offers": [], "error": error_msg}
+
+    @traced("flight.price_calendar")
+    async def search_price_calendar(self, origin, destination, dates: List[str], adults=1, children=0, infants=0):
+        """
+        Cheapest offer per day for one route across several dates, searched
+        concurrently (cached days cost nothing). Returned as parallel columns
+        so the calendar stays compact; days without offers have a null price.
+        """
+        if not dates:
+            return {"error": "No future dates to search"}
+        origin_code, destination_code, validation_error = self._validate_search(
+            origin, destination, dates[0], adults, children, infants
+        )
+        if validation_error:
+            return {"error": validation_error}
+
+        semaphore = asyncio.Semaphore(CALENDAR_CONCURRENCY)
+
+        async def search_day(day):
+            async with semaphore:
+                return await self.search_flights(origin_code, destination_code, day, None, adults, children, infants)
+
+        results = await asyncio.gather(*[search_day(day) for day in dates])
+        prices, carriers, stops, errors = [], [], [], {}
+        for day, result in zip(dates, results):
+            priced = [offer for offer in offers_for(result) if offer.price != math.inf]
+            cheapest = sort_offers(priced, "cheapest")[0] if priced else None
+            if result.get("error"):
+                errors[day] = result["error"]
+            prices.append(cheapest.price if cheapest else None)
+            carriers.append(cheapest.carrier if cheapest else None)
+            stops.append(cheapest.stops if cheapest else None)
+
+        priced = [(price, day) for price, day in zip(prices, dates) if price is not None]
+        set_attribute("days", len(dates))
+        return {
+            "origin": origin_code,
+            "destination": destination_code,
+            "currency": "INR",
+            "dates": dates,
+            "prices": prices,
+            "carriers": carriers,
+            "stops": stops,
+            "cheapest_date": min(priced)[1] if priced else None,
+            "errors": errors,
+        }
+
+    @traced("amadeus.flight_offers", upstream="amadeus")
+    async def _fetch_flight_offers(self, params):
+        """Call the Amadeus flight-offers API, authenticating first if needed"""
+        try:
+            auth_result = await self.authenticate()
+            if "error" in auth_result:
+                return {"data": [], "error": auth_result["error"]}
+                
+            headers = {"Authorization": f"Bearer {auth_result['access_token']}"}
+            
+            logging.info(f"Making request to {self.search_url} with params: {params}")
+            response = await flight_upstream.request("GET", self.search_url, headers=headers, params=params,
+                                                     timeout=30)
+            set_attribute("status_code", response.status_code)
+            logging.info(f"Amadeus flight search response: {response.status_code}")
                 
+            if response.status_code == 200:
+                result = response.json()
+                flight_count = len(result.get("data", []))
+                set_attribute("offers", flight_count)
+                logging.info(f"Found {flight_count} flights")
+                return result
+            elif response.status_code == 401:
+                # Token expired, try to re-authenticate
+                logging.info("Token expired, re-authenticating")
+                self.tokens.invalidate(auth_result["access_token"])
+                auth_result = await self.authenticate()
+                if "error" in auth_result:
+                    return {"data": [], "error": auth_result["error"]}
+                        
+                # Retry the request with new token, if the request still has time
+                deadline.check()
+                headers = {"Authorization": f"Bearer {auth_result['access_token']}"}
+                response = await flight_upstream.request("GET", self.search_url, headers=headers, params=params,
+                                                         timeout=30)
+                set_attribute("status_code", response.status_code)
+                    
                 if response.status_code == 200:
                     result = response.json()
                     flight_count = len(result.get("data", []))
-                    logging.info(f"Found {flight_count} flights")
+                    logging.info(f"Found {flight_count} flights after re-authentication")
                     return result
-                elif response.status_code == 401:
-                    # Token expired, try to re-authenticate
-                    logging.info("Token expired, re-authenticating")
-                    auth_result = await self.authenticate()
-                    if "error" in auth_result:
-                        return {"data": [], "error": auth_result["error"]}
-                        
-                    # Retry the request with new token
-                    headers = {"Authorization": f"Bearer {self.access_token}"}
-                    response = await client.get(self.search_url, headers=headers, params=params)
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        flight_count = len(result.get("data", []))
-                        logging.info(f"Found {flight_count} flights after re-authentication")
-                        return result
-                    else:
-                        error_msg = f"Flight search failed after re-auth: {response.text}"
-                        logging.error(error_msg)
-                        return {"data": [], "error": error_msg}
                 else:
-                    error_msg = f"Flight search failed: {response.text}"
+                    error_msg = f"Flight search failed after re-auth: {response.text}"
                     logging.error(error_msg)
                     return {"data": [], "error": error_msg}
+            else:
+                error_msg = f"Flight search failed: {response.text}"
+                logging.error(error_msg)
+                return {"data": [], "error": error_msg}
+        except CircuitOpenError as e:
+            logging.warning(f"Flight search skipped: {e}")
+            return {"data": [], "error": str(e)}
         except Exception as e:
             error_msg = f"Flight search exception: {str(e)}"
             logging.error(error_msg)
@@ -0,0 +1,188 @@
+"""
+Compact flight-offer model with server-side sort, filter and pagination.
+
+Amadeus offers are deeply nested; each is parsed once, when the search
+returns, into a flat FlightOffer tuple holding only what callers display or
+rank by. Only that compact form ({"offers": [...]}) is cached and served;
+the raw Amadeus response is dropped.
+"""
+import math
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from core import pagination
+
+SORT_KEYS = ("cheapest", "fastest", "earliest")
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+_DURATION_RE = re.compile(r"^P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?")
+_TIME_RE = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+
+
+class FlightOffer(NamedTuple):
+    index: int  # upstream order, the tie-breaker that keeps pages stable
+    carrier: str
+    flight_number: str
+    origin: str
+    destination: str
+    departure: str  # local ISO datetime, e.g. 2025-01-15T08:30:00
+    arrival: str
+    duration: str  # ISO 8601, e.g. PT2H30M
+    duration_minutes: int
+    stops: int
+    price: float
+    total: str  # price as returned by Amadeus, for display
+    currency: str
+    aircraft: str
+
+    @property
+    def departure_time(self) -> str:
+        return _clock(self.departure)
+
+    @property
+    def arrival_time(self) -> str:
+        return _clock(self.arrival)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self._asdict()
+        del data["index"]
+        return data
+
+
+def _clock(timestamp: str) -> str:
+    """HH:MM from an ISO datetime, or the input unchanged if it has no time part"""
+    return timestamp.split("T")[1][:5] if "T" in timestamp else timestamp
+
+
+def parse_duration(duration: str) -> int:
+    """Minutes in an ISO 8601 duration such as PT2H30M or P1DT2H"""
+    match = _DURATION_RE.match(duration or "")
+    if not match or not any(match.groups()):
+        return 0
+    days, hours, minutes = (int(g) if g else 0 for g in match.groups())
+    return days * 1440 + hours * 60 + minutes
+
+
+def parse_offer(index: int, offer: Dict[str, Any]) -> FlightOffer:
+    price = offer.get("price", {})
+    itinerary = (offer.get("itineraries") or [{}])[0]
+    segments = itinerary.get("segments") or [{}]
+    first, last = segments[0], segments[-1]
+    departure = first.get("departure", {})
+    arrival = last.get("arrival", {})
+    total = price.get("total", "N/A")
+    try:
+        amount = float(price.get("grandTotal") or total)
+    except (TypeError, ValueError):
+        amount = math.inf  # Unpriced offers sort last
+    duration = itinerary.get("duration", "N/A")
+    return FlightOffer(
+        index=index,
+        carrier=first.get("carrierCode", "N/A"),
+        flight_number=first.get("number", "N/A"),
+        origin=departure.get("iataCode", "N/A"),
+        destination=arrival.get("iataCode", "N/A"),
+        departure=departure.get("at", "N/A"),
+        arrival=arrival.get("at", "N/A"),
+        duration=duration,
+        duration_minutes=parse_duration(duration),
+        stops=max(len(segments) - 1, 0),
+        price=amount,
+        total=str(total),
+        currency=price.get("currency", "USD"),
+        aircraft=first.get("aircraft", {}).get("code", "N/A"),
+    )
+
+
+def compact_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """A raw Amadeus search result reduced to its parsed offers (and error, if any)"""
+    compact: Dict[str, Any] = {"offers": [parse_offer(i, offer) for i, offer in enumerate(result.get("data") or [])]}
+    if "error" in result:
+        compact["error"] = result["error"]
+    return compact
+
+
+def offers_for(result: Optional[Dict[str, Any]]) -> List[FlightOffer]:
+    """Offers of a compact search result, or of a raw Amadeus one"""
+    if not result:
+        return []
+    if "offers" not in result:
+        return compact_result(result)["offers"]
+    offers = result["offers"]
+    if offers and not isinstance(offers[0], FlightOffer):
+        # Read back from the persistent cache tier as plain JSON lists
+        offers = result["offers"] = [FlightOffer(*row) for row in offers]
+    return offers
+
+
+def serialize_result(result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """A compact search result with its offers as JSON objects, for responses"""
+    if not result or "offers" not in result:
+        return result
+    return {**result, "offers": [offer.to_dict() for offer in offers_for(result)]}
+
+
+def _in_window(clock: str, after: Optional[str], before: Optional[str]) -> bool:
+    return (not after or clock >= after) and (not before or clock <= before)
+
+
+def filter_offers(offers: Sequence[FlightOffer], max_stops: Optional[int] = None,
+                  carriers: Optional[Sequence[str]] = None,
+                  depart_after: Optional[str] = None, depart_before: Optional[str] = None,
+                  arrive_after: Optional[str] = None, arrive_before: Optional[str] = None) -> List[FlightOffer]:
+    """Keep offers within max_stops, operated by carriers, and inside HH:MM time windows"""
+    for value in (depart_after, depart_before, arrive_after, arrive_before):
+        if value and not _TIME_RE.match(value):
+            raise ValueError(f"Time windows must be HH:MM: {value}")
+    if isinstance(carriers, str):
+        carriers = carriers.split(",")
+    carrier_set = {c.strip().upper() for c in carriers} if carriers else None
+    return [
+        offer for offer in offers
+        if (max_stops is None or offer.stops <= max_stops)
+        and (carrier_set is None or offer.carrier in carrier_set)
+        and _in_window(offer.departure_time, depart_after, depart_before)
+        and _in_window(offer.arrival_time, arrive_after, arrive_before)
+    ]
+
+
+def sort_offers(offers: Sequence[FlightOffer], sort: str = "cheapest") -> List[FlightOffer]:
+    """Order offers; ties fall back to the upstream order so pages stay stable"""
+    if sort == "cheapest":
+        key = lambda o: (o.price, o.duration_minutes, o.index)
+    elif sort == "fastest":
+        key = lambda o: (o.duration_minutes, o.price, o.index)
+    elif sort == "earliest":
+        key = lambda o: (o.departure, o.price, o.index)
+    else:
+        raise ValueError(f"Unknown sort '{sort}', expected one of {', '.join(SORT_KEYS)}")
+    return sorted(offers, key=key)
+
+
+def encode_cursor(offset: int) -> str:
+    return pagination.encode_cursor({"offset": offset})
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    state = pagination.decode_cursor(cursor)
+    if state is None:
+        return 0
+    offset = state.get("offset")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def query_offers(result: Optional[Dict[str, Any]], sort: str = "cheapest", cursor: Optional[str] = None,
+                 limit: int = DEFAULT_PAGE_SIZE, **filters) -> Tuple[List[FlightOffer], Optional[str], int]:
+    """
+    Filter, sort and paginate the offers of a search result. Returns the page,
+    the cursor for the next page (None on the last page) and the match count.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    offset = decode_cursor(cursor)
+    matched = sort_offers(filter_offers(offers_for(result), **filters), sort)
+    page = matched[offset:offset + limit]
+    next_offset = offset + limit
+    return page, encode_cursor(next_offset) if next_offset < len(matched) else None, len(matched)
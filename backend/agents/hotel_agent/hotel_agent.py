@@ -1,82 +1,213 @@
 import os
+import asyncio
+import math
 import httpx
 from fastapi import HTTPException
 from dotenv import load_dotenv
 import logging
+from typing import Optional
+
+from core import deadline
+from core.resilience import CircuitOpenError, UpstreamProvider, get_rate_limiter
+from core.single_flight import SingleFlight
+from core.token_manager import TokenError, get_token_manager
+from core.tracing import set_attribute, traced
+from core.ttl_cache import TTLCache
+from geo.geocell import center, circumradius_km, covering
+from agents.hotel_agent.reference import GEOCELL_PRECISION, hotel_reference_cache, hotels_in_cell, query_hotels
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
 AMADEUS_API_KEY = os.getenv("AMADEUS_API_KEY")
 AMADEUS_API_SECRET = os.getenv("AMADEUS_API_SECRET")
+# Point at a local stand-in (backend/loadtest/mock_amadeus.py) for offline load tests
+AMADEUS_BASE_URL = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com").rstrip("/")
+
+# Shared across agent instances so concurrent fetches of the same geocell hit Amadeus once
+hotel_search_coalescer = SingleFlight("hotel_search")
+
+# Shares the per-key Amadeus quota with flights, but has its own concurrency pool
+hotel_upstream = UpstreamProvider(
+    "amadeus_hotels",
+    rate_limiter=get_rate_limiter("amadeus", rate=float(os.getenv("AMADEUS_RATE_LIMIT", "10")),
+                                  burst=int(os.getenv("AMADEUS_RATE_BURST", "1"))),
+    max_concurrency=int(os.getenv("HOTEL_MAX_CONCURRENCY", "4")),
+)
+
+# Offer enrichment: hotelIds are priced in batches, one parallel wave per search
+HOTEL_OFFERS_URL = f"{AMADEUS_BASE_URL}/v3/shopping/hotel-offers"
+HOTEL_OFFERS_BATCH_SIZE = int(os.getenv("HOTEL_OFFERS_BATCH_SIZE", "20"))  # hotelIds per offers call
+HOTEL_OFFERS_MAX_HOTELS = int(os.getenv("HOTEL_OFFERS_MAX_HOTELS", "100"))  # nearest hotels priced per search
+
+# Priced per (hotelId, dates, occupancy), so overlapping searches only fetch hotels not yet priced
+hotel_offer_cache = TTLCache(
+    "hotel_offers",
+    ttl=float(os.getenv("HOTEL_OFFERS_CACHE_TTL", "600")),
+    max_entries=int(os.getenv("HOTEL_OFFERS_CACHE_MAX_ENTRIES", "5000")),
+    persist_path=os.getenv("HOTEL_OFFERS_CACHE_PATH") or None,
+)
+
+hotel_offers_upstream = UpstreamProvider(
+    "amadeus_hotel_offers",
+    rate_limiter=get_rate_limiter("amadeus", rate=float(os.getenv("AMADEUS_RATE_LIMIT", "10")),
+                                  burst=int(os.getenv("AMADEUS_RATE_BURST", "1"))),
+    max_concurrency=int(os.getenv("HOTEL_OFFERS_MAX_CONCURRENCY", "5")),
+)
+
+
+def _offer_key(hotel_id: str, checkin: str, checkout: str, adults: int, rooms: int) -> str:
+    return f"{hotel_id}|{checkin}|{checkout}|{adults}|{rooms}"
+
 
 class HotelAgent:
     def __init__(self):
         self.api_key = AMADEUS_API_KEY
         self.api_secret = AMADEUS_API_SECRET
-        self.base_url = "https://test.api.amadeus.com/v1"
-        self.access_token = None
+        self.base_url = f"{AMADEUS_BASE_URL}/v1"
+        # Shared with FlightAgent; the token is fetched on first search, never in the constructor
+        self.tokens = get_token_manager("amadeus", f"{self.base_url}/security/oauth2/token",
+                                        self.api_key, self.api_secret)
 
         if not self.api_key or not self.api_secret:
             logging.warning("HotelAgent initialized with missing Amadeus API key!")
-        else:
-            self._get_access_token()
 
-    def _get_access_token(self):
-        """Get OAuth2 access token from Amadeus"""
+    @traced("hotel.search")
+    async def search_hotels(self, latitude: float, longitude: float, checkin: str, checkout: str, adults: int = 2,
+                            radius: int = 50, with_offers: bool = False, rooms: int = 1, limit: Optional[int] = None):
+        """
+        Hotels within radius km, nearest first (at most limit), optionally
+        priced with their offers. Answered from geocell-cached reference data;
+        only cells not cached yet are fetched from the Amadeus Hotel List API,
+        and only then is an access token needed.
+        """
+        latitude, longitude = float(latitude), float(longitude)
+        cells = covering(latitude, longitude, radius, GEOCELL_PRECISION)
+        set_attribute("cells", len(cells))
+        cell_hotels = await asyncio.gather(*(self._cell_hotels(cell) for cell in cells))
+        hotels = query_hotels(cell_hotels, latitude, longitude, radius, limit)
+        hotels_data = {"data": hotels, "meta": {"count": len(hotels)}}
+        set_attribute("hotels", len(hotels))
+        if not with_offers:
+            return hotels_data
+        return await self.enrich_with_offers(hotels_data, checkin, checkout, adults, rooms)
+
+    async def _access_token(self) -> str:
+        """A valid Amadeus token, fetched only once an upstream call is actually needed"""
         try:
-            url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-            headers = {"Content-Type": "application/x-www-form-urlencoded"}
-            data = {
-                "grant_type": "client_credentials",
-                "client_id": self.api_key,
-                "client_secret": self.api_secret
-            }
-            
-            with httpx.Client() as client:
-                response = client.post(url, headers=headers, data=data)
-                response.raise_for_status()
-                token_data = response.json()
-                self.access_token = token_data.get("access_token")
-                logging.info("Successfully obtained Amadeus access token")
-        except Exception as e:
+            return await self.tokens.get_token()
+        except TokenError as e:
             logging.error(f"Failed to get Amadeus access token: {e}")
-            self.access_token = None
+            raise HTTPException(status_code=500, detail="Failed to authenticate with Amadeus API")
+
+    async def _cell_hotels(self, cell: str):
+        """Reference hotels inside one geocell, cached long-term"""
+        # Cells being fetched already are shared by every search that needs them
+        return await hotel_reference_cache.get_or_fetch(
+            cell, lambda: hotel_search_coalescer.do(cell, lambda: self._fetch_cell(cell))
+        )
+
+    async def _fetch_cell(self, cell: str):
+        cell_latitude, cell_longitude = center(cell)
+        params = {
+            "latitude": round(cell_latitude, 4),
+            "longitude": round(cell_longitude, 4),
+            "radius": math.ceil(circumradius_km(cell)),
+            "radiusUnit": "KM",
+            "hotelSource": "ALL"
+        }
+        hotels_data = await self._fetch_hotels_by_geocode(params, await self._access_token())
+        return hotels_in_cell(cell, hotels_data.get("data") or [])
+
+    @traced("hotel.enrich_offers")
+    async def enrich_with_offers(self, hotels_data, checkin: str, checkout: str, adults: int, rooms: int,
+                                 access_token: Optional[str] = None):
+        """
+        Attach "available" and "offers" to the nearest hotels. Uncached hotelIds
+        are priced in batches fetched concurrently; a failed batch leaves its
+        hotels unpriced rather than failing the search. A token is fetched only
+        when some hotels are not priced yet.
+        """
+        hotels = hotels_data.get("data") or []
+        hotel_ids = list(dict.fromkeys(h["hotelId"] for h in hotels[:HOTEL_OFFERS_MAX_HOTELS] if h.get("hotelId")))
+        keys = {hotel_id: _offer_key(hotel_id, checkin, checkout, adults, rooms) for hotel_id in hotel_ids}
+
+        cached = await hotel_offer_cache.get_many(list(keys.values()))
+        priced = {hotel_id: cached[key] for hotel_id, key in keys.items() if key in cached}
+        missing = [hotel_id for hotel_id in hotel_ids if hotel_id not in priced]
+        batches = [missing[i:i + HOTEL_OFFERS_BATCH_SIZE] for i in range(0, len(missing), HOTEL_OFFERS_BATCH_SIZE)]
+        set_attribute("cached", len(priced))
+        set_attribute("batches", len(batches))
+
+        params = {"checkInDate": checkin, "checkOutDate": checkout, "adults": adults, "roomQuantity": rooms}
+        if batches and access_token is None:
+            access_token = await self._access_token()
+        results = await asyncio.gather(*(self._fetch_offer_batch(batch, params, access_token) for batch in batches))
+        fetched = {hotel_id: entry for batch_result in results for hotel_id, entry in batch_result.items()}
+        await hotel_offer_cache.put_many({keys[hotel_id]: entry for hotel_id, entry in fetched.items()})
+        priced.update(fetched)
+
+        # Single pass over the list; the coalesced result is shared, so records are copied, not mutated
+        enriched = [{**hotel, **priced[hotel["hotelId"]]} if hotel.get("hotelId") in priced else hotel
+                    for hotel in hotels]
+        logging.info(f"Priced {len(priced)} of {len(hotels)} hotels ({len(fetched)} fetched in {len(batches)} batches)")
+        return {**hotels_data, "data": enriched}
+
+    @traced("amadeus.hotel_offers", upstream="amadeus")
+    async def _fetch_offer_batch(self, hotel_ids, params, access_token):
+        """Fetch offers for one batch of hotelIds; returns {hotelId: {"available", "offers"}}"""
+        set_attribute("hotel_ids", len(hotel_ids))
+        try:
+            response = await hotel_offers_upstream.request(
+                "GET", HOTEL_OFFERS_URL, headers={"Authorization": f"Bearer {access_token}"},
+                params={**params, "hotelIds": ",".join(hotel_ids), "bestRateOnly": "true"}, timeout=15.0
+            )
+            set_attribute("status_code", response.status_code)
+            if response.status_code == 401:
+                self.tokens.invalidate(access_token)
+            response.raise_for_status()
+            data = response.json().get("data") or []
+        except (deadline.DeadlineExceeded, httpx.TimeoutException, CircuitOpenError, httpx.HTTPError, ValueError) as e:
+            logging.warning(f"Hotel offers batch of {len(hotel_ids)} failed: {type(e).__name__}: {e}")
+            return {}
 
-    async def search_hotels(self, latitude: float, longitude: float, checkin: str, checkout: str, adults: int = 2, radius: int = 50):
-        """Search for hotels using Amadeus Hotel List API"""
-        if not self.access_token:
-            logging.warning("No access token available, attempting to get one")
-            self._get_access_token()
-            if not self.access_token:
-                raise HTTPException(status_code=500, detail="Failed to authenticate with Amadeus API")
+        entries = {item.get("hotel", {}).get("hotelId"): {"available": item.get("available", True),
+                                                          "offers": item.get("offers", [])}
+                   for item in data}
+        # Hotels Amadeus left out of a successful batch have no availability for these dates
+        return {hotel_id: entries.get(hotel_id, {"available": False, "offers": []}) for hotel_id in hotel_ids}
 
+    @traced("amadeus.hotels_by_geocode", upstream="amadeus")
+    async def _fetch_hotels_by_geocode(self, params, access_token):
+        """Call the Amadeus hotel list by-geocode API"""
         try:
             url = f"{self.base_url}/reference-data/locations/hotels/by-geocode"
-            headers = {"Authorization": f"Bearer {self.access_token}"}
-            params = {
-                "latitude": latitude,
-                "longitude": longitude,
-                "radius": radius,
-                "radiusUnit": "KM",
-                "hotelSource": "ALL"
-            }
+            headers = {"Authorization": f"Bearer {access_token}"}
 
-            logging.info(f"Searching hotels at lat={latitude}, lng={longitude}, radius={radius}km")
+            logging.info(f"Searching hotels at lat={params['latitude']}, lng={params['longitude']}, radius={params['radius']}km")
 
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=headers, params=params, timeout=10.0)
-                response.raise_for_status()
-                hotels_data = response.json()
+            response = await hotel_upstream.request("GET", url, headers=headers, params=params, timeout=10.0)
+            set_attribute("status_code", response.status_code)
+            response.raise_for_status()
+            hotels_data = response.json()
 
-                if not hotels_data.get("data"):
-                    logging.warning("No hotels found in the area")
-                    return {"data": [], "meta": {}}
+            if not hotels_data.get("data"):
+                logging.warning("No hotels found in the area")
+                return {"data": [], "meta": {}}
 
-                logging.info(f"Found {len(hotels_data.get('data', []))} hotels")
-                return hotels_data
+            set_attribute("hotels", len(hotels_data["data"]))
+            logging.info(f"Found {len(hotels_data.get('data', []))} hotels")
+            return hotels_data
 
+        except (deadline.DeadlineExceeded, httpx.TimeoutException) as e:
+            logging.error(f"Hotel search timed out: {e}")
+            raise HTTPException(status_code=504, detail="Hotel search timed out")
+        except CircuitOpenError as e:
+            logging.warning(f"Hotel search skipped: {e}")
+            raise HTTPException(status_code=503, detail=str(e))
         except httpx.HTTPStatusError as e:
+            if e.response.status_code == 401:
+                self.tokens.invalidate(access_token)
             logging.error(f"Amadeus API error: {e.response.status_code} - {e.response.text}")
             raise HTTPException(status_code=e.response.status_code, detail=f"Amadeus API error: {e.response.text}")
         except Exception as e:
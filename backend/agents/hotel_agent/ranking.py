@@ -0,0 +1,160 @@
+"""
+Server-side hotel ranking with top-k selection and keyset pagination.
+
+Hotels are scored on distance to a chosen point, rating and price (when
+offers were attached), with the features scored as numpy arrays over the
+whole result. Pages are picked with a heap instead of sorting everything,
+and cursors hold the sort key of the last hotel returned, so a page never
+repeats or skips hotels when earlier ones move.
+"""
+import heapq
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core import pagination
+from geo.kdtree import EARTH_RADIUS_KM
+
+SORT_KEYS = ("best", "distance", "price", "rating")
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Relative weight of each normalised feature in the "best" score
+SCORE_WEIGHTS = {"distance": 0.4, "rating": 0.3, "price": 0.3}
+
+RankKey = Tuple[Any, ...]
+# Numbers per sort key before the trailing hotel id (see rank_keys)
+KEY_NUMBERS = {"best": 2, "distance": 1, "price": 2, "rating": 2}
+
+
+def _number(value) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def _features(hotel: Dict[str, Any]) -> Tuple[float, float, float, float, float]:
+    """(latitude, longitude, reported distance km, rating 0-1, price) with NaN for unknowns"""
+    geo_code = hotel.get("geoCode") or {}
+    distance = hotel.get("distance")
+    # Amadeus star ratings are 1-5; Booking-style review scores are out of 10
+    property_info = hotel.get("property") or {}
+    if property_info.get("reviewScore") is not None:
+        rating = _number(property_info["reviewScore"]) / 10
+    else:
+        rating = _number(hotel.get("rating")) / 5
+    offers = hotel.get("offers") or [{}]
+    price = _number((offers[0].get("price") or {}).get("total"))
+    if math.isnan(price):
+        gross = (property_info.get("priceBreakdown") or {}).get("grossPrice") or hotel.get("price")
+        price = _number(gross.get("value")) if isinstance(gross, dict) else math.nan
+    return (
+        _number(geo_code.get("latitude")),
+        _number(geo_code.get("longitude")),
+        _number(distance.get("value")) if isinstance(distance, dict) else math.nan,
+        rating,
+        price,
+    )
+
+
+def _haversine_km(latitudes: np.ndarray, longitudes: np.ndarray, latitude: float, longitude: float) -> np.ndarray:
+    lat1, lat2 = np.radians(latitudes), math.radians(latitude)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * math.cos(lat2) * np.sin((math.radians(longitude) - np.radians(longitudes)) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def _normalise_low_is_good(values: np.ndarray) -> np.ndarray:
+    """1 for the lowest known value, 0 for the highest and for unknowns"""
+    known = ~np.isnan(values)
+    scores = np.zeros(len(values))
+    if known.any():
+        low, high = values[known].min(), values[known].max()
+        scores[known] = 1.0 if high == low else (high - values[known]) / (high - low)
+    return scores
+
+
+def rank_keys(hotels: Sequence[Dict[str, Any]], sort: str = "best", latitude: Optional[float] = None,
+              longitude: Optional[float] = None) -> Tuple[List[RankKey], np.ndarray]:
+    """
+    Ascending sort key and "best" score per hotel. Distances are measured
+    from (latitude, longitude) when given, else taken from the record.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort '{sort}', expected one of {', '.join(SORT_KEYS)}")
+    features = np.array([_features(hotel) for hotel in hotels], dtype=float).reshape(-1, 5)
+    distances = features[:, 2]
+    if latitude is not None and longitude is not None:
+        measured = _haversine_km(features[:, 0], features[:, 1], latitude, longitude)
+        distances = np.where(np.isnan(measured), distances, measured)
+    ratings, prices = features[:, 3], features[:, 4]
+
+    scores = (SCORE_WEIGHTS["distance"] * _normalise_low_is_good(distances)
+              + SCORE_WEIGHTS["rating"] * np.nan_to_num(np.clip(ratings, 0.0, 1.0))
+              + SCORE_WEIGHTS["price"] * _normalise_low_is_good(prices))
+
+    # Unknown values sort last; the hotelId (or position) makes every key unique and stable
+    distance_key = np.where(np.isnan(distances), math.inf, np.round(distances, 6)).tolist()
+    price_key = np.where(np.isnan(prices), math.inf, prices).tolist()
+    rating_key = np.where(np.isnan(ratings), math.inf, -ratings).tolist()
+    ids = [str(hotel.get("hotelId") or f"#{i:06d}") for i, hotel in enumerate(hotels)]
+    if sort == "best":
+        keys = list(zip((-np.round(scores, 9)).tolist(), distance_key, ids))
+    elif sort == "distance":
+        keys = list(zip(distance_key, ids))
+    elif sort == "price":
+        keys = list(zip(price_key, distance_key, ids))
+    else:
+        keys = list(zip(rating_key, distance_key, ids))
+    return keys, scores
+
+
+def top_hotels(hotels: Sequence[Dict[str, Any]], k: int, sort: str = "best", latitude: Optional[float] = None,
+               longitude: Optional[float] = None) -> List[Dict[str, Any]]:
+    """The k best hotels in rank order, without sorting the rest"""
+    if not hotels or k <= 0:
+        return []
+    keys, _ = rank_keys(hotels, sort, latitude, longitude)
+    return [hotels[i] for i in heapq.nsmallest(k, range(len(hotels)), key=keys.__getitem__)]
+
+
+def _decode_after(cursor: Optional[str], sort: str) -> Optional[RankKey]:
+    state = pagination.decode_cursor(cursor)
+    if state is None:
+        return None
+    after = state.get("after")
+    if state.get("sort") != sort or not isinstance(after, list) or len(after) != KEY_NUMBERS.get(sort, -1) + 1:
+        raise ValueError("Invalid cursor")
+    # Compared against rank keys, so a wrongly typed element would raise TypeError mid-ranking
+    *numbers, hotel_id = after
+    if not isinstance(hotel_id, str) or not all(
+            isinstance(n, (int, float)) and not isinstance(n, bool) for n in numbers):
+        raise ValueError("Invalid cursor")
+    return tuple(after)
+
+
+def rank_hotels(hotels: Sequence[Dict[str, Any]], sort: str = "best", cursor: Optional[str] = None,
+                limit: int = DEFAULT_PAGE_SIZE, latitude: Optional[float] = None,
+                longitude: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+    """
+    One page of ranked hotels, the cursor for the next page (None on the
+    last page) and the total number of hotels. Hotels on the page carry
+    their "score" when sorted by best.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    after = _decode_after(cursor, sort)
+    if not hotels:
+        return [], None, 0
+    keys, scores = rank_keys(hotels, sort, latitude, longitude)
+    candidates = range(len(hotels)) if after is None else [i for i, key in enumerate(keys) if key > after]
+    chosen = heapq.nsmallest(limit + 1, candidates, key=keys.__getitem__)
+    has_more = len(chosen) > limit
+    chosen = chosen[:limit]
+    if sort == "best":
+        page = [{**hotels[i], "score": round(float(scores[i]), 4)} for i in chosen]
+    else:
+        page = [hotels[i] for i in chosen]
+    next_cursor = pagination.encode_cursor({"sort": sort, "after": list(keys[chosen[-1]])}) if has_more else None
+    return page, next_cursor, len(hotels)
@@ -0,0 +1,92 @@
+"""
+Geocell-cached hotel reference data with local radius and nearest-N queries.
+
+Hotel lists from the Amadeus by-geocode API barely change, so they are
+fetched once per geohash cell and kept for a day (then served stale while a
+refresh runs). Searches are answered from the cached cells through a
+KD-tree per cell, built once per cached list, so a repeated search around
+the same city makes no upstream call.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.ttl_cache import TTLCache
+from geo.geocell import encode
+from geo.kdtree import KDTree
+
+# 3 -> cells of 1.4 x 1.4 degrees; a 50 km search touches one to four of them
+GEOCELL_PRECISION = int(os.getenv("HOTEL_GEOCELL_PRECISION", "3"))
+# Cells whose KD-tree is kept built
+MAX_INDEXED_CELLS = 512
+
+hotel_reference_cache = TTLCache(
+    "hotel_reference",
+    ttl=float(os.getenv("HOTEL_REFERENCE_TTL", "86400")),
+    stale_ttl=float(os.getenv("HOTEL_REFERENCE_STALE_TTL", "518400")),
+    max_entries=int(os.getenv("HOTEL_REFERENCE_MAX_CELLS", "2000")),
+    persist_path=os.getenv("HOTEL_REFERENCE_CACHE_PATH") or None,
+)
+
+
+def _coordinates(hotel: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    geo_code = hotel.get("geoCode") or {}
+    try:
+        return float(geo_code["latitude"]), float(geo_code["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def hotels_in_cell(cell: str, hotels: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Hotels located inside the cell; results fetched for its circumscribing circle overlap neighbours"""
+    precision = len(cell)
+    inside = []
+    for hotel in hotels:
+        coordinates = _coordinates(hotel)
+        if coordinates and encode(coordinates[0], coordinates[1], precision) == cell:
+            inside.append(hotel)
+    return inside
+
+
+_trees: "OrderedDict[int, Tuple[List[Dict[str, Any]], KDTree]]" = OrderedDict()
+_trees_lock = threading.Lock()
+
+
+def _tree_for(hotels: List[Dict[str, Any]]) -> KDTree:
+    """KD-tree over a cached cell's hotels, built once per list object"""
+    key = id(hotels)
+    with _trees_lock:
+        entry = _trees.get(key)
+        # The stored reference keeps id(hotels) from being reused while indexed
+        if entry is not None and entry[0] is hotels:
+            _trees.move_to_end(key)
+            return entry[1]
+    tree = KDTree([_coordinates(hotel) for hotel in hotels])
+    with _trees_lock:
+        _trees[key] = (hotels, tree)
+        while len(_trees) > MAX_INDEXED_CELLS:
+            _trees.popitem(last=False)
+    return tree
+
+
+def query_hotels(cells: Sequence[List[Dict[str, Any]]], latitude: float, longitude: float,
+                 radius_km: float, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Hotels from the given cells within radius_km, nearest first, with
+    "distance" set relative to the search point; at most limit if given.
+    """
+    found: List[Tuple[float, Dict[str, Any]]] = []
+    for hotels in cells:
+        if not hotels:
+            continue
+        tree = _tree_for(hotels)
+        if limit:
+            matches = [(index, km) for index, km in tree.nearest(latitude, longitude, limit) if km <= radius_km]
+        else:
+            matches = tree.within(latitude, longitude, radius_km)
+        found.extend((km, hotels[index]) for index, km in matches)
+    found.sort(key=lambda match: match[0])
+    if limit:
+        found = found[:limit]
+    return [{**hotel, "distance": {"value": round(km, 2), "unit": "KM"}} for km, hotel in found]
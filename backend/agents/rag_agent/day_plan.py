@@ -0,0 +1,99 @@
+"""
+Day-by-day itinerary generation for long trips.
+
+A single prompt for a 10- or 14-day trip produces one long response that
+takes as long as its length and can run into the model's token limit. For
+long trips the agent instead asks for a short outline (a theme per day plus
+the shared sections), then writes every day with its own small prompt and
+retrieval, concurrently, and puts the days back in order. This module holds
+the prompts and the parsing and assembly; RAGAgent makes the calls.
+"""
+import os
+import re
+from typing import Dict, List, NamedTuple
+
+# Trips at least this long are generated day by day
+PARALLEL_DAYS_MIN = int(os.getenv("RAG_PARALLEL_DAYS_MIN", "6"))
+# Days written at once per itinerary
+DAY_CONCURRENCY = int(os.getenv("RAG_DAY_CONCURRENCY", "5"))
+
+OUTLINE_TEMPLATE = (
+    "You are a travel assistant planning a {days}-day trip.\n\n"
+    "Context: {context}\n\n"
+    "User Request: {question}\n\n"
+    "Write ONLY an outline, no daily details:\n"
+    "# [Destination] Itinerary\n\n"
+    "Then exactly {days} lines, one per day, each in the form:\n"
+    "## Day N: [Theme, under 8 words]\n\n"
+    "Then these sections, 2-5 short bullet points (•) each:\n"
+    "## 🍽️ Restaurant & Dining\n"
+    "## 🚗 Transportation Tips\n"
+    "## 💰 Budget Estimates\n"
+    "## 🎯 Cultural Insights & Local Tips\n"
+    "## ☀️ Weather & Packing\n\n"
+    "Use emojis for visual appeal. Keep the whole outline under 350 words."
+)
+
+DAY_TEMPLATE = (
+    "You are a travel assistant writing one day of a {days}-day itinerary.\n\n"
+    "Context: {context}\n\n"
+    "Trip request: {question}\n"
+    "Trip plan: {plan}\n\n"
+    "Write Day {day} only. Its theme is: {theme}\n"
+    "• ⏰ Morning: [Activity] - [1 sentence]\n"
+    "• 🍽️ Lunch: [Restaurant name] - [Cuisine, price range]\n"
+    "• ⏰ Afternoon: [Activity] - [1 sentence]\n"
+    "• 🍽️ Dinner: [Restaurant name] - [Cuisine, price range]\n\n"
+    "Use bullet points (•) only, no heading, at most 120 words. "
+    "Don't repeat activities planned for other days."
+)
+
+_DAY_HEADING = re.compile(r"^\s*#{1,4}\s*\**\s*Day\s+(\d+)\s*\**\s*[:\-–—]?\s*(.*)$", re.IGNORECASE)
+
+
+class Outline(NamedTuple):
+    title: str  # everything before the first day
+    themes: Dict[int, str]  # day number -> theme
+    shared: str  # the sections after the days
+
+
+def parse_outline(text: str, days: int, location: str) -> Outline:
+    """Split an outline response into its title, per-day themes and shared sections"""
+    title_lines: List[str] = []
+    shared_lines: List[str] = []
+    themes: Dict[int, str] = {}
+    in_days = False
+    for line in text.strip().split("\n"):
+        match = _DAY_HEADING.match(line)
+        if match:
+            day = int(match.group(1))
+            if 1 <= day <= days and day not in themes:
+                themes[day] = match.group(2).strip().strip("*").strip() or f"Exploring {location}"
+            in_days = True
+        elif not in_days:
+            title_lines.append(line)
+        elif shared_lines or line.lstrip().startswith("#"):
+            shared_lines.append(line)
+    for day in range(1, days + 1):
+        themes.setdefault(day, f"Exploring {location}")
+    title = "\n".join(title_lines).strip() or f"# {location} Itinerary"
+    return Outline(title, themes, "\n".join(shared_lines).strip())
+
+
+def plan_summary(outline: Outline) -> str:
+    """One line of day themes, so each day's prompt knows what the others cover"""
+    return "; ".join(f"Day {day}: {theme}" for day, theme in sorted(outline.themes.items()))
+
+
+def day_section(day: int, theme: str, text: str) -> str:
+    """A day's heading followed by its bullets, without any heading the model added itself"""
+    lines = text.strip().split("\n")
+    while lines and (_DAY_HEADING.match(lines[0]) or not lines[0].strip()):
+        lines.pop(0)
+    body = "\n".join(lines).strip() or "• Free day to explore at your own pace"
+    return f"## Day {day}: {theme}\n{body}"
+
+
+def assemble(outline: Outline, sections: List[str]) -> str:
+    """The full itinerary: title, the days in order, then the shared sections"""
+    return "\n\n".join(part for part in (outline.title, *sections, outline.shared) if part)
@@ -0,0 +1,141 @@
+"""
+Memory-mapped on-disk vector index for the RAG agent.
+
+The chunk embeddings, their norms and the chunk texts and metadata are
+written once as flat files and opened read-only with mmap, so every worker
+process maps the same page-cache pages instead of holding its own copy of
+the index and document store. Search is an exact L2 scan (what FAISS's
+IndexFlatL2 does), which for a guide-sized corpus takes well under a
+millisecond. Each index lives in a directory named after a fingerprint of
+its source and embedding model; a changed source builds a new one.
+
+    root/<fingerprint>/
+        vectors.npy      float32 (n, dim)
+        norms.npy        float32 (n,) squared L2 norms
+        texts.bin        UTF-8 chunk texts, back to back
+        meta.bin         UTF-8 JSON metadata per chunk, back to back
+        offsets.npy      int64 (n + 1, 2) start of each text and metadata record
+        info.json        fingerprint, count, dim and build details
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class Chunk(NamedTuple):
+    """A retrieved passage; shaped like a langchain Document for the agent's callers"""
+    page_content: str
+    metadata: Dict[str, Any]
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable short hash of the index source (bytes or strings) and build settings"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def write_index(directory: str, vectors: Sequence[Sequence[float]], texts: Sequence[str],
+                metadatas: Sequence[Dict[str, Any]], info: Optional[Dict[str, Any]] = None):
+    """Write an index to directory (which must not exist yet)"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2 or len(matrix) != len(texts) or len(texts) != len(metadatas):
+        raise ValueError(f"Expected one vector, text and metadata per chunk, got {matrix.shape}, "
+                         f"{len(texts)} texts and {len(metadatas)} metadata records")
+    os.makedirs(directory)
+    np.save(os.path.join(directory, "vectors.npy"), matrix)
+    np.save(os.path.join(directory, "norms.npy"), np.einsum("ij,ij->i", matrix, matrix))
+    offsets = np.zeros((len(texts) + 1, 2), dtype=np.int64)
+    with open(os.path.join(directory, "texts.bin"), "wb") as text_file, \
+            open(os.path.join(directory, "meta.bin"), "wb") as meta_file:
+        for i, (text, metadata) in enumerate(zip(texts, metadatas)):
+            offsets[i + 1, 0] = offsets[i, 0] + text_file.write(text.encode())
+            offsets[i + 1, 1] = offsets[i, 1] + meta_file.write(json.dumps(metadata, default=str).encode())
+    np.save(os.path.join(directory, "offsets.npy"), offsets)
+    with open(os.path.join(directory, "info.json"), "w") as f:
+        json.dump({**(info or {}), "count": len(texts), "dim": int(matrix.shape[1]) if len(matrix) else 0}, f)
+
+
+class MmapIndex:
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "info.json")) as f:
+            self.info = json.load(f)
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        self.norms = np.load(os.path.join(directory, "norms.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self._texts = self._map(os.path.join(directory, "texts.bin"))
+        self._meta = self._map(os.path.join(directory, "meta.bin"))
+
+    @staticmethod
+    def _map(path: str):
+        # np.memmap refuses empty files
+        return np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.norms)
+
+    def chunk(self, i: int) -> Chunk:
+        (text_start, meta_start), (text_end, meta_end) = self.offsets[i], self.offsets[i + 1]
+        return Chunk(self._texts[text_start:text_end].tobytes().decode(),
+                     json.loads(self._meta[meta_start:meta_end].tobytes() or b"{}"))
+
+    def search(self, embedding: Sequence[float], k: int = 4) -> List[Tuple[int, float]]:
+        """(chunk index, squared L2 distance) of the k nearest chunks, nearest first"""
+        if not len(self) or k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        distances = self.norms - 2 * (self.vectors @ query) + query @ query
+        k = min(k, len(distances))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return [(int(i), float(distances[i])) for i in nearest]
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4) -> List[Chunk]:
+        return [self.chunk(i) for i, _ in self.search(embedding, k)]
+
+
+def open_or_build(root: str, key: str,
+                  build: Callable[[], Tuple[Sequence[Sequence[float]], Sequence[str], Sequence[Dict[str, Any]]]],
+                  info: Optional[Dict[str, Any]] = None) -> MmapIndex:
+    """
+    Open the index for key under root, calling build() for (vectors, texts,
+    metadatas) and writing it first if there is none. Concurrent builders
+    each write to a temporary directory and the first rename wins, so
+    workers never see a half-written index.
+    """
+    directory = os.path.join(root, key)
+    if os.path.exists(os.path.join(directory, "info.json")):
+        logger.info(f"Opening memory-mapped index {directory}")
+        return MmapIndex(directory)
+
+    os.makedirs(root, exist_ok=True)
+    vectors, texts, metadatas = build()
+    staging = tempfile.mkdtemp(prefix=f".{key}-", dir=root)
+    os.rmdir(staging)
+    write_index(staging, vectors, texts, metadatas, {**(info or {}), "fingerprint": key})
+    try:
+        os.rename(staging, directory)
+        logger.info(f"Wrote memory-mapped index {directory} ({len(texts)} chunks)")
+    except OSError:
+        # Another process finished first; use its copy
+        shutil.rmtree(staging, ignore_errors=True)
+    _prune(root, keep=key)
+    return MmapIndex(directory)
+
+
+def _prune(root: str, keep: str):
+    """Remove indexes built from older sources; mapped files stay readable until unmapped"""
+    for name in os.listdir(root):
+        if name != keep and not name.startswith("."):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
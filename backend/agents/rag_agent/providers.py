@@ -0,0 +1,129 @@
+"""
+Registry of LLM and embedding backends for the RAG agent.
+
+Each provider's SDK (langchain_openai, langchain_google_genai, langchain_aws)
+is imported only when that provider is built, so a process pays for the one
+backend it uses rather than all of them. The provider is chosen by
+LLM_PROVIDER when set, otherwise openai if LLM_BASE_URL is set, then gemini
+or bedrock as the agent asks. LLM_PROVIDERS names several providers to route
+between (see router.py).
+"""
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# name -> builder(options) returning (embeddings, llm)
+Builder = Callable[[Dict[str, Any]], Tuple[Any, Any]]
+
+_providers: Dict[str, Builder] = {}
+_providers_lock = threading.Lock()
+
+
+def register_provider(name: str) -> Callable[[Builder], Builder]:
+    """Register a builder under name; the builder should import its SDK itself"""
+    def decorator(builder: Builder) -> Builder:
+        with _providers_lock:
+            _providers[name] = builder
+        return builder
+    return decorator
+
+
+def available_providers() -> Tuple[str, ...]:
+    with _providers_lock:
+        return tuple(_providers)
+
+
+def select_provider(use_gemini: bool = True) -> str:
+    configured = os.getenv("LLM_PROVIDER")
+    if configured:
+        return configured.lower()
+    if os.getenv("LLM_BASE_URL"):
+        return "openai"
+    return "gemini" if use_gemini else "bedrock"
+
+
+def select_providers(use_gemini: bool = True) -> List[str]:
+    """Providers to route between, in order of preference"""
+    configured = [name.strip().lower() for name in os.getenv("LLM_PROVIDERS", "").split(",") if name.strip()]
+    return list(dict.fromkeys(configured)) or [select_provider(use_gemini)]
+
+
+def build_provider(name: str, options: Optional[Dict[str, Any]] = None) -> Tuple[Any, Any]:
+    """Import and construct the named provider's embeddings and LLM"""
+    with _providers_lock:
+        builder = _providers.get(name)
+    if builder is None:
+        raise ValueError(f"Unknown LLM provider '{name}'. Available: {', '.join(available_providers())}")
+    return builder(options or {})
+
+
+@register_provider("openai")
+def _openai(options: Dict[str, Any]) -> Tuple[Any, Any]:
+    # Any OpenAI-compatible server, e.g. the fake provider in backend/loadtest/fake_llm.py
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+    base_url = os.getenv("LLM_BASE_URL")
+    api_key = os.getenv("LLM_API_KEY", "local")
+    embeddings = OpenAIEmbeddings(
+        base_url=base_url,
+        api_key=api_key,
+        model=os.getenv("LLM_EMBEDDING_MODEL", "fake-embedding"),
+        check_embedding_ctx_length=False
+    )
+    llm = ChatOpenAI(
+        base_url=base_url,
+        api_key=api_key,
+        model=os.getenv("LLM_MODEL", "fake-travel"),
+        temperature=0.7,
+        max_tokens=3000
+    )
+    logger.info(f"Initialized with OpenAI-compatible endpoint at {base_url}")
+    return embeddings, llm
+
+
+@register_provider("gemini")
+def _gemini(options: Dict[str, Any]) -> Tuple[Any, Any]:
+    gemini_api_key = os.getenv("gemini_api_key") or os.getenv("GEMINI_API_KEY")
+    if not gemini_api_key or gemini_api_key == "your_gemini_api_key_here":
+        raise ValueError(f"Gemini API key not set in environment variables. Checked: gemini_api_key={os.getenv('gemini_api_key')}, GEMINI_API_KEY={os.getenv('GEMINI_API_KEY')}")
+
+    from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+
+    # Use text-embedding-004 which is available in the free tier
+    embeddings = GoogleGenerativeAIEmbeddings(
+        google_api_key=gemini_api_key,
+        model="models/text-embedding-004"
+    )
+    llm = ChatGoogleGenerativeAI(
+        google_api_key=gemini_api_key,
+        model="gemini-2.5-flash",
+        temperature=0.7,
+        max_tokens=3000
+    )
+    logger.info("Initialized with Google Gemini 2.5 Flash")
+    return embeddings, llm
+
+
+@register_provider("bedrock")
+def _bedrock(options: Dict[str, Any]) -> Tuple[Any, Any]:
+    from langchain_aws import BedrockEmbeddings, BedrockLLM
+
+    aws_profile = options.get("aws_profile", "default")
+    embeddings = BedrockEmbeddings(
+        credentials_profile_name=aws_profile,
+        model_id='amazon.titan-embed-text-v1'
+    )
+    llm = BedrockLLM(
+        credentials_profile_name=aws_profile,
+        model='amazon.titan-text-lite-v1',
+        model_kwargs={
+            "maxTokenCount": 3000,
+            "temperature": 0.1,
+            "topP": 0.9
+        }
+    )
+    logger.info("Initialized with AWS Bedrock")
+    return embeddings, llm
@@ -1,7 +1,10 @@
+import asyncio
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 import json
+import threading
+import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
@@ -12,19 +15,39 @@ from pathlib import Path
 env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.env')
 load_dotenv(dotenv_path=env_path)
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_aws import BedrockEmbeddings, BedrockLLM
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
+from agents.flight_agent.offers import offers_for, serialize_result
+from agents.hotel_agent.ranking import top_hotels
+from agents.rag_agent.day_plan import (DAY_CONCURRENCY, DAY_TEMPLATE, OUTLINE_TEMPLATE, PARALLEL_DAYS_MIN, Outline,
+                                       assemble, day_section, parse_outline, plan_summary)
+from agents.rag_agent.mmap_index import fingerprint, open_or_build
+from agents.rag_agent.providers import select_providers
+from agents.rag_agent.router import build_llm
+from core import deadline
+from core.tracing import span, traced
+from geo.gazetteer import get_gazetteer
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+# Memory-mapped chunk index, shared read-only by every worker process
+RAG_INDEX_PATH = os.getenv("RAG_INDEX_PATH", "cache/rag_index")
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 20
+FALLBACK_INDEX_TEXT = ("Welcome to the most comprehensive guide on Amazon Bedrock and Generative AI on AWS from a "
+                       "practising AWS Solution Architect and best-selling Udemy Instructor.")
+
+# The LLM clients, embeddings and vector index are built once per process and
+# shared by every RAGAgent; instances only carry per-request flight/hotel data.
+SHARED_COMPONENTS = ("llm_provider", "text_splitter", "embeddings", "llm", "initialization_error",
+                     "vectorstore", "retriever", "qa_prompt")
+# A failed or degraded build is shared too, and rebuilt in the background at most
+# this often, so agents created per request never rebuild on the event loop
+RAG_RETRY_SECONDS = float(os.getenv("RAG_RETRY_SECONDS", "300"))
+_shared_components: Dict[tuple, Dict[str, Any]] = {}
+_shared_components_lock = threading.Lock()
+
+
 class RAGAgent:
     def __init__(self,
                  local_pdf_path: Optional[str] = None,
@@ -38,59 +61,61 @@ class RAGAgent:
         # Store flight and hotel data for itinerary generation
         self.flight_data = None
         self.hotel_data = None
-        
+        self.vector_store = None
+
+        key = (aws_profile, tuple(select_providers(use_gemini)), os.getenv("LLM_BASE_URL"))
+        with _shared_components_lock:
+            shared = _shared_components.get(key)
+            if shared is None:
+                shared = _shared_components[key] = self._build_shared()
+            elif shared["retry_at"] is not None and time.monotonic() >= shared["retry_at"]:
+                shared["retry_at"] = None  # one rebuild at a time
+                threading.Thread(target=self._rebuild_shared, args=(key,), daemon=True).start()
+        self.__dict__.update({name: shared[name] for name in SHARED_COMPONENTS})
+
+    @property
+    def degraded(self) -> bool:
+        """True when the LLM or the vector index failed to build and fallbacks are used"""
+        return self.initialization_error is not None or self.vectorstore is None
+
+    def _build_shared(self) -> Dict[str, Any]:
+        """Build the shared components; a failed build is kept with the time to retry it"""
+        try:
+            self._init_components()
+        except Exception as e:
+            logger.warning(f"Failed to initialize RAG components: {e}")
+            for name in SHARED_COMPONENTS:
+                setattr(self, name, getattr(self, name, None))
+            self.initialization_error = self.initialization_error or str(e)
+        shared = {name: getattr(self, name) for name in SHARED_COMPONENTS}
+        shared["retry_at"] = time.monotonic() + RAG_RETRY_SECONDS if self.degraded else None
+        return shared
+
+    def _rebuild_shared(self, key: tuple):
+        # A separate instance, so the agent serving the current request keeps its components
+        builder = RAGAgent.__new__(RAGAgent)
+        builder.__dict__.update(self.__dict__)
+        shared = builder._build_shared()
+        logger.info(f"Rebuilt RAG components ({'still degraded' if builder.degraded else 'ready'})")
+        with _shared_components_lock:
+            _shared_components[key] = shared
+
+    def _init_components(self):
+        """Build the LLM, embeddings, vector index and prompt"""
+        # Imported here so processes that never build the index don't load langchain
+        from langchain.prompts import PromptTemplate
+
+        providers = select_providers(self.use_gemini)
+        self.llm_provider = providers[0]
         # Initialize components with error handling
         self.text_splitter = None
         self.embeddings = None
         self.llm = None
-        self.vector_store = None
-        self.qa_chain = None
         self.initialization_error = None
         
         try:
-            # Build vector index from the provided PDF
-            self.text_splitter = RecursiveCharacterTextSplitter(
-                separators=["\n\n", "\n", " ", ""],
-                chunk_size=400,
-                chunk_overlap=20
-            )
-
-            if self.use_gemini:
-                # Use Google Gemini for embeddings and LLM
-                gemini_api_key = os.getenv("gemini_api_key") or os.getenv("GEMINI_API_KEY")
-                if not gemini_api_key or gemini_api_key == "your_gemini_api_key_here":
-                    raise ValueError(f"Gemini API key not set in environment variables. Checked: gemini_api_key={os.getenv('gemini_api_key')}, GEMINI_API_KEY={os.getenv('GEMINI_API_KEY')}")
-                
-                # Use text-embedding-004 which is available in the free tier
-                self.embeddings = GoogleGenerativeAIEmbeddings(
-                    google_api_key=gemini_api_key,
-                    model="models/text-embedding-004"
-                )
-
-                self.llm = ChatGoogleGenerativeAI(
-                    google_api_key=gemini_api_key,
-                    model="gemini-2.5-flash",
-                    temperature=0.7,
-                    max_tokens=3000
-                )
-                logger.info("Initialized with Google Gemini 2.5 Flash")
-            else:
-                # Fallback to AWS Bedrock
-                self.embeddings = BedrockEmbeddings(
-                    credentials_profile_name=self.aws_profile,
-                    model_id='amazon.titan-embed-text-v1'
-                )
-
-                self.llm = BedrockLLM(
-                    credentials_profile_name=self.aws_profile,
-                    model='amazon.titan-text-lite-v1',
-                    model_kwargs={
-                        "maxTokenCount": 3000,
-                        "temperature": 0.1,
-                        "topP": 0.9
-                    }
-                )
-                logger.info("Initialized with AWS Bedrock")
+            # With several providers the llm is an LLMRouter; embeddings come from the first that built
+            self.llm_provider, self.embeddings, self.llm = build_llm(providers, {"aws_profile": self.aws_profile})
         except Exception as e:
             logger.warning(f"Failed to initialize AI components: {e}")
             self.initialization_error = str(e)
@@ -99,7 +124,8 @@ class RAGAgent:
         # Initialize vector store with error handling
         try:
             self.vectorstore = self._build_index()
-            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 4})
+            # Retrieval goes straight to the index (see _retrieve)
+            self.retriever = self.vectorstore
         except Exception as e:
             logger.warning(f"Failed to initialize vector store: {e}")
             self.vectorstore = None
@@ -152,22 +178,8 @@ class RAGAgent:
             ),
         )
 
-        # Initialize QA chain with error handling
-        try:
-            if self.llm and self.retriever:
-                self.qa_chain = RetrievalQA.from_chain_type(
-                    llm=self.llm,
-                    chain_type="stuff",
-                    retriever=self.retriever,
-                    return_source_documents=True,
-                    chain_type_kwargs={"prompt": self.qa_prompt}
-                )
-            else:
-                self.qa_chain = None
-                logger.warning("QA chain not initialized - missing LLM or retriever")
-        except Exception as e:
-            logger.warning(f"Failed to initialize QA chain: {e}")
-            self.qa_chain = None
+        if not (self.llm and self.retriever):
+            logger.warning("RAG retrieval not available - missing LLM or retriever")
     
     def set_flight_data(self, flight_data: Dict[str, Any]):
         """Set flight data for itinerary generation"""
@@ -181,37 +193,18 @@ class RAGAgent:
     
     def _format_flight_info(self) -> str:
         """Format flight data for inclusion in itinerary"""
-        if not self.flight_data or not self.flight_data.get('data'):
+        offers = offers_for(self.flight_data)
+        if not offers:
             return "No flight information available."
         
-        flights = self.flight_data['data'][:5]  # Get top 5 flights
         flight_info = ""
-        
-        for i, flight in enumerate(flights, 1):
-            price = flight.get('price', {})
-            itinerary = flight.get('itineraries', [{}])[0]
-            segments = itinerary.get('segments', [])
-            
-            if segments:
-                departure = segments[0].get('departure', {})
-                arrival = segments[-1].get('arrival', {})
-                carrier_code = segments[0].get('carrierCode', 'N/A')
-                flight_number = segments[0].get('number', 'N/A')
-                
-                # Format departure and arrival times
-                dep_time = departure.get('at', 'N/A')
-                arr_time = arrival.get('at', 'N/A')
-                if dep_time != 'N/A' and 'T' in dep_time:
-                    dep_time = dep_time.split('T')[1][:5]  # Extract time only
-                if arr_time != 'N/A' and 'T' in arr_time:
-                    arr_time = arr_time.split('T')[1][:5]  # Extract time only
-                
-                flight_info += f"**{i}. {carrier_code} {flight_number}**\n"
-                flight_info += f"   🛫 {departure.get('iataCode', 'N/A')} → {arrival.get('iataCode', 'N/A')}\n"
-                flight_info += f"   ⏰ {dep_time} → {arr_time}\n"
-                flight_info += f"   💰 {price.get('total', 'N/A')} {price.get('currency', 'USD')}\n"
-                flight_info += f"   ⏱️ Duration: {itinerary.get('duration', 'N/A')}\n"
-                flight_info += f"   🛩️ Aircraft: {segments[0].get('aircraft', {}).get('code', 'N/A')}\n\n"
+        for i, flight in enumerate(offers[:5], 1):  # Top 5 flights
+            flight_info += f"**{i}. {flight.carrier} {flight.flight_number}**\n"
+            flight_info += f"   🛫 {flight.origin} → {flight.destination}\n"
+            flight_info += f"   ⏰ {flight.departure_time} → {flight.arrival_time}\n"
+            flight_info += f"   💰 {flight.total} {flight.currency}\n"
+            flight_info += f"   ⏱️ Duration: {flight.duration}\n"
+            flight_info += f"   🛩️ Aircraft: {flight.aircraft}\n\n"
         
         return flight_info
     
@@ -220,12 +213,12 @@ class RAGAgent:
         if not self.hotel_data or not self.hotel_data.get('data'):
             return "No hotel information available."
         
-        # Handle both list and dict formats
+        # Handle both list and dict formats; the best 5 by distance, rating and price
         hotels_data = self.hotel_data.get('data', [])
         if isinstance(hotels_data, dict):
-            hotels = hotels_data.get('hotels', [])[:5]
+            hotels = top_hotels(hotels_data.get('hotels', []), 5)
         else:
-            hotels = hotels_data[:5] if isinstance(hotels_data, list) else []
+            hotels = top_hotels(hotels_data, 5) if isinstance(hotels_data, list) else []
         
         if not hotels:
             return "No hotel information available."
@@ -272,10 +265,26 @@ class RAGAgent:
         return hotel_info
 
     def _build_index(self):
+        """Open the memory-mapped index for this PDF and embedding model, building it on first use"""
+        pdf_path = Path(__file__).parent / "holiday_itinerary_book.pdf"
+        source = pdf_path.read_bytes() if pdf_path.exists() else FALLBACK_INDEX_TEXT.encode()
+        embedding_model = getattr(self.embeddings, "model", None) or getattr(self.embeddings, "model_id", "")
+        key = fingerprint(source, self.llm_provider, embedding_model, CHUNK_SIZE, CHUNK_OVERLAP)
+        return open_or_build(RAG_INDEX_PATH, key, lambda: self._embed_chunks(pdf_path),
+                             {"provider": self.llm_provider, "embedding_model": embedding_model})
+
+    def _embed_chunks(self, pdf_path: Path):
+        """Split the PDF into chunks and embed them: (vectors, texts, metadatas)"""
+        # Ingestion-only dependencies, loaded only when an index has to be built
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        from langchain_community.document_loaders import PyPDFLoader
+
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            separators=["\n\n", "\n", " ", ""],
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP
+        )
         try:
-            current_dir = Path(__file__).parent
-            pdf_path = current_dir / "holiday_itinerary_book.pdf"
-            
             if not pdf_path.exists():
                 raise FileNotFoundError(f"PDF file not found at: {pdf_path}")
             
@@ -289,18 +298,47 @@ class RAGAgent:
             logger.warning(f"Local PDF not found at: {pdf_path}")
             # Build from a small fallback text snippet to keep system usable
             from langchain.schema import Document
-            docs = [Document(page_content=(
-                "Welcome to the most comprehensive guide on Amazon Bedrock and Generative AI on AWS from a "
-                "practising AWS Solution Architect and best-selling Udemy Instructor."))]
+            docs = [Document(page_content=FALLBACK_INDEX_TEXT)]
 
         split_docs = self.text_splitter.split_documents(docs)
-        vectorstore = FAISS.from_documents(split_docs, self.embeddings)
-        logger.info("Vector index built with FAISS using Bedrock Titan embeddings")
-        return vectorstore
+        texts = [d.page_content for d in split_docs]
+        vectors = self.embeddings.embed_documents(texts)
+        logger.info(f"Embedded {len(texts)} chunks with {self.llm_provider} embeddings")
+        return vectors, texts, [d.metadata for d in split_docs]
+
+    async def _retrieve(self, query: str, k: int = 4) -> List[Any]:
+        """Embed the query and search the vector index for the k closest chunks"""
+        with span("rag.retrieve", k=k):
+            with span("rag.embed_query", upstream=self.llm_provider):
+                embedding = await deadline.wait_for(self.embeddings.aembed_query(query))
+            with span("rag.vector_search", k=k):
+                return self.vectorstore.similarity_search_by_vector(embedding, k=k)
+
+    async def _invoke_llm(self, prompt: str) -> str:
+        """Call the configured LLM and return its text, recording token usage"""
+        # An LLMRouter times each provider it tries in its own spans
+        upstream = getattr(self.llm, "upstream", self.llm_provider)
+        with span("llm.generate", upstream=upstream, prompt_chars=len(prompt)) as llm_span:
+            # Abandoned once the request deadline passes instead of running to completion
+            result = await deadline.wait_for(self.llm.ainvoke(prompt))
+            usage = getattr(result, "usage_metadata", None) or {}
+            if usage:
+                llm_span.set_attribute("input_tokens", usage.get("input_tokens"))
+                llm_span.set_attribute("output_tokens", usage.get("output_tokens"))
+            # Chat models return a message, completion models (Bedrock) return a string
+            return result.content if hasattr(result, "content") else str(result)
+
+    async def _stream_llm(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the LLM's text as it is generated"""
+        async for chunk in self.llm.astream(prompt):
+            deadline.check()
+            text = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if text:
+                yield text
 
     async def retrieve_documents(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         try:
-            docs = self.retriever.get_relevant_documents(query)
+            docs = await self._retrieve(query, k=top_k)
             results: List[Dict[str, Any]] = []
             for d in docs[:top_k]:
                 results.append({
@@ -312,80 +350,142 @@ class RAGAgent:
             logger.error(f"Error retrieving documents: {e}")
             return []
 
+    def _enhanced_query(self, query: str) -> str:
+        """The user's query with any flight and hotel data appended"""
+        # Create enhanced query with flight and hotel data
+        enhanced_query = query
+        
+        # Add flight information if available
+        if self.flight_data:
+            flight_info = self._format_flight_info()
+            enhanced_query += f"\n\nFlight Information:\n{flight_info}"
+        
+        # Add hotel information if available
+        if self.hotel_data:
+            hotel_info = self._format_hotel_info()
+            enhanced_query += f"\n\nHotel Information:\n{hotel_info}"
+        return enhanced_query
+
+    async def _context(self, query: str, k: int = 4) -> Tuple[str, List[str]]:
+        """Retrieved guide text for the query and up to three sources; empty without a retriever"""
+        if not self.retriever:
+            return "", []
+        source_documents = await self._retrieve(query, k=k)
+        sources = []
+        for d in source_documents[:3]:
+            meta = d.metadata or {}
+            page = meta.get("page", "")
+            source = meta.get("source", "") or meta.get("file_path", "")
+            sources.append(f"{source}#page={page}" if page != "" else source)
+        return "\n\n".join(d.page_content for d in source_documents), sources
+
+    async def _itinerary_prompt(self, query: str) -> Tuple[Optional[str], List[str]]:
+        """The LLM prompt for an itinerary and the sources retrieved for it; no prompt without an LLM"""
+        enhanced_query = self._enhanced_query(query)
+
+        # If we have Gemini LLM but retrieval failed (due to embedding quota), use LLM directly
+        if self.llm and not self.retriever:
+            logger.info("Using Gemini LLM directly (retriever not available)")
+            prompt = (
+                "You are a travel assistant creating CONCISE, point-based travel itineraries.\n\n"
+                f"User Request: {enhanced_query}\n\n"
+                "CRITICAL FORMATTING RULES:\n"
+                "• Keep responses BRIEF - maximum 500 words\n"
+                "• Use bullet points (•) for ALL information\n"
+                "• Maximum 3-4 activities per day\n"
+                "• Keep descriptions to 1-2 sentences max\n"
+                "• Use emojis for visual appeal: 🌅 🍽️ 🏨 ✈️ 🏖️ 💰 ⏰ 🚗 ☀️ 🎒\n"
+                "• Add blank lines between sections for readability\n\n"
+                "REQUIRED STRUCTURE (keep it SHORT but complete):\n"
+                "# [Destination] Itinerary\n\n"
+                "## Day 1: [Theme]\n"
+                "• ⏰ Morning: [Activity] - [1 sentence]\n"
+                "• 🍽️ Lunch: [Restaurant name] - [Cuisine, price range]\n"
+                "• ⏰ Afternoon: [Activity] - [1 sentence]\n"
+                "• 🍽️ Dinner: [Restaurant name] - [Cuisine, price range]\n\n"
+                "## Day 2: [Theme]\n"
+                "[Same format]\n\n"
+                "## 🍽️ Restaurant & Dining\n"
+                "• [Restaurant 1] - [Cuisine, specialty, price]\n"
+                "• [Restaurant 2] - [Cuisine, specialty, price]\n\n"
+                "## � Transportation Tips\n"
+                "• [Local transport option 1]\n"
+                "• [Local transport option 2]\n"
+                "• [Getting around tip]\n\n"
+                "## �💰 Budget Estimates\n"
+                "• Accommodation: [Amount per night]\n"
+                "• Food: [Daily amount]\n"
+                "• Activities: [Daily amount]\n"
+                "• Transportation: [Daily amount]\n"
+                "• Total: [Approximate total]\n\n"
+                "## 🎯 Cultural Insights & Local Tips\n"
+                "• [Cultural custom 1]\n"
+                "• [Local etiquette tip]\n"
+                "• [Best time to visit attractions]\n\n"
+                "## ☀️ Weather & Packing\n"
+                "• Weather: [Season, temperature, conditions]\n"
+                "• Pack: [3-4 essential items]\n\n"
+                "Keep total under 500 words. Be specific but brief. ALWAYS include all sections."
+            )
+            return prompt, []
+        if self.llm and self.retriever:
+            logger.info("Using RAG retrieval with LLM generation")
+            context, sources = await self._context(enhanced_query)
+            return self.qa_prompt.format(context=context, question=enhanced_query), sources
+        return None, []
+
+    async def _outline(self, query: str, days: int) -> Tuple[Outline, List[str]]:
+        """A short trip outline (title, a theme per day, shared sections) and its sources"""
+        enhanced_query = self._enhanced_query(query)
+        context, sources = await self._context(enhanced_query)
+        with span("rag.outline", days=days):
+            text = await self._invoke_llm(OUTLINE_TEMPLATE.format(days=days, context=context, question=enhanced_query))
+        return parse_outline(text, days, self._extract_location(query)), sources
+
+    async def _day_sections(self, query: str, outline: Outline) -> AsyncIterator[str]:
+        """Write every day of the outline concurrently, yielding the sections in day order"""
+        semaphore = asyncio.Semaphore(DAY_CONCURRENCY)
+        location = self._extract_location(query)
+        plan = plan_summary(outline)
+        days = len(outline.themes)
+
+        async def write(day: int, theme: str) -> str:
+            async with semaphore:
+                with span("rag.day", day=day):
+                    try:
+                        # Retrieval for this day's theme rather than the whole trip
+                        context, _ = await self._context(f"{location} {theme}", k=2)
+                        text = await self._invoke_llm(DAY_TEMPLATE.format(
+                            days=days, day=day, theme=theme, context=context, question=query, plan=plan))
+                    except deadline.DeadlineExceeded:
+                        raise
+                    except Exception as e:
+                        logger.warning(f"Day {day} of the itinerary failed: {e}")
+                        text = "• Details for this day are unavailable right now; ask again to fill them in"
+            return day_section(day, theme, text)
+
+        tasks = [asyncio.create_task(write(day, theme)) for day, theme in sorted(outline.themes.items())]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @traced("rag.generate_itinerary")
     async def generate_itinerary(self, query: str) -> Dict[str, Any]:
         try:
-            # Create enhanced query with flight and hotel data
-            enhanced_query = query
-            
-            # Add flight information if available
-            if self.flight_data:
-                flight_info = self._format_flight_info()
-                enhanced_query += f"\n\nFlight Information:\n{flight_info}"
-            
-            # Add hotel information if available
-            if self.hotel_data:
-                hotel_info = self._format_hotel_info()
-                enhanced_query += f"\n\nHotel Information:\n{hotel_info}"
-            
-            # If we have Gemini LLM but QA chain failed (due to embedding quota), use LLM directly
-            if self.llm and not self.qa_chain:
-                logger.info("Using Gemini LLM directly (QA chain not available)")
-                prompt = (
-                    "You are a travel assistant creating CONCISE, point-based travel itineraries.\n\n"
-                    f"User Request: {enhanced_query}\n\n"
-                    "CRITICAL FORMATTING RULES:\n"
-                    "• Keep responses BRIEF - maximum 500 words\n"
-                    "• Use bullet points (•) for ALL information\n"
-                    "• Maximum 3-4 activities per day\n"
-                    "• Keep descriptions to 1-2 sentences max\n"
-                    "• Use emojis for visual appeal: 🌅 🍽️ 🏨 ✈️ 🏖️ 💰 ⏰ 🚗 ☀️ 🎒\n"
-                    "• Add blank lines between sections for readability\n\n"
-                    "REQUIRED STRUCTURE (keep it SHORT but complete):\n"
-                    "# [Destination] Itinerary\n\n"
-                    "## Day 1: [Theme]\n"
-                    "• ⏰ Morning: [Activity] - [1 sentence]\n"
-                    "• 🍽️ Lunch: [Restaurant name] - [Cuisine, price range]\n"
-                    "• ⏰ Afternoon: [Activity] - [1 sentence]\n"
-                    "• 🍽️ Dinner: [Restaurant name] - [Cuisine, price range]\n\n"
-                    "## Day 2: [Theme]\n"
-                    "[Same format]\n\n"
-                    "## 🍽️ Restaurant & Dining\n"
-                    "• [Restaurant 1] - [Cuisine, specialty, price]\n"
-                    "• [Restaurant 2] - [Cuisine, specialty, price]\n\n"
-                    "## � Transportation Tips\n"
-                    "• [Local transport option 1]\n"
-                    "• [Local transport option 2]\n"
-                    "• [Getting around tip]\n\n"
-                    "## �💰 Budget Estimates\n"
-                    "• Accommodation: [Amount per night]\n"
-                    "• Food: [Daily amount]\n"
-                    "• Activities: [Daily amount]\n"
-                    "• Transportation: [Daily amount]\n"
-                    "• Total: [Approximate total]\n\n"
-                    "## 🎯 Cultural Insights & Local Tips\n"
-                    "• [Cultural custom 1]\n"
-                    "• [Local etiquette tip]\n"
-                    "• [Best time to visit attractions]\n\n"
-                    "## ☀️ Weather & Packing\n"
-                    "• Weather: [Season, temperature, conditions]\n"
-                    "• Pack: [3-4 essential items]\n\n"
-                    "Keep total under 500 words. Be specific but brief. ALWAYS include all sections."
-                )
-                answer = self.llm.invoke(prompt).content
-                sources = []
-            elif self.qa_chain:
-                logger.info("Using QA chain with RAG retrieval")
-                result = self.qa_chain({"query": enhanced_query})
-                answer = result.get("result", "")
-                sources = []
-                for d in result.get("source_documents", [])[:3]:
-                    meta = d.metadata or {}
-                    page = meta.get("page", "")
-                    source = meta.get("source", "") or meta.get("file_path", "")
-                    sources.append(f"{source}#page={page}" if page != "" else source)
+            duration = self._extract_duration(query)
+            if self.llm and duration >= PARALLEL_DAYS_MIN:
+                # Long trips: outline first, then the days side by side
+                outline, sources = await self._outline(query, duration)
+                answer = assemble(outline, [section async for section in self._day_sections(query, outline)])
             else:
-                return self._generate_fallback_itinerary(query)
-            
+                prompt, sources = await self._itinerary_prompt(query)
+                if prompt is None:
+                    return self._generate_fallback_itinerary(query)
+                answer = await self._invoke_llm(prompt)
+
             location = self._extract_location(query)
             preferences = self._extract_preferences(query)
             
@@ -394,39 +494,34 @@ class RAGAgent:
                 "location": location,
                 "preferences": preferences,
                 "sources": sources,
-                "flight_data": self.flight_data,
+                "flight_data": serialize_result(self.flight_data),
                 "hotel_data": self.hotel_data
             }
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             return {"error": str(e), "itinerary": "An error occurred while generating your response."}
+
+    async def stream_itinerary(self, query: str) -> AsyncIterator[str]:
+        """generate_itinerary's text, yielded as the LLM writes it"""
+        duration = self._extract_duration(query)
+        if self.llm and duration >= PARALLEL_DAYS_MIN:
+            outline, _ = await self._outline(query, duration)
+            yield outline.title
+            async for section in self._day_sections(query, outline):
+                yield "\n\n" + section
+            if outline.shared:
+                yield "\n\n" + outline.shared
+            return
+        prompt, _ = await self._itinerary_prompt(query)
+        if prompt is None:
+            yield self._generate_fallback_itinerary(query)["itinerary"]
+            return
+        async for text in self._stream_llm(prompt):
+            yield text
     
     def _extract_location(self, query: str) -> str:
-        query_lower = query.lower()
-        
-        destinations = {
-            'paris': 'Paris, France',
-            'london': 'London, UK',
-            'new york': 'New York, USA',
-            'tokyo': 'Tokyo, Japan',
-            'dubai': 'Dubai, UAE',
-            'singapore': 'Singapore',
-            'bangkok': 'Bangkok, Thailand',
-            'rome': 'Rome, Italy',
-            'barcelona': 'Barcelona, Spain',
-            'amsterdam': 'Amsterdam, Netherlands',
-            'maldives': 'Maldives',
-            'bali': 'Bali, Indonesia',
-            'sydney': 'Sydney, Australia',
-            'mumbai': 'Mumbai, India',
-            'istanbul': 'Istanbul, Turkey'
-        }
-        
-        for keyword, location in destinations.items():
-            if keyword in query_lower:
-                return location
-        
-        return "Not specified"
+        place = get_gazetteer().find_in_text(query)
+        return place.display_name if place else "Not specified"
     
     def _extract_preferences(self, query: str) -> List[str]:
         query_lower = query.lower()
@@ -458,7 +553,12 @@ class RAGAgent:
     def _extract_duration(self, query: str) -> int:
         query_lower = query.lower()
         
-        if any(word in query_lower for word in ['weekend', '2-day', 'two day']):
+        # Longer trips first: "14 days" also contains "4 days", "2 weeks" contains "week"
+        if any(word in query_lower for word in ['2 weeks', 'two weeks', '14-day', '14 days']):
+            return 14
+        elif any(word in query_lower for word in ['10-day', 'ten day', '10 days']):
+            return 10
+        elif any(word in query_lower for word in ['weekend', '2-day', 'two day']):
             return 2
         elif any(word in query_lower for word in ['3-day', 'three day', '3 days']):
             return 3
@@ -468,10 +568,6 @@ class RAGAgent:
             return 5
         elif any(word in query_lower for word in ['week', '7-day', 'seven day', '7 days']):
             return 7
-        elif any(word in query_lower for word in ['10-day', 'ten day', '10 days']):
-            return 10
-        elif any(word in query_lower for word in ['2 weeks', 'two weeks', '14 days']):
-            return 14
         else:
             return 5
 
@@ -602,7 +698,7 @@ class RAGAgent:
         
         itinerary = f"**Complete Travel Plan for {location or 'your destination'}**\n\n"
         
-        if self.flight_data and self.flight_data.get('data'):
+        if offers_for(self.flight_data):
             flight_info = self._format_flight_info()
             itinerary += f"**Available Flights:**\n{flight_info}\n\n"
         
@@ -641,7 +737,7 @@ class RAGAgent:
             "location": location,
             "preferences": preferences,
             "sources": [],
-            "flight_data": self.flight_data,
+            "flight_data": serialize_result(self.flight_data),
             "hotel_data": self.hotel_data
         }
 
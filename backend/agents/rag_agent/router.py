@@ -0,0 +1,248 @@
+"""
+Latency-aware routing across several LLM providers.
+
+With more than one provider configured (LLM_PROVIDERS=gemini,openai) the
+agent's llm is an LLMRouter. It looks like a langchain LLM (ainvoke and
+astream) and keeps rolling statistics per provider: time to first token,
+error rate and a circuit breaker. Each request streams from the fastest
+healthy provider. If no first token has arrived by that provider's p95, the
+same prompt is hedged to the next provider; whichever produces a first token
+first is kept and the other is cancelled. A provider that fails before its
+first token is replaced by the next one straight away.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from agents.rag_agent.providers import build_provider
+from core.resilience import CircuitBreaker, CircuitOpenError
+from core.tracing import set_attribute, span
+
+logger = logging.getLogger(__name__)
+
+# Bounds on how long the first provider gets before the request is hedged
+HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1.0"))
+HEDGE_MAX_SECONDS = float(os.getenv("LLM_HEDGE_MAX_SECONDS", "10.0"))
+# Samples needed before a provider's own p95 is trusted over HEDGE_MAX_SECONDS
+MIN_SAMPLES = 5
+
+
+class Backend:
+    """One provider's LLM client and its rolling statistics"""
+
+    def __init__(self, name: str, llm: Any, window: int = 100):
+        self.name = name
+        self.llm = llm
+        # Seconds to first token; losers that were cancelled add how long they had waited
+        self.first_token: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.breaker = CircuitBreaker(f"llm:{name}", failure_threshold=3, reset_timeout=30.0)
+        self.calls = 0
+        self.wins = 0
+        self.hedges = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.first_token:
+            return None
+        ordered = sorted(self.first_token)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self) -> Optional[float]:
+        """Typical time to first token, inflated by recent errors; None until measured"""
+        median = self.percentile(0.5)
+        return None if median is None else median * (1 + 4 * self.error_rate())
+
+    def hedge_after(self) -> float:
+        p95 = self.percentile(0.95)
+        if p95 is None or len(self.first_token) < MIN_SAMPLES:
+            return HEDGE_MAX_SECONDS
+        return min(max(p95, HEDGE_MIN_SECONDS), HEDGE_MAX_SECONDS)
+
+    def record_error(self):
+        self.errors += 1
+        self.outcomes.append(False)
+        self.breaker.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "name": self.name,
+            "circuit": self.breaker.state,
+            "first_token_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "first_token_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_after_ms": round(self.hedge_after() * 1000, 1),
+            "error_rate": round(self.error_rate(), 3),
+            "calls": self.calls,
+            "wins": self.wins,
+            "hedges": self.hedges,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+        }
+
+
+def _text(chunk: Any) -> str:
+    # Chat models stream message chunks, completion models (Bedrock) strings
+    return chunk.content if hasattr(chunk, "content") else str(chunk)
+
+
+class LLMRouter:
+    upstream = "llm_router"
+
+    def __init__(self, llms: Dict[str, Any], window: int = 100):
+        self.backends = [Backend(name, llm, window) for name, llm in llms.items()]
+
+    def ranked(self) -> List[Backend]:
+        """Measured providers fastest first, then unmeasured ones in configured order"""
+        order = {backend.name: i for i, backend in enumerate(self.backends)}
+        return sorted(self.backends, key=lambda b: (b.score() is None, b.score() or 0.0, order[b.name]))
+
+    async def ainvoke(self, prompt: str) -> str:
+        return "".join([_text(chunk) async for chunk in self.astream(prompt)])
+
+    async def astream(self, prompt: str) -> AsyncIterator[Any]:
+        backend, first, stream = await self._race(prompt)
+        finished = False
+        try:
+            if first is not None:
+                yield first
+            async for chunk in stream:
+                yield chunk
+            finished = True
+        except Exception:
+            backend.record_error()
+            raise
+        finally:
+            if finished:
+                backend.outcomes.append(True)
+                backend.breaker.record_success()
+            else:
+                backend.breaker.release_probe()
+            await _close(stream)
+
+    async def _race(self, prompt: str) -> Tuple[Backend, Any, AsyncIterator[Any]]:
+        """Start on the best provider, hedge or fail over to the next, keep the first to answer"""
+        candidates = iter(self.ranked())
+        pending: Dict[asyncio.Task, Backend] = {}
+        errors: List[Exception] = []
+
+        def launch(hedge: bool) -> Optional[Backend]:
+            for backend in candidates:
+                try:
+                    backend.breaker.before_call()
+                except CircuitOpenError as e:
+                    errors.append(e)
+                    continue
+                backend.calls += 1
+                if hedge:
+                    backend.hedges += 1
+                pending[asyncio.create_task(self._first_chunk(backend, prompt, hedge))] = backend
+                return backend
+            return None
+
+        primary = launch(hedge=False)
+        hedge_at = time.monotonic() + primary.hedge_after() if primary else None
+        try:
+            while pending:
+                timeout = max(hedge_at - time.monotonic(), 0) if hedge_at is not None else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # No first token by the primary's p95: ask the next provider too
+                    hedge_at = None
+                    hedged = launch(hedge=True)
+                    if hedged:
+                        logger.info(f"Hedging LLM request from {primary.name} to {hedged.name}")
+                    continue
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is None:
+                        backend.wins += 1
+                        set_attribute("llm_provider", backend.name)
+                        set_attribute("llm_hedged", backend is not primary)
+                        return task.result()
+                    errors.append(task.exception())
+                    logger.warning(f"LLM provider {backend.name} failed: {task.exception()}")
+                if not pending:
+                    hedge_at = None
+                    launch(hedge=False)
+        finally:
+            for task, backend in pending.items():
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    # Also answered in the same wakeup as the winner; its stream is not needed
+                    backend.breaker.release_probe()
+                    asyncio.ensure_future(_close(task.result()[2]))
+        if errors:
+            raise errors[-1]
+        raise CircuitOpenError("No LLM provider is available")
+
+    async def _first_chunk(self, backend: Backend, prompt: str, hedge: bool) -> Tuple[Backend, Any, AsyncIterator[Any]]:
+        started = time.monotonic()
+        stream = backend.llm.astream(prompt).__aiter__()
+        with span("llm.first_token", upstream=backend.name, hedge=hedge):
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                first = None  # an empty response still counts as an answer
+            except asyncio.CancelledError:
+                # Lost the race; it took at least this long
+                backend.cancelled += 1
+                backend.first_token.append(time.monotonic() - started)
+                backend.breaker.release_probe()
+                await _close(stream)
+                raise
+            except Exception:
+                backend.record_error()
+                await _close(stream)
+                raise
+        backend.first_token.append(time.monotonic() - started)
+        return backend, first, stream
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [backend.stats() for backend in self.ranked()]
+
+
+async def _close(stream: AsyncIterator[Any]):
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            pass
+
+
+def build_llm(names: Sequence[str], options: Dict[str, Any]) -> Tuple[str, Any, Any]:
+    """
+    Build every named provider. Returns the name of the provider whose
+    embeddings are used (the first that built), those embeddings, and the
+    LLM: that provider's own when only one built, otherwise an LLMRouter.
+    """
+    llms: Dict[str, Any] = {}
+    embedding_provider, embeddings = None, None
+    failures = []
+    for name in names:
+        try:
+            provider_embeddings, llm = build_provider(name, options)
+        except Exception as e:
+            if len(names) == 1:
+                raise
+            logger.warning(f"LLM provider {name} unavailable: {e}")
+            failures.append(f"{name}: {e}")
+            continue
+        llms[name] = llm
+        if embeddings is None:
+            embedding_provider, embeddings = name, provider_embeddings
+    if not llms:
+        raise ValueError(f"No LLM provider could be built ({'; '.join(failures)})")
+    if len(llms) == 1:
+        return embedding_provider, embeddings, llms[embedding_provider]
+    logger.info(f"Routing LLM requests across {', '.join(llms)}")
+    return embedding_provider, embeddings, LLMRouter(llms)
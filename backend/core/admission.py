@@ -0,0 +1,169 @@
+"""
+Admission control per endpoint class.
+
+Each endpoint belongs to a class (LLM generation, upstream search, cheap
+reads) with its own concurrency limit and a bounded FIFO queue in front of
+it, so a burst of slow LLM calls fills only the LLM class while searches
+and reads keep their latency. A request that finds the queue full is shed
+at once with a 429; one that waits longer than the class's queue timeout
+(or the rest of its deadline) is shed with a 503. Both carry a Retry-After
+estimated from how long requests in the class have recently held a slot.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+from core import deadline
+from core.tracing import set_attribute
+
+logger = logging.getLogger(__name__)
+
+
+class Shed(Exception):
+    """Raised by AdmissionClass.acquire() when a request is turned away"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionClass:
+    def __init__(self, name: str, max_concurrency: int, max_queued: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._hold_time = 1.0  # moving average of seconds a request holds a slot
+        self.admitted = 0
+        self.shed_full = 0
+        self.shed_timeout = 0
+
+    @classmethod
+    def from_env(cls, name: str, max_concurrency: int, max_queued: int, queue_timeout: float) -> "AdmissionClass":
+        """Defaults overridable with ADMISSION_<NAME>_CONCURRENCY, _QUEUE and _QUEUE_TIMEOUT"""
+        prefix = f"ADMISSION_{name.upper()}"
+        return cls(name,
+                   int(os.getenv(f"{prefix}_CONCURRENCY", str(max_concurrency))),
+                   int(os.getenv(f"{prefix}_QUEUE", str(max_queued))),
+                   float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", str(queue_timeout))))
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        """Rough time until a newly queued request would get a slot"""
+        backlog = self.queued + 1
+        return max(1.0, round(self._hold_time * backlog / max(self.max_concurrency, 1), 1))
+
+    async def acquire(self):
+        """Take a slot, queueing for one if needed; raises Shed when turned away"""
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.queued >= self.max_queued:
+            self.shed_full += 1
+            raise Shed(429, f"Too many {self.name} requests in progress", self.retry_after())
+
+        wait = self.queue_timeout
+        left = deadline.remaining()
+        if left is not None:
+            wait = min(wait, left)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), max(wait, 0))
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                self.shed_timeout += 1
+                raise Shed(503, f"Timed out waiting for a {self.name} slot", self.retry_after())
+            # The slot was handed over just as the wait ran out; keep it
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()  # pass on the slot we were just given
+            else:
+                self._waiters.remove(waiter)
+            raise
+        self.admitted += 1
+        set_attribute("admission_wait_ms", round((time.monotonic() - started) * 1000, 1))
+
+    def release(self, held: Optional[float] = None):
+        """Free a slot, handing it straight to the longest-waiting request"""
+        if held is not None:
+            self._hold_time = 0.8 * self._hold_time + 0.2 * held
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot passes over without dropping active
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "in_flight": self.active,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queued": self.max_queued,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_full,
+            "shed_queue_timeout": self.shed_timeout,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting each HTTP request through its endpoint's
+    class. endpoint_classes maps paths to class names; other paths use the
+    default class, and exempt paths (health and metrics) skip admission.
+    Add it inside DeadlineMiddleware so queueing counts against the deadline.
+    """
+
+    def __init__(self, app, classes: Iterable[AdmissionClass], endpoint_classes: Dict[str, str],
+                 default_class: str, exempt: Iterable[str] = ()):
+        self.app = app
+        self.classes = {admission.name: admission for admission in classes}
+        self.endpoint_classes = endpoint_classes
+        self.default_class = default_class
+        self.exempt = set(exempt)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path in self.exempt or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        admission = self.classes[self.endpoint_classes.get(path, self.default_class)]
+        set_attribute("admission_class", admission.name)
+        try:
+            await admission.acquire()
+        except Shed as e:
+            logger.warning(f"Shed {scope['method']} {path} ({admission.name}): {e.reason}")
+            await self._reject(send, e)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(time.monotonic() - started)
+
+    @staticmethod
+    async def _reject(send, shed: Shed):
+        body = f'{{"success":false,"error":"{shed.reason}"}}'.encode()
+        await send({"type": "http.response.start", "status": shed.status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"retry-after", str(int(shed.retry_after + 0.999)).encode())]})
+        await send({"type": "http.response.body", "body": body})
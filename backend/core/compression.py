@@ -0,0 +1,152 @@
+"""
+Negotiated gzip/brotli response compression.
+
+Picks the best encoding the client accepts: brotli when the optional
+brotli package is installed, otherwise gzip. Whole bodies are compressed
+in one go. Streamed bodies are compressed chunk by chunk and flushed, so
+the client still receives data as it is produced.
+"""
+import gzip
+import zlib
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this gain little and cost a compression call
+MIN_COMPRESS_SIZE = 500
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """The preferred supported encoding the client accepts, or None"""
+    accepted = _accepted_encodings(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:  # server preference breaks ties
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=5)  # favours speed; 11 is far slower
+        else:
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        # Without an acceptable encoding the body passes through untouched, but
+        # compressible responses still get Vary so caches keep the variants apart
+        encoding = choose_encoding(accept) if accept else None
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                elif encoding is None:
+                    passthrough = True
+                    await send(_with_vary(message))
+                else:
+                    start_message = message  # held until we know the body size
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None and start_message is not None:
+                if not more_body:
+                    # Whole body in one message: compress only if it is worth it
+                    if len(body) < self.minimum_size:
+                        await send(_with_vary(start_message))
+                        start_message = None
+                        await send(message)
+                        return
+                    compressed = compress_body(body, encoding)
+                    await send(_with_encoding(start_message, encoding, len(compressed)))
+                    start_message = None
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                compressor = _Compressor(encoding)
+                await send(_with_encoding(start_message, encoding, None))
+                start_message = None
+            await send({"type": "http.response.body", "body": compressor.compress(body, not more_body),
+                        "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _with_vary(start_message):
+    """The start message with Accept-Encoding added to its Vary header"""
+    vary = [v for k, v in start_message.get("headers", []) if k.lower() == b"vary"]
+    if any(b"accept-encoding" in v.lower() for v in vary):
+        return start_message
+    headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() != b"vary"]
+    headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+    return {**start_message, "headers": headers}
+
+
+def _with_encoding(start_message, encoding: str, content_length: Optional[int]):
+    headers = [(k, v) for k, v in _with_vary(start_message)["headers"] if k.lower() != b"content-length"]
+    headers.append((b"content-encoding", encoding.encode()))
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    return {**start_message, "headers": headers}
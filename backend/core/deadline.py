@@ -0,0 +1,190 @@
+"""
+Request deadlines propagated through the pipeline.
+
+The HTTP middleware sets one absolute deadline per request, from the
+endpoint's budget or an X-Request-Timeout header. It lives in a contextvar,
+so the orchestrator, the agents, retries and LLM calls all see it without
+extra arguments, and each caps its own timeout to the time that is left.
+The middleware cancels the request when the deadline passes or the client
+disconnects.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, Optional
+
+from core.tracing import set_attribute
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = b"x-request-timeout"
+DEFAULT_DEADLINE_SECONDS = 30.0
+# Clients may ask for less time than an endpoint's budget, never more than this
+MAX_DEADLINE_SECONDS = 120.0
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when the request deadline has passed before work could finish"""
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """Run the block under a deadline; a tighter enclosing deadline still applies"""
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield expires_at
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """Run the block without a deadline, e.g. work shared by several requests"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None if there is none"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def check():
+    """Raise DeadlineExceeded if the current deadline has already passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def timeout(default: float) -> float:
+    """A per-call timeout capped to the time left before the deadline"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, left)
+
+
+async def wait_for(awaitable: Awaitable[Any]) -> Any:
+    """Await under the current deadline, cancelling the work once it passes"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        # Close the coroutine so it doesn't warn about never being awaited
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        check()
+        raise
+
+
+def _parse_timeout_header(value: bytes) -> Optional[float]:
+    try:
+        seconds = float(value.decode("latin-1"))
+    except ValueError:
+        return None
+    return seconds if seconds > 0 else None
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving every HTTP request a deadline. The endpoint's
+    budget comes from endpoint_deadlines (by path); a client may shorten it
+    with the X-Request-Timeout header (seconds). Expired requests get a 504
+    if no response has started yet; disconnected clients just stop the work.
+    """
+
+    def __init__(self, app, endpoint_deadlines: Optional[Dict[str, float]] = None,
+                 default_seconds: float = DEFAULT_DEADLINE_SECONDS):
+        self.app = app
+        self.endpoint_deadlines = endpoint_deadlines or {}
+        self.default_seconds = default_seconds
+
+    def _budget(self, scope) -> float:
+        seconds = self.endpoint_deadlines.get(scope.get("path", ""), self.default_seconds)
+        for name, value in scope.get("headers", []):
+            if name == DEADLINE_HEADER:
+                requested = _parse_timeout_header(value)
+                if requested is not None:
+                    seconds = min(requested, seconds, MAX_DEADLINE_SECONDS)
+                break
+        return seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = self._budget(scope)
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response_started = False
+
+        async def pump_receive():
+            # Keep reading after the body so a client disconnect is noticed at once
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        with deadline(seconds):
+            set_attribute("deadline_seconds", seconds)
+            app_task = asyncio.ensure_future(self.app(scope, messages.get, send_wrapper))
+            receive_task = asyncio.ensure_future(pump_receive())
+            disconnect_task = asyncio.ensure_future(disconnected.wait())
+            try:
+                done, _ = await asyncio.wait({app_task, disconnect_task}, timeout=seconds,
+                                             return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                app_task.cancel()
+                raise
+            finally:
+                receive_task.cancel()
+                disconnect_task.cancel()
+
+        if app_task in done:
+            app_task.result()
+            return
+
+        app_task.cancel()
+        try:
+            await app_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        if disconnect_task in done:
+            logger.info(f"Client disconnected, cancelled {scope['method']} {scope['path']}")
+            return
+        logger.warning(f"Deadline of {seconds:.1f}s exceeded for {scope['method']} {scope['path']}")
+        if not response_started:
+            body = b'{"success":false,"error":"Request deadline exceeded"}'
+            await send({"type": "http.response.start", "status": 504,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,68 @@
+"""
+Shared pooled HTTP client for upstream APIs.
+
+One long-lived httpx.AsyncClient is shared by all agents, so connections
+(and TLS sessions) to Amadeus are kept alive and reused across requests
+instead of being set up for every call. HTTP/2 is used when the optional
+h2 package is installed (httpx[http2]). The app closes the client on
+shutdown. Tests route it to an in-process upstream with use_transport().
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP2_ENABLED = os.getenv("UPSTREAM_HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+# Per-call timeouts are further capped by the request deadline (see core.deadline)
+UPSTREAM_TIMEOUT = httpx.Timeout(30.0, connect=5.0, pool=5.0)
+UPSTREAM_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=60.0,
+)
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared upstream client, creating it on first use in this event loop"""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # Pooled connections belong to the loop that opened them
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(http2=HTTP2_ENABLED, timeout=UPSTREAM_TIMEOUT, limits=UPSTREAM_LIMITS)
+        _client_loop = loop
+        logger.info(f"Created shared upstream HTTP client (http2={HTTP2_ENABLED})")
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client and its pooled connections"""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed shared upstream HTTP client")
+    _client = None
+    _client_loop = None
+
+
+@asynccontextmanager
+async def use_transport(transport: httpx.AsyncBaseTransport) -> AsyncIterator[httpx.AsyncClient]:
+    """Send shared-client requests through transport for the block, then close it and restore the previous client"""
+    global _client, _client_loop
+    previous = _client, _client_loop
+    client = httpx.AsyncClient(transport=transport)
+    _client, _client_loop = client, asyncio.get_running_loop()
+    try:
+        yield client
+    finally:
+        await client.aclose()
+        _client, _client_loop = previous
@@ -0,0 +1,348 @@
+"""
+Background job queue for long-running requests such as itinerary generation.
+
+Submitting a job returns its id straight away; a fixed pool of worker tasks
+takes jobs from a priority queue (lower priority value first, FIFO within a
+priority) and runs the handler registered for the job's kind. The queue is
+bounded: once max_queued jobs are waiting, submit raises QueueFull so the
+endpoint can push back instead of piling up work. Job state lives in a
+small SQLite store, so status and results can be read from any worker
+process and survive a restart; unfinished jobs whose owning process has
+gone are picked up again when a queue starts. Other processes see each
+other's changes by polling the store: waiters every POLL_SECONDS, and the
+owner of a running job to notice it was cancelled elsewhere. A job's
+outcome is only recorded while it is unfinished, so the first outcome
+written (such as a cancellation) sticks.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from core import deadline
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+FINISHED = ("succeeded", "failed", "cancelled")
+# How often changes made by other processes are looked for
+POLL_SECONDS = 0.5
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is at capacity"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+def _process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_alive(owner: Optional[str]) -> bool:
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        # Another host's jobs are left to that host
+        return bool(owner)
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """SQLite table of jobs; calls run in a worker thread"""
+
+    COLUMNS = ("id", "kind", "status", "priority", "params", "result", "error", "owner",
+               "created_at", "started_at", "finished_at")
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, "
+                             "status TEXT NOT NULL, priority INTEGER NOT NULL, params TEXT NOT NULL, "
+                             "result TEXT, error TEXT, owner TEXT, created_at REAL NOT NULL, "
+                             "started_at REAL, finished_at REAL)")
+
+    def insert(self, job: Dict[str, Any]):
+        with self._lock, self._db:
+            self._db.execute(f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) "
+                             f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                             tuple(json.dumps(job[c]) if c in ("params", "result") else job.get(c)
+                                   for c in self.COLUMNS))
+
+    def start(self, job_id: str, started_at: float) -> bool:
+        """Mark a queued job running; False if it is no longer queued"""
+        with self._lock, self._db:
+            cursor = self._db.execute("UPDATE jobs SET status = 'running', started_at = ? "
+                                      "WHERE id = ? AND status = 'queued'", (started_at, job_id))
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, status: str, result: Any, error: Optional[str], finished_at: float) -> bool:
+        """Record a job's outcome; False if another outcome was recorded first"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                f"WHERE id = ? AND status NOT IN ({', '.join('?' * len(FINISHED))})",
+                (status, json.dumps(result, default=str), error, finished_at, job_id, *FINISHED))
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at")]
+        return [job for job in (self.get(job_id) for job_id in ids) if job]
+
+    def claim(self, job_id: str, previous_owner: Optional[str], owner: str) -> bool:
+        """Take over an orphaned job; only one process can win"""
+        with self._lock, self._db:
+            cursor = self._db.execute("UPDATE jobs SET owner = ?, status = 'queued' WHERE id = ? AND owner IS ? "
+                                      "AND status IN ('queued', 'running')", (owner, job_id, previous_owner))
+        return cursor.rowcount == 1
+
+    def prune(self, older_than: float):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (older_than,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobQueue:
+    def __init__(self, name: str, store_path: str, workers: int = 2, max_queued: int = 100,
+                 job_timeout: float = 300.0, retention: float = 86400.0):
+        self.name = name
+        self.store_path = store_path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.job_timeout = job_timeout
+        self.retention = retention
+        self._handlers: Dict[str, Handler] = {}
+        self._store: Optional[JobStore] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._durations: List[float] = []  # recent run times, for Retry-After estimates
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def register(self, kind: str, handler: Handler):
+        """Run handler(params) for jobs of this kind; its return value is the job's result"""
+        self._handlers[kind] = handler
+
+    @property
+    def started(self) -> bool:
+        return bool(self._worker_tasks)
+
+    async def start(self):
+        """Open the store, pick up orphaned jobs and start the workers"""
+        if self.started:
+            return
+        self._store = await asyncio.to_thread(JobStore, self.store_path)
+        await asyncio.to_thread(self._store.prune, time.time() - self.retention)
+        self._queue = asyncio.PriorityQueue()
+        owner = _process_id()
+        for job in await asyncio.to_thread(self._store.unfinished):
+            if job["owner"] != owner and _process_alive(job["owner"]):
+                continue
+            if await asyncio.to_thread(self._store.claim, job["id"], job["owner"], owner):
+                self._queue.put_nowait((job["priority"], next(self._sequence), job["id"]))
+                logger.info(f"{self.name}: resuming job {job['id']} ({job['kind']})")
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; jobs still queued or running are resumed by the next start"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self._store:
+            self._store.close()
+            self._store = None
+
+    def _retry_after(self) -> float:
+        typical = sorted(self._durations)[len(self._durations) // 2] if self._durations else 30.0
+        return max(1.0, round(typical * self._queue.qsize() / max(self.workers, 1), 1))
+
+    async def submit(self, kind: str, params: Dict[str, Any], priority: int = PRIORITIES["normal"]) -> Dict[str, Any]:
+        """Queue a job and return its record; raises QueueFull when at capacity"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        if not self.started:
+            raise RuntimeError(f"{self.name} is not running")
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            raise QueueFull(self._retry_after())
+        job = {"id": uuid.uuid4().hex, "kind": kind, "status": "queued", "priority": priority, "params": params,
+               "result": None, "error": None, "owner": _process_id(), "created_at": time.time(),
+               "started_at": None, "finished_at": None}
+        await asyncio.to_thread(self._store.insert, job)
+        self._queue.put_nowait((priority, next(self._sequence), job["id"]))
+        self.submitted += 1
+        job["position"] = self._queue.qsize()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._store.get, job_id) if self._store else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait up to timeout seconds for the job's status to change, then return
+        it. Changes made here wake the waiter at once; jobs run by another
+        process are polled every POLL_SECONDS, since their events aren't seen here.
+        """
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+        status = job["status"]
+        stop_at = time.monotonic() + timeout
+        while True:
+            left = stop_at - time.monotonic()
+            if left <= 0:
+                return job
+            event = self._changed.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), min(left, POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            job = await self.get(job_id)
+            if job is None or job["status"] != status:
+                return job
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job. A job running in another process is
+        stopped by that process when it next polls the store.
+        """
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+        if await self._finish(job_id, "cancelled", error="Cancelled by client"):
+            task = self._running.get(job_id)
+            if task:
+                self._cancelled.add(job_id)
+                task.cancel()
+        return await self.get(job_id)
+
+    async def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> bool:
+        recorded = await asyncio.to_thread(self._store.finish, job_id, status, result, error, time.time())
+        self._notify(job_id)
+        return recorded
+
+    def _notify(self, job_id: str):
+        event = self._changed.pop(job_id, None)
+        if event:
+            event.set()
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.name}: job {job_id} could not be run: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self.get(job_id)
+        if job is None or job["status"] != "queued":
+            return  # cancelled while waiting
+        started = time.time()
+        if not await asyncio.to_thread(self._store.start, job_id, started):
+            return  # cancelled by another process since
+        self._notify(job_id)
+        task = asyncio.create_task(self._call(job))
+        self._running[job_id] = task
+        watcher = asyncio.create_task(self._watch(job_id, task))
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job_id not in self._cancelled:
+                raise  # the worker is stopping; the job is resumed on the next start
+            self._cancelled.discard(job_id)
+            return  # cancel() already recorded the outcome
+        except Exception as e:
+            logger.warning(f"{self.name}: job {job_id} failed: {e}")
+            if await self._finish(job_id, "failed", error=str(e) or type(e).__name__):
+                self.failed += 1
+            return
+        finally:
+            self._running.pop(job_id, None)
+            watcher.cancel()
+        self._durations = (self._durations + [time.time() - started])[-50:]
+        # Handlers report errors they caught themselves as {"error": ...}
+        error = result.get("error") if isinstance(result, dict) else None
+        if error:
+            logger.warning(f"{self.name}: job {job_id} failed: {error}")
+            if await self._finish(job_id, "failed", result=result, error=str(error)):
+                self.failed += 1
+        elif await self._finish(job_id, "succeeded", result=result):
+            self.succeeded += 1
+
+    async def _watch(self, job_id: str, task: asyncio.Task):
+        """Stop a running job once another process has recorded its cancellation"""
+        while not task.done():
+            await asyncio.sleep(POLL_SECONDS)
+            job = await self.get(job_id)
+            if job is not None and job["status"] == "cancelled" and not task.done():
+                self._cancelled.add(job_id)
+                task.cancel()
+                return
+
+    async def _call(self, job: Dict[str, Any]) -> Any:
+        # Jobs outlive the request that submitted them, so they get their own budget
+        with deadline.detached(), deadline.deadline(self.job_timeout):
+            with span("job.run", kind=job["kind"], queue=self.name):
+                return await deadline.wait_for(self._handlers[job["kind"]](job["params"]))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": len(self._running),
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,376 @@
+"""
+Streaming markdown normalizer for LLM responses.
+
+Produces exactly what the original chain of regex passes in
+main.preprocess_markdown did (horizontal rules dropped, heading and bullet
+spacing, "***" bold markers, bold labels, blank lines and trailing
+whitespace), but in one line-oriented pass that can be fed while tokens
+arrive. Each pass became a small stage holding only the state its pattern
+needs across lines; a line is released as soon as no later text can change
+it, so apart from the line being written only a few lines of look-ahead are
+ever held. normalize_markdown(text) is the one-shot form.
+"""
+import re
+from typing import List, Optional, Tuple
+
+BULLET = "• "
+_STARS = re.compile(r"\*+")
+_MARKERS = ("-", "*", "#")
+
+
+def _hashes(line: str) -> int:
+    return len(line) - len(line.lstrip("#"))
+
+
+def _clean_line(line: str) -> str:
+    """Drop horizontal rules and put a space after heading hashes"""
+    first = line[:1]
+    if first == "-" or first == "*":
+        if len(line) >= 3 and line.count(first) == len(line):
+            return ""
+    elif first == "#":
+        level = _hashes(line)
+        if level <= 6 and level < len(line) and not line[level].isspace():
+            return f"{line[:level]} {line[level:]}"
+    return line
+
+
+class _HeadingSpacing:
+    r"""
+    A blank line before headings, as `\n(#{1,6}\s+[^\n]+)\n` -> `\n\n\1\n`
+    did. A heading with no text of its own matches through the blank lines
+    after it, so those are held until the next line with text.
+    """
+
+    def __init__(self):
+        self.skip = True  # the first line has no newline before it
+        self.pending: Optional[List[str]] = None  # heading, then lines its match may span
+        self.level = 0
+        self.text_seen = False
+
+    def feed(self, lines: List[str]) -> List[str]:
+        out: List[str] = []
+        append = out.append
+        for line in lines:
+            pending = self.pending
+            if pending is not None:
+                if not self.text_seen:
+                    pending.append(line)
+                    self.text_seen = bool(line) and not line.isspace()
+                    continue
+                # The heading's text is followed by a newline, so the heading matches
+                append("")
+                out.extend(pending)
+                self.pending = None
+                self.skip = True  # and that newline is used up
+            if self.skip or line[:1] != "#":
+                self.skip = False
+                append(line)
+                continue
+            level = _hashes(line)
+            if level <= 6 and (level == len(line) or line[level].isspace()):
+                self.pending = [line]
+                self.level = level
+                self.text_seen = bool(line[level:].strip())
+            else:
+                append(line)
+        return out
+
+    def close(self) -> List[str]:
+        pending, self.pending = self.pending, None
+        if pending is None:
+            return []
+        # The last held line ends the text; the match can still end at an earlier
+        # newline if there is a character after the heading's hashes to end on
+        if any(pending[1:-1]) or (len(pending) > 1 and len(pending[0]) - self.level >= 2):
+            return ["", *pending]
+        return pending
+
+
+class _Bullets:
+    r"""
+    `^<marker>\s+` -> `• `. The whitespace after the marker may run over
+    newlines, joining the next line with text onto the bullet.
+    """
+
+    def __init__(self, marker: str):
+        self.marker = marker
+        self.carry: Optional[str] = None  # the bullet so far while its whitespace continues
+        self.bare: Optional[str] = None  # the line as it was, if only its newline would match
+
+    def feed(self, lines: List[str]) -> List[str]:
+        marker = self.marker
+        out: List[str] = []
+        append = out.append
+        for line in lines:
+            prefix = self.carry
+            if prefix is None:
+                if line[:1] != marker:
+                    append(line)
+                    continue
+                prefix = ""
+            else:
+                self.bare = None
+                rest = line.lstrip()
+                if not rest:
+                    continue
+                self.carry = None
+                if len(rest) != len(line) or rest[:1] != marker:
+                    append(prefix + rest)
+                    continue
+                # Ends right at a line start, where the marker matches again
+            if len(line) == 1:
+                self.carry = prefix + BULLET
+                self.bare = prefix + line
+            elif line[1].isspace():
+                rest = line[2:].lstrip()
+                if rest:
+                    append(prefix + BULLET + rest)
+                else:
+                    self.carry = prefix + BULLET
+            else:
+                append(prefix + line)
+        return out
+
+    def close(self) -> List[str]:
+        if self.carry is None:
+            return []
+        line = self.bare if self.bare is not None else self.carry
+        self.carry = self.bare = None
+        return [line]
+
+
+class _BulletSpacing:
+    r"""
+    A blank line before bullets that follow text (`([^\n])\n(• )`) and
+    between a bullet and a following `##` heading (`(• [^\n]+)\n(#{2})`)
+    """
+
+    def __init__(self):
+        self.prev: Optional[str] = None
+        self.prev_matched = False
+
+    def feed(self, lines: List[str]) -> List[str]:
+        out: List[str] = []
+        append = out.append
+        prev, prev_matched = self.prev, self.prev_matched
+        for line in lines:
+            matched = False
+            if prev is not None:
+                first = line[:1]
+                if first == "•":
+                    # A bare "• " line that matched used up its last character
+                    matched = (line.startswith(BULLET) and prev != ""
+                               and not (prev_matched and prev == BULLET))
+                    if matched:
+                        append("")
+                elif first == "#" and line.startswith("##") and BULLET in prev[:-1]:
+                    append("")
+            append(line)
+            prev, prev_matched = line, matched
+        self.prev, self.prev_matched = prev, prev_matched
+        return out
+
+    def close(self) -> List[str]:
+        return []
+
+
+class _TripleStars:
+    r"""
+    `\*\*\*([^*]+)\*\*\*` -> `**\1**`. The text between may span lines, so
+    lines from an unmatched opening `***` on are held until the next run of
+    stars settles it.
+    """
+
+    def __init__(self):
+        self.held: List[Tuple[str, List[int]]] = []  # lines and the columns of stars to drop
+        self.opener: Optional[Tuple[int, int]] = None  # held line and column of an open ***
+
+    def feed(self, lines: List[str]) -> List[str]:
+        out: List[str] = []
+        append = out.append
+        held = self.held
+        for line in lines:
+            if self.opener is None and "***" not in line:
+                append(line)
+                continue
+            index = len(held)
+            drop: List[int] = []
+            held.append((line, drop))
+            for run in _STARS.finditer(line):
+                start, end = run.span()
+                stars = end - start
+                if self.opener is not None and stars >= 3:
+                    opened_at, column = self.opener
+                    held[opened_at][1].append(column)
+                    drop.append(start)
+                    stars -= 3
+                self.opener = (index, end - 3) if stars >= 3 else None
+            keep = self.opener[0] if self.opener else len(held)
+            out.extend(_drop_columns(text, columns) for text, columns in held[:keep])
+            del held[:keep]
+            if self.opener:
+                self.opener = (0, self.opener[1])
+        return out
+
+    def close(self) -> List[str]:
+        released = [_drop_columns(text, columns) for text, columns in self.held]
+        self.held = []
+        self.opener = None
+        return released
+
+
+def _drop_columns(text: str, columns: List[int]) -> str:
+    if not columns:
+        return text
+    parts, last = [], 0
+    for column in sorted(columns):
+        parts.append(text[last:column])
+        last = column + 1
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+class _BoldLabels:
+    r"""
+    `(\*\*[^*]+\*\*:)\s*\n` -> `\1\n`: a bold label ending its line loses the
+    trailing whitespace and any blank lines after it
+    """
+
+    def __init__(self):
+        self.prev_run: Optional[Tuple[int, bool]] = None  # length of the last star run, and if a match used it
+        self.held: Optional[Tuple[str, int]] = None  # label line waiting for its newline, and the colon column
+        self.swallowing = False
+        self.blank: Optional[str] = None  # the latest whitespace-only line while swallowing
+
+    def feed(self, lines: List[str]) -> List[str]:
+        out: List[str] = []
+        append = out.append
+        for line in lines:
+            if self.held is not None:
+                text, colon = self.held
+                self.held = None
+                append(text[:colon + 1])
+                self.swallowing = True
+            if self.swallowing:
+                if not line or line.isspace():
+                    self.blank = line
+                    continue
+                self.swallowing = False
+                self.blank = None
+            if "*" in line and self._label(line):
+                continue
+            append(line)
+        return out
+
+    def _label(self, line: str) -> bool:
+        """Track the line's last star run; hold the line if it ends in a label that can match"""
+        end = line.rfind("*") + 1
+        start = len(line[:end].rstrip("*"))
+        if (end - start == 2 and line[end:end + 1] == ":"
+                and (end + 1 == len(line) or line[end + 1:].isspace())):
+            before = line.rfind("*", 0, start) + 1
+            prev = (before - len(line[:before].rstrip("*")), False) if before else self.prev_run
+            if prev is not None and prev[0] >= 2 and not prev[1]:
+                self.prev_run = (2, True)
+                self.held = (line, end)
+                return True
+        self.prev_run = (end - start, False)
+        return False
+
+    def close(self) -> List[str]:
+        if self.held is not None:
+            text, _ = self.held
+            self.held = None
+            return [text]
+        # Whitespace after the last newline is kept
+        blank, self.blank = self.blank, None
+        self.swallowing = False
+        return [blank] if blank is not None else []
+
+
+class _Tail:
+    """Runs of empty lines collapsed to one, lines right-stripped, and the text stripped"""
+
+    def __init__(self):
+        self.started = False
+        self.collapsed = False  # empty lines seen since the last line with text
+        self.empty = 0  # empty lines to release before the next line with text
+
+    def feed(self, lines: List[str]) -> List[str]:
+        out: List[str] = []
+        append = out.append
+        for line in lines:
+            if not line:
+                self.collapsed = True
+                continue
+            empty = self.empty + self.collapsed
+            self.collapsed = False
+            line = line.rstrip()
+            if not line:
+                # Whitespace-only lines only become empty after the collapsing pass
+                self.empty = empty + 1
+                continue
+            self.empty = 0
+            if not self.started:
+                self.started = True
+                append(line.lstrip())
+                continue
+            if empty:
+                out.extend([""] * empty)
+            append(line)
+        return out
+
+    def close(self) -> List[str]:
+        return []
+
+
+class MarkdownNormalizer:
+    """
+    Incremental form of normalize_markdown: feed() text as it arrives and
+    send on what it returns, then send what close() returns. The pieces
+    concatenate to normalize_markdown of the whole text.
+    """
+
+    def __init__(self):
+        self._stages = [_HeadingSpacing(), _Bullets("*"), _Bullets("-"), _BulletSpacing(),
+                        _TripleStars(), _BoldLabels(), _Tail()]
+        self._partial = ""
+        self._emitted = False
+
+    def feed(self, chunk: str) -> str:
+        if "\n" not in chunk:
+            self._partial += chunk
+            return ""
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        return self._join(self._push([_clean_line(line) if line[:1] in _MARKERS else line for line in lines], 0))
+
+    def close(self) -> str:
+        released = self._push([_clean_line(self._partial)], 0)
+        self._partial = ""
+        for i, stage in enumerate(self._stages):
+            released.extend(self._push(stage.close(), i + 1))
+        return self._join(released)
+
+    def _push(self, lines: List[str], first: int) -> List[str]:
+        for stage in self._stages[first:]:
+            if not lines:
+                break
+            lines = stage.feed(lines)
+        return lines
+
+    def _join(self, lines: List[str]) -> str:
+        if not lines:
+            return ""
+        text = "\n".join(lines)
+        if self._emitted:
+            return "\n" + text
+        self._emitted = True
+        return text
+
+
+def normalize_markdown(text: str) -> str:
+    """Clean and format LLM markdown for the frontend"""
+    normalizer = MarkdownNormalizer()
+    return normalizer.feed(text) + normalizer.close()
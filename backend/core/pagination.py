@@ -0,0 +1,29 @@
+"""
+Opaque pagination cursors.
+
+A cursor is URL-safe base64 of a small JSON object, so clients pass it back
+unchanged and the server can change what it holds (an offset, or the sort
+key of the last item returned) without breaking the API.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, Optional
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The state in a cursor, None for no cursor; raises ValueError if malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
@@ -0,0 +1,244 @@
+"""
+Client-side protection for upstream APIs.
+
+Each UpstreamProvider wraps the shared HTTP client with:
+- a token-bucket rate limiter that queues callers instead of failing (one
+  limiter can be shared by several providers on the same API key quota),
+- a bulkhead capping concurrent calls, so one slow provider cannot take
+  capacity meant for another,
+- jittered exponential-backoff retries for idempotent requests on 429/5xx
+  and transport errors, honouring Retry-After and the request deadline,
+- a circuit breaker that fails fast while the provider is down and lets a
+  single probe through after reset_timeout to detect recovery.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from core import deadline
+from core.http_client import get_http_client
+from core.tracing import set_attribute
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.2
+BACKOFF_MAX_SECONDS = 5.0
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit is open"""
+
+
+class _LoopLocal:
+    """Lazily (re)creates asyncio primitives for the running event loop"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._loop = None
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        if self._value is None or self._loop is not loop:
+            self._value = self._factory()
+            self._loop = loop
+        return self._value
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = _LoopLocal(asyncio.Lock)  # FIFO queue of waiting callers
+        self.waiting = 0
+
+    async def acquire(self):
+        """Wait for a token; raises DeadlineExceeded if the wait would outlast the request"""
+        self.waiting += 1
+        try:
+            async with self._lock.get():
+                while True:
+                    now = time.monotonic()
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                    left = deadline.remaining()
+                    if left is not None and wait > left:
+                        raise deadline.DeadlineExceeded("Rate limit wait exceeds request deadline")
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} is temporarily unavailable")
+            self.state = "half_open"
+            logger.info(f"{self.name}: circuit half-open, probing")
+        if self.state == "half_open":
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} is temporarily unavailable")
+            self._probing = True
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"{self.name}: circuit closed")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"{self.name}: circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release_probe(self):
+        """A probe ended without an outcome (e.g. cancelled); let the next call probe"""
+        self._probing = False
+
+
+class UpstreamProvider:
+    def __init__(self, name: str, rate_limiter: TokenBucket, max_concurrency: int = 10,
+                 max_retries: int = 2, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self._bulkhead = _LoopLocal(lambda: asyncio.Semaphore(max_concurrency))
+        self.in_flight = 0
+        self.queued = 0
+        self.retries = 0
+
+    async def request(self, method: str, url: str, timeout: float = 30.0,
+                      retry: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """
+        Send a request through the limiter, bulkhead and breaker. timeout caps
+        each attempt and is further capped by the request deadline. Only
+        idempotent methods are retried unless retry=True.
+        """
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        attempts = self.max_retries + 1 if retry else 1
+        for attempt in range(attempts):
+            self.breaker.before_call()
+            try:
+                response = await self._send(method, url, timeout, **kwargs)
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                delay = self._backoff(attempt)
+                if attempt + 1 < attempts and self._fits_deadline(delay):
+                    logger.warning(f"{self.name}: {type(e).__name__}, retrying in {delay:.2f}s")
+                    await self._wait_before_retry(attempt, delay)
+                    continue
+                raise
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                delay = self._retry_after(response) or self._backoff(attempt)
+                if self._fits_deadline(delay):
+                    logger.warning(f"{self.name}: HTTP {response.status_code}, retrying in {delay:.2f}s")
+                    await self._wait_before_retry(attempt, delay)
+                    continue
+            return response
+
+    async def _send(self, method: str, url: str, timeout: float, **kwargs) -> httpx.Response:
+        self.queued += 1
+        try:
+            bulkhead = self._bulkhead.get()
+            await bulkhead.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            await self.rate_limiter.acquire()
+            self.in_flight += 1
+            try:
+                return await get_http_client().request(method, url, timeout=deadline.timeout(timeout), **kwargs)
+            finally:
+                self.in_flight -= 1
+        finally:
+            bulkhead.release()
+
+    async def _wait_before_retry(self, attempt: int, delay: float):
+        self.retries += 1
+        set_attribute("retries", attempt + 1)
+        await asyncio.sleep(delay)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # Full jitter keeps retries from many callers from arriving in lockstep
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            return min(float(response.headers.get("Retry-After", "")), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _fits_deadline(delay: float) -> bool:
+        left = deadline.remaining()
+        return left is None or delay < left
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring upstream pressure and health"""
+        return {
+            "name": self.name,
+            "circuit": self.breaker.state,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rate_limit_waiting": self.rate_limiter.waiting,
+            "retries": self.retries,
+            "rejected": self.breaker.rejected,
+        }
+
+
+_rate_limiters: Dict[str, TokenBucket] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, burst: int = 1) -> TokenBucket:
+    """Return the process-wide limiter for a quota, creating it on first use"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(name)
+        if limiter is None:
+            limiter = _rate_limiters[name] = TokenBucket(rate, burst)
+    return limiter
@@ -0,0 +1,64 @@
+"""
+Lean JSON responses: a faster encoder and `fields=` projection.
+
+FastJSONResponse renders with orjson when it is installed and falls back
+to the standard library otherwise. project() trims a response down to the
+dotted field paths a client asked for, e.g.
+fields=hotels.name,hotels.geoCode,success keeps only those keys. Lists are
+projected element by element.
+"""
+import json
+from typing import Any, Dict, Iterable, Optional, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+FieldTree = Dict[str, "FieldTree"]
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_fields(fields: Union[str, Iterable[str], None]) -> Optional[FieldTree]:
+    """Turn "a.b,a.c,d" (or a list of paths) into {"a": {"b": {}, "c": {}}, "d": {}}"""
+    if not fields:
+        return None
+    paths = fields.split(",") if isinstance(fields, str) else fields
+    tree: FieldTree = {}
+    for path in paths:
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for part in path.split("."):
+            # Asking for a parent and one of its children keeps the whole parent
+            if part in node and not node[part]:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node.clear()
+    return tree or None
+
+
+def _apply(value: Any, tree: FieldTree) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, dict):
+        return {key: _apply(value[key], subtree) for key, subtree in tree.items() if key in value}
+    if isinstance(value, list):
+        return [_apply(item, tree) for item in value]
+    return value
+
+
+def project(data: Any, fields: Union[str, Iterable[str], None]) -> Any:
+    """Keep only the requested dotted field paths; None or "" returns data unchanged"""
+    tree = parse_fields(fields)
+    return _apply(data, tree) if tree else data
@@ -0,0 +1,78 @@
+"""
+Single-flight coalescing of identical in-flight async calls.
+
+Concurrent callers that ask for the same key share one execution of the
+underlying coroutine and all receive its result (or its exception). Nothing
+is cached: once the call completes, the next caller starts a fresh one.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from core import deadline
+from core.tracing import set_attribute
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = 0  # executions actually started
+        self.hits = 0   # callers that joined an execution already in flight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once per key at a time. The shared result object is returned to
+        every caller, so callers must treat it as read-only.
+        """
+        task = self._in_flight.get(key)
+        joined = task is not None
+        if not joined:
+            self.calls += 1
+            # Run as its own task so one caller going away doesn't cancel it for the others
+            task = asyncio.ensure_future(self._run(fn))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.hits += 1
+            logger.info(f"{self.name}: joining in-flight call for {key}")
+        set_attribute("single_flight_hit", joined)
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            # Each caller gives up at its own deadline without cancelling the shared call
+            return await deadline.wait_for(asyncio.shield(task))
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                # Nobody is left to receive the result. Forget it now rather than in the
+                # done callback, so a caller arriving meanwhile starts a fresh call
+                # instead of joining the cancelled one
+                if not task.done():
+                    task.cancel()
+                    self._forget(key, task)
+
+    @staticmethod
+    async def _run(fn: Callable[[], Awaitable[Any]]) -> Any:
+        # The shared call outlives any one caller's deadline; it is cancelled
+        # when the last caller leaves instead
+        with deadline.detached():
+            return await fn()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring how much upstream traffic is being coalesced"""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "hits": self.hits,
+            "in_flight": len(self._in_flight),
+            "waiters": sum(self._waiters.values()),
+        }
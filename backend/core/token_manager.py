@@ -0,0 +1,125 @@
+"""
+Shared OAuth2 client-credentials token manager.
+
+One manager per (token URL, client id) is shared by every agent instance,
+so a token is fetched once and reused until shortly before it expires
+rather than on every request. Tokens nearing expiry are refreshed in the
+background while the current one is still served, and concurrent refreshes
+are coalesced so a burst of requests makes a single auth call.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from core import deadline
+from core.http_client import get_http_client
+from core.single_flight import SingleFlight
+from core.tracing import set_attribute, span
+
+logger = logging.getLogger(__name__)
+
+# Treat tokens as expired this many seconds early to absorb clock skew and latency
+EXPIRY_MARGIN_SECONDS = 60
+# Start a background refresh once less than this share of the lifetime remains
+REFRESH_AHEAD_FRACTION = 0.2
+# Used when the token response has no expires_in
+DEFAULT_EXPIRES_IN = 1799
+TOKEN_TIMEOUT_SECONDS = 10.0
+
+
+class TokenError(Exception):
+    """Raised when an access token cannot be obtained"""
+
+
+class TokenManager:
+    def __init__(self, name: str, token_url: str, client_id: Optional[str], client_secret: Optional[str]):
+        self.name = name
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._coalescer = SingleFlight(f"{name}_token")
+        self.fetches = 0  # auth calls actually made
+
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    async def get_token(self) -> str:
+        """Return a valid access token, fetching one only if none is usable"""
+        now = time.monotonic()
+        if self._token and now < self._expires_at:
+            if now >= self._refresh_at:
+                self._schedule_refresh()
+            return self._token
+        return await self._refresh()
+
+    def invalidate(self, token: str):
+        """Drop a token the upstream rejected, unless it has already been replaced"""
+        if token == self._token:
+            self._token = None
+            self._expires_at = 0.0
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._background_refresh())
+
+    async def _background_refresh(self):
+        with deadline.detached():
+            try:
+                await self._refresh()
+            except Exception as e:
+                # The current token is still valid; the next caller will retry
+                logger.warning(f"{self.name}: background token refresh failed: {e}")
+
+    async def _refresh(self) -> str:
+        return await self._coalescer.do("token", self._fetch_token)
+
+    async def _fetch_token(self) -> str:
+        if not self.has_credentials:
+            raise TokenError(f"Missing {self.name} API credentials")
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+        }
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        with span(f"{self.name}.auth", upstream=self.name):
+            self.fetches += 1
+            try:
+                response = await get_http_client().post(self.token_url, data=data, headers=headers,
+                                                        timeout=deadline.timeout(TOKEN_TIMEOUT_SECONDS))
+            except Exception as e:
+                raise TokenError(f"{self.name} authentication error: {e}") from e
+            set_attribute("status_code", response.status_code)
+            if response.status_code != 200:
+                raise TokenError(f"{self.name} authentication failed: {response.text}")
+            token_data = response.json()
+
+        lifetime = float(token_data.get("expires_in") or DEFAULT_EXPIRES_IN)
+        now = time.monotonic()
+        self._token = token_data["access_token"]
+        self._expires_at = now + max(lifetime - EXPIRY_MARGIN_SECONDS, 0)
+        self._refresh_at = self._expires_at - lifetime * REFRESH_AHEAD_FRACTION
+        logger.info(f"{self.name}: obtained access token valid for {lifetime:.0f}s")
+        return self._token
+
+
+_managers: Dict[Tuple[str, Optional[str]], TokenManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_token_manager(name: str, token_url: str, client_id: Optional[str],
+                      client_secret: Optional[str]) -> TokenManager:
+    """Return the process-wide manager for these credentials; does no I/O"""
+    key = (token_url, client_id)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = TokenManager(name, token_url, client_id, client_secret)
+    return manager
@@ -0,0 +1,205 @@
+"""
+Lightweight span tracing and latency histograms for the request pipeline.
+
+Spans nest through contextvars, so they follow a request across awaits and
+into tasks it spawns. Every finished span feeds a per-stage latency
+histogram; spans that wrap an upstream call also feed a per-upstream one.
+Both are rendered in Prometheus text format by /metrics. Set
+TRACE_EXPORT_PATH to also append each finished trace as a JSON line.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; covers cache hits through long LLM generations
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "upstream", "attributes",
+                 "start", "duration", "status", "_trace")
+
+    def __init__(self, name: str, parent: Optional["Span"], upstream: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.upstream = upstream
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = 0.0
+        self.status = "ok"
+        # Finished spans of the whole trace, shared by reference with the root
+        self._trace: List["Span"] = parent._trace if parent else []
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "upstream": self.upstream,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._collectors = []
+
+    def observe(self, metric: str, labels: Dict[str, str], value: float):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def register_collector(self, collector):
+        """Register a callable returning [(metric, type, labels, value)] evaluated at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+        seen_types = set()
+        for (metric, labels), histogram in items:
+            if metric not in seen_types:
+                lines.append(f"# TYPE {metric} histogram")
+                seen_types.add(metric)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            prefix = f"{label_text}," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum{{{label_text}}} {histogram.total:.6f}")
+            lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for metric, metric_type, labels, value in samples:
+                if metric not in seen_types:
+                    lines.append(f"# TYPE {metric} {metric_type}")
+                    seen_types.add(metric)
+                label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+                lines.append(f"{metric}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+_export_lock = threading.Lock()
+
+
+def _export_trace(spans: List[Span]):
+    try:
+        line = json.dumps([s.to_dict() for s in spans], default=str)
+        with _export_lock, open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except Exception as e:
+        logger.warning(f"Failed to export trace: {e}")
+
+
+def _finish(span: Span):
+    metrics.observe("travel_stage_duration_seconds", {"stage": span.name}, span.duration)
+    if span.upstream:
+        status = str(span.attributes.get("status_code", span.status))
+        metrics.observe("travel_upstream_duration_seconds",
+                        {"upstream": span.upstream, "operation": span.name, "status": status},
+                        span.duration)
+    span._trace.append(span)
+    if span.parent_id is None and TRACE_EXPORT_PATH:
+        _export_trace(span._trace)
+
+
+@contextmanager
+def span(name: str, upstream: Optional[str] = None, **attributes) -> Iterator[Span]:
+    """Time a pipeline stage; pass upstream= for calls to an external service"""
+    parent = _current_span.get()
+    current = Span(name, parent, upstream, attributes)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        current.attributes.setdefault("error", str(e) or type(e).__name__)
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        _finish(current)
+
+
+def traced(name: str, upstream: Optional[str] = None):
+    """Decorator form of span() for sync and async functions"""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, upstream=upstream):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, upstream=upstream):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_attribute(key: str, value: Any):
+    """Set an attribute on the current span, if there is one"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attribute(key, value)
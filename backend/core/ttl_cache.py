@@ -0,0 +1,225 @@
+"""
+TTL cache with LRU eviction and stale-while-revalidate.
+
+Fresh entries are served straight from memory. Once an entry's TTL has
+passed it is still served for up to stale_ttl seconds, and a background
+refresh replaces it. Entries older than that are refetched before being
+served. An optional SQLite file keeps entries across restarts and is read
+when memory misses. Values must be JSON-serializable when persistence is
+on, and callers must treat returned values as read-only.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from core import deadline
+from core.tracing import set_attribute
+
+logger = logging.getLogger(__name__)
+
+
+class _PersistentTier:
+    """Small SQLite key/value store; calls run in a worker thread"""
+
+    def __init__(self, path: str, table: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.table = table
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                             "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT value, stored_at FROM {self.table} WHERE key = ?",
+                                   (key,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key: str, value: Any, stored_at: float):
+        with self._lock, self._db:
+            self._db.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+                             (key, json.dumps(value), stored_at))
+
+    def recent(self, newer_than: float, limit: int) -> List[Tuple[str, Any, float]]:
+        """Up to limit (key, value, stored_at) rows stored after newer_than, newest first"""
+        with self._lock:
+            rows = self._db.execute(f"SELECT key, value, stored_at FROM {self.table} WHERE stored_at >= ? "
+                                    "ORDER BY stored_at DESC LIMIT ?", (newer_than, limit)).fetchall()
+        return [(key, json.loads(value), stored_at) for key, value, stored_at in rows]
+
+    def prune(self, older_than: float):
+        with self._lock, self._db:
+            self._db.execute(f"DELETE FROM {self.table} WHERE stored_at < ?", (older_than,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0.0, max_entries: int = 1000,
+                 persist_path: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        # key -> (value, stored_at); wall-clock time so persisted entries age across restarts
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()  # strong refs so tasks aren't collected mid-run
+        self._persistent = _PersistentTier(persist_path, name) if persist_path else None
+        if self._persistent:
+            self._persistent.prune(time.time() - ttl - stale_ttl)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                           cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """
+        Return the cached value for key, calling fetch() on a miss. Only values
+        for which cacheable(value) is true are stored.
+        """
+        entry = self._entries.get(key)
+        if entry is None and self._persistent:
+            entry = await asyncio.to_thread(self._persistent.get, key)
+            if entry is not None:
+                self._store(key, entry[0], entry[1])
+
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age <= self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                set_attribute("cache", "hit")
+                return value
+            if age <= self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                set_attribute("cache", "stale")
+                self._schedule_refresh(key, fetch, cacheable)
+                return value
+
+        self.misses += 1
+        set_attribute("cache", "miss")
+        value = await fetch()
+        if cacheable(value):
+            await self._put(key, value)
+        return value
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Fresh values for those keys that have one. Stale and missing keys are
+        left out for the caller to fetch together and store with put_many().
+        """
+        now = time.time()
+        found: Dict[str, Any] = {}
+        unresolved = [key for key in keys if key not in self._entries]
+        if unresolved and self._persistent:
+            rows = await asyncio.to_thread(lambda: {key: self._persistent.get(key) for key in unresolved})
+            for key, entry in rows.items():
+                if entry is not None:
+                    self._store(key, entry[0], entry[1])
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                found[key] = entry[0]
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def put_many(self, items: Dict[str, Any]):
+        stored_at = time.time()
+        for key, value in items.items():
+            self._store(key, value, stored_at)
+        if self._persistent and items:
+            def persist():
+                for key, value in items.items():
+                    self._persistent.put(key, value, stored_at)
+            try:
+                await asyncio.to_thread(persist)
+            except Exception as e:
+                logger.warning(f"{self.name}: failed to persist cache entries: {e}")
+
+    async def prefill(self, limit: Optional[int] = None) -> int:
+        """
+        Load the most recently stored entries that can still be served from
+        the persistent tier into memory, so the first requests after a
+        restart hit memory. Returns the number of entries loaded.
+        """
+        if not self._persistent:
+            return 0
+        limit = min(limit or self.max_entries, self.max_entries)
+        rows = await asyncio.to_thread(self._persistent.recent, time.time() - self.ttl - self.stale_ttl, limit)
+        # Oldest first, so the LRU order matches the stored order
+        for key, value, stored_at in reversed(rows):
+            if key not in self._entries:
+                self._store(key, value, stored_at)
+        return len(rows)
+
+    def _store(self, key: str, value: Any, stored_at: float):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _put(self, key: str, value: Any):
+        stored_at = time.time()
+        self._store(key, value, stored_at)
+        if self._persistent:
+            try:
+                await asyncio.to_thread(self._persistent.put, key, value, stored_at)
+            except Exception as e:
+                logger.warning(f"{self.name}: failed to persist cache entry: {e}")
+
+    def _schedule_refresh(self, key: str, fetch: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool]):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.ensure_future(self._refresh(key, fetch, cacheable))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool]):
+        # Runs after the triggering request has been answered, so no deadline applies
+        with deadline.detached():
+            try:
+                value = await fetch()
+                if cacheable(value):
+                    await self._put(key, value)
+            except Exception as e:
+                logger.warning(f"{self.name}: background refresh failed: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring cache effectiveness"""
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshing),
+        }
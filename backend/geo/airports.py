@@ -0,0 +1,198 @@
+"""
+Local IATA airport and metro-code index.
+
+Resolves user-supplied locations ("JFK", "Paris", "new york", "Bali") to IATA
+codes accepted by the Amadeus flight-offers API before any upstream call is
+made, so unresolvable requests are rejected locally.
+"""
+import gzip
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from geo.gazetteer import DATA_DIR, get_gazetteer, normalize
+from geo.kdtree import KDTree
+
+# Metropolitan-area codes accepted by Amadeus in place of a single airport
+METRO_CODES = {
+    "NYC": ("New York", "US", ["JFK", "EWR", "LGA"]),
+    "LON": ("London", "GB", ["LHR", "LGW", "STN", "LTN", "LCY", "SEN"]),
+    "PAR": ("Paris", "FR", ["CDG", "ORY", "BVA"]),
+    "TYO": ("Tokyo", "JP", ["HND", "NRT"]),
+    "OSA": ("Osaka", "JP", ["KIX", "ITM", "UKB"]),
+    "ROM": ("Rome", "IT", ["FCO", "CIA"]),
+    "MIL": ("Milan", "IT", ["MXP", "LIN", "BGY"]),
+    "WAS": ("Washington", "US", ["IAD", "DCA", "BWI"]),
+    "CHI": ("Chicago", "US", ["ORD", "MDW"]),
+    "YTO": ("Toronto", "CA", ["YYZ", "YTZ"]),
+    "YMQ": ("Montreal", "CA", ["YUL"]),
+    "BJS": ("Beijing", "CN", ["PEK", "PKX"]),
+    "SEL": ("Seoul", "KR", ["ICN", "GMP"]),
+    "MOW": ("Moscow", "RU", ["SVO", "DME", "VKO"]),
+    "STO": ("Stockholm", "SE", ["ARN", "BMA"]),
+    "BUE": ("Buenos Aires", "AR", ["EZE", "AEP"]),
+    "SAO": ("Sao Paulo", "BR", ["GRU", "CGH", "VCP"]),
+    "RIO": ("Rio de Janeiro", "BR", ["GIG", "SDU"]),
+    "JKT": ("Jakarta", "ID", ["CGK", "HLP"]),
+}
+
+# How far from a place we look for airports when no airport carries its name
+MAX_AIRPORT_DISTANCE_KM = 150
+MAX_CANDIDATES = 3
+# International and metro airports rank as if they were this much closer
+MAJOR_AIRPORT_BONUS_KM = 25
+# A city whose own airports are all minor (Vancouver Harbour) is served by a major one this close
+NEARBY_MAJOR_AIRPORT_KM = 20
+
+_CODE_RE = re.compile(r"^[A-Za-z]{3}$")
+_NON_CIVIL_RE = re.compile(r"\b(?:air ?base|RAF|air force|naval|army|military|heliport)\b", re.IGNORECASE)
+# Entity extraction can leave the preposition on ("From Paris")
+_LEADING_PREPOSITION_RE = re.compile(r"^(?:from|to|in|at|near|for)\s+", re.IGNORECASE)
+
+
+class Airport(NamedTuple):
+    code: str
+    name: str
+    city: str
+    country_code: str
+    latitude: float
+    longitude: float
+
+    @property
+    def is_international(self) -> bool:
+        return "international" in self.name.lower()
+
+    @property
+    def is_civil(self) -> bool:
+        """False for air bases and heliports, which carry IATA codes but no scheduled flights"""
+        return not _NON_CIVIL_RE.search(self.name)
+
+
+# Airports that serve a metropolitan area count as major even without "International" in the name (LHR)
+_METRO_AIRPORTS = {code for _, _, codes in METRO_CODES.values() for code in codes}
+
+
+def _is_major(airport: Airport) -> bool:
+    return airport.code in _METRO_AIRPORTS or airport.is_international
+
+
+class AirportIndex:
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.airports: Dict[str, Airport] = {}
+        self._by_city: Dict[str, List[str]] = {}
+        self._metro_by_city: Dict[str, str] = {}
+        self._codes: List[str] = []
+        self._kdtree: Optional[KDTree] = None
+        self._kdtree_lock = threading.Lock()
+        self._load(data_dir)
+
+    def __len__(self) -> int:
+        return len(self.airports)
+
+    def _load(self, data_dir: str):
+        with gzip.open(os.path.join(data_dir, "airports.tsv.gz"), "rt", encoding="utf-8") as f:
+            for line in f:
+                code, name, city, country, lat, lon = line.rstrip("\n").split("\t")
+                self.airports[code] = Airport(code, name, city, country, float(lat), float(lon))
+                if city:
+                    self._by_city.setdefault(normalize(city), []).append(code)
+        for metro, (city, _, _) in METRO_CODES.items():
+            self._metro_by_city[normalize(city)] = metro
+
+    def _get_kdtree(self) -> KDTree:
+        if self._kdtree is None:
+            with self._kdtree_lock:
+                if self._kdtree is None:
+                    self._codes = list(self.airports)
+                    self._kdtree = KDTree([(self.airports[c].latitude, self.airports[c].longitude)
+                                           for c in self._codes])
+        return self._kdtree
+
+    def warm(self):
+        """Build the lazily-initialized spatial index up front"""
+        self._get_kdtree()
+
+    def is_valid_code(self, code: str) -> bool:
+        """True if code is a known airport or metropolitan-area IATA code"""
+        code = code.upper()
+        return code in self.airports or code in METRO_CODES
+
+    def nearest_airports(self, latitude: float, longitude: float,
+                         max_distance_km: float = MAX_AIRPORT_DISTANCE_KM,
+                         country_code: Optional[str] = None) -> List[Airport]:
+        """
+        Civil airports within max_distance_km by distance, with major
+        airports ranked MAJOR_AIRPORT_BONUS_KM closer. Given a country, only
+        its airports count unless it has none in range.
+        """
+        found = self._get_kdtree().within(latitude, longitude, max_distance_km)
+        airports = [(self.airports[self._codes[i]], km) for i, km in found]
+        airports = [item for item in airports if item[0].is_civil] or airports
+        if country_code:
+            airports = [item for item in airports if item[0].country_code == country_code] or airports
+
+        def rank(item):
+            airport, km = item
+            return km - MAJOR_AIRPORT_BONUS_KM if _is_major(airport) else km
+
+        airports.sort(key=rank)
+        return [airport for airport, _ in airports]
+
+    def resolve(self, location: str) -> List[str]:
+        """
+        Resolve a code, city name or alias to candidate IATA codes, best first.
+        Returns an empty list when the location cannot be resolved.
+        """
+        if not location:
+            return []
+        text = _LEADING_PREPOSITION_RE.sub("", location.strip())
+        gazetteer = get_gazetteer()
+        if _CODE_RE.match(text) and self.is_valid_code(text):
+            # "GOA" is Genoa's code, but "Goa" is the Indian state
+            if text.isupper() or not gazetteer.lookup(text, fuzzy=False):
+                return [text.upper()]
+
+        key = normalize(text.partition(",")[0])
+        place = gazetteer.lookup(text) or gazetteer.find_in_text(text)
+        if place:
+            key = normalize(place.name)
+            if key in self._metro_by_city and METRO_CODES[self._metro_by_city[key]][1] == place.country_code:
+                return [self._metro_by_city[key]]
+
+        codes = list(self._by_city.get(key, []))
+        if place:
+            codes = [c for c in codes if self.airports[c].country_code == place.country_code]
+        if codes:
+            codes.sort(key=lambda c: not _is_major(self.airports[c]))
+            if place and not _is_major(self.airports[codes[0]]):
+                # Vancouver's main airport is filed under Richmond, its own is a seaplane base
+                nearby = self.nearest_airports(place.latitude, place.longitude, NEARBY_MAJOR_AIRPORT_KM,
+                                               place.country_code)
+                codes = [airport.code for airport in nearby
+                         if _is_major(airport) and airport.country_code == place.country_code] + codes
+            return list(dict.fromkeys(codes))[:MAX_CANDIDATES]
+
+        if place:
+            nearby = self.nearest_airports(place.latitude, place.longitude, country_code=place.country_code)
+            return [airport.code for airport in nearby[:MAX_CANDIDATES]]
+        return []
+
+    def resolve_code(self, location: str) -> Optional[str]:
+        """Best single IATA code for a location, or None if it cannot be resolved"""
+        codes = self.resolve(location)
+        return codes[0] if codes else None
+
+
+_airport_index: Optional[AirportIndex] = None
+_airport_index_lock = threading.Lock()
+
+
+def get_airport_index() -> AirportIndex:
+    """Return the process-wide airport index, loading it on first use"""
+    global _airport_index
+    if _airport_index is None:
+        with _airport_index_lock:
+            if _airport_index is None:
+                _airport_index = AirportIndex()
+    return _airport_index
@@ -0,0 +1,185 @@
+"""
+Build the compact gazetteer and airport data files shipped in geo/data.
+
+The source data comes from the `geonamescache` package (GeoNames cities with
+population >= 15000, CC-BY 4.0) and the `airportsdata` package (MIT). Region
+(state/province) names are taken from geonamescache for US states and voted
+from the subdivision names of airports near each region's cities elsewhere,
+since geonamescache only carries the region codes. The packages are only
+needed to regenerate the files:
+
+    pip install geonamescache airportsdata
+    python -m geo.build_data
+"""
+import gzip
+import io
+import os
+import re
+
+from geo.kdtree import KDTree
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Short country names used in display strings (e.g. "London, UK")
+COUNTRY_DISPLAY_OVERRIDES = {
+    "US": "USA",
+    "GB": "UK",
+    "AE": "UAE",
+    "NL": "Netherlands",
+}
+
+# Renames where GeoNames' primary name is not what travellers type
+NAME_OVERRIDES = {
+    ("New York City", "US"): "New York",
+}
+
+# Popular destinations that are islands or regions rather than cities
+EXTRA_PLACES = [
+    ("Bali", "ID", -8.4095, 115.1889, 4362000, ["Bali Island"]),
+    ("Maldives", "MV", 4.1748, 73.5089, 515000, ["Male", "Malé"]),
+    ("Santorini", "GR", 36.3932, 25.4615, 15500, ["Thira", "Thera"]),
+    ("Hawaii", "US", 21.3069, -157.8583, 1455000, ["Oahu"]),
+    ("Tuscany", "IT", 43.7711, 11.2486, 3730000, ["Toscana"]),
+    ("Swiss Alps", "CH", 46.5586, 7.9077, 300000, []),
+    ("Goa", "IN", 15.2993, 74.1240, 1458545, ["Panaji"]),
+]
+
+# Airports airportsdata still lists that no longer have passenger flights
+CLOSED_AIRPORTS = {
+    "TXL",  # Berlin Tegel, closed 2020 (replaced by BER)
+    "ISL",  # Istanbul Atatürk, passenger flights moved to IST in 2019
+    "HEW",  # Athens Hellinikon, closed 2001 (replaced by ATH)
+    "YMX",  # Montréal Mirabel, passenger flights moved to YUL in 2004
+}
+
+MAX_ALIASES = 8
+# Places this big also get the short forms of their name listed among GeoNames'
+# alternates ("Frankfurt" for "Frankfurt am Main"), ahead of the alias cap
+SHORT_NAME_MIN_POPULATION = 100000
+# An airport votes for the region of the nearest city within this distance
+REGION_VOTE_KM = 30
+_ALIAS_RE = re.compile(r"^[A-Za-z][A-Za-z .'\-]{1,39}$")
+
+
+def _open_gz(filename):
+    # Fixed mtime keeps regenerated files byte-identical when the data is unchanged
+    raw = gzip.GzipFile(os.path.join(DATA_DIR, filename), "wb", mtime=0)
+    return io.TextIOWrapper(raw, encoding="utf-8")
+
+
+def _clean_aliases(name, alternates):
+    seen = {name.lower()}
+    aliases = []
+    for alt in alternates:
+        if not _ALIAS_RE.match(alt) or alt.isupper() or alt.lower() in seen:
+            continue
+        seen.add(alt.lower())
+        aliases.append(alt)
+        if len(aliases) >= MAX_ALIASES:
+            break
+    return aliases
+
+
+def _short_names(name, alternates, country_names):
+    """Alternates that are the leading words of name, e.g. "Cebu" of "Cebu City", except country names"""
+    return [alt for alt in alternates
+            if 3 <= len(alt) < len(name) and name.startswith(alt) and not name[len(alt)].isalpha()
+            and alt.lower() not in country_names]
+
+
+def build():
+    import geonamescache
+
+    gc = geonamescache.GeonamesCache()
+
+    countries = gc.get_countries()
+    with open(os.path.join(DATA_DIR, "countries.tsv"), "w", encoding="utf-8") as f:
+        for code in sorted(countries):
+            name = countries[code]["name"]
+            f.write(f"{code}\t{name}\t{COUNTRY_DISPLAY_OVERRIDES.get(code, name)}\n")
+
+    country_names = {country["name"].lower() for country in countries.values()}
+    cities = list(gc.get_cities().values())
+    rows = []
+    for city in cities:
+        name = NAME_OVERRIDES.get((city["name"], city["countrycode"]), city["name"])
+        alternates = list(city.get("alternatenames") or [])
+        if name != city["name"]:
+            alternates.insert(0, city["name"])
+        if city["population"] >= SHORT_NAME_MIN_POPULATION:
+            alternates = _short_names(name, alternates, country_names) + alternates
+        rows.append((
+            name,
+            city["countrycode"],
+            city.get("admin1code") or "",
+            round(city["latitude"], 4),
+            round(city["longitude"], 4),
+            city["population"],
+            _clean_aliases(name, alternates),
+        ))
+    tree = KDTree([(city["latitude"], city["longitude"]) for city in cities])
+    for name, country, lat, lon, population, aliases in EXTRA_PLACES:
+        # Islands and regions take the region of their nearest city
+        region = next((cities[i].get("admin1code") or "" for i, _ in tree.nearest(lat, lon, 10)
+                       if cities[i]["countrycode"] == country), "")
+        rows.append((name, country, region, lat, lon, population, _clean_aliases(name, aliases)))
+
+    # Largest places first so ties resolve towards the better-known place
+    rows.sort(key=lambda r: (-r[5], r[0]))
+    with _open_gz("places.tsv.gz") as f:
+        for name, country, region, lat, lon, population, aliases in rows:
+            f.write(f"{name}\t{country}\t{region}\t{lat}\t{lon}\t{population}\t{'|'.join(aliases)}\n")
+
+    regions = build_regions(gc, cities, tree)
+    airports = build_airports()
+    print(f"Wrote {len(rows)} places, {len(countries)} countries, {regions} regions and {airports} airports "
+          f"to {DATA_DIR}")
+
+
+def build_regions(gc, cities, tree):
+    """Write country, region code, region name and aliases for the regions the places are in"""
+    import airportsdata
+
+    names = {("US", code): (state["name"], [code]) for code, state in gc.get_us_states().items()}
+    votes = {}
+    for airport in airportsdata.load("ICAO").values():
+        if not airport["subd"]:
+            continue
+        for i, km in tree.nearest(airport["lat"], airport["lon"], 5):
+            city = cities[i]
+            if km > REGION_VOTE_KM:
+                break
+            if city["countrycode"] == airport["country"] and city.get("admin1code"):
+                key = (city["countrycode"], city["admin1code"])
+                counts = votes.setdefault(key, {})
+                counts[airport["subd"]] = counts.get(airport["subd"], 0) + 1
+                break
+    for key, counts in votes.items():
+        if key not in names:
+            names[key] = (max(sorted(counts), key=counts.get), [])
+
+    with open(os.path.join(DATA_DIR, "regions.tsv"), "w", encoding="utf-8") as f:
+        for (country, code), (name, aliases) in sorted(names.items()):
+            f.write(f"{country}\t{code}\t{name}\t{'|'.join(aliases)}\n")
+    return len(names)
+
+
+def build_airports():
+    import airportsdata
+
+    airports = airportsdata.load("IATA")
+    count = 0
+    with _open_gz("airports.tsv.gz") as f:
+        for code in sorted(airports):
+            airport = airports[code]
+            if not re.match(r"^[A-Z]{3}$", code) or code in CLOSED_AIRPORTS:
+                continue
+            name = airport["name"].replace("\t", " ")
+            f.write(f"{code}\t{name}\t{airport['city']}\t{airport['country']}\t"
+                    f"{round(airport['lat'], 4)}\t{round(airport['lon'], 4)}\n")
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,330 @@
+"""
+In-memory gazetteer of world cities and popular destinations.
+
+Loaded once from the compact files in geo/data (see geo/build_data.py) and
+shared by the orchestrator, the API endpoints and the RAG agent. Supports
+exact and alias lookup (optionally qualified by country or region), prefix
+search, typo-tolerant lookup and nearest-place queries by coordinates.
+"""
+import bisect
+import gzip
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from geo.kdtree import KDTree
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Only this many leading characters feed the typo index (SymSpell-style)
+FUZZY_PREFIX_LENGTH = 8
+# Free-text matches without a preceding preposition must be at least this big
+MIN_UNANCHORED_POPULATION = 100000
+MAX_NGRAM_WORDS = 4
+# Bound on index keys scanned per prefix search so one-letter prefixes stay fast
+MAX_PREFIX_SCAN = 2000
+# A typo of a place this many times bigger beats an exact alias ("Sydny" is an alias of Sidney, Ohio)
+ALIAS_POPULATION_RATIO = 10
+
+_LOCATION_PREPOSITIONS = {"to", "in", "at", "near", "for", "from", "visit", "visiting", "around", "of"}
+# Words that never start or end a place name in a query
+_FUNCTION_WORDS = {
+    "a", "an", "and", "the", "to", "in", "at", "of", "for", "from", "with", "on", "by", "my", "me", "i",
+    "is", "it", "or", "we", "us", "our",
+}
+# Words that collide with place names but rarely mean one; in free text they still
+# count when capitalized ("trip to Nice", "Reading in March")
+_STOPWORDS = _FUNCTION_WORDS | {
+    "trip", "plan", "day", "days", "week", "weeks", "weekend", "tour", "travel", "visit", "hotel",
+    "hotels", "flight", "flights", "stay", "luxury", "budget", "family", "beach", "city", "best",
+    "good", "nice", "great", "cheap", "romantic", "cultural", "adventure", "business", "food",
+    "museum", "museums", "art", "history", "create", "make", "find", "show", "need", "want",
+    "book", "help", "itinerary", "vacation", "holiday", "honeymoon", "long", "short", "next",
+    "one", "two", "three", "four", "five", "six", "seven", "ten", "early", "late", "morning",
+    "evening", "night", "december", "january", "march", "may", "june", "july", "august", "spring",
+    "summer", "winter", "fall", "autumn",
+}
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_WORD_SEPARATOR_RE = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _fold(text: str) -> str:
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return text
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    return _NON_ALNUM_RE.sub(" ", _fold(text).lower()).strip()
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, returning limit + 1 once exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(key: str) -> List[str]:
+    prefix = key[:FUZZY_PREFIX_LENGTH]
+    return [prefix] + [prefix[:i] + prefix[i + 1:] for i in range(len(prefix))]
+
+
+class Place(NamedTuple):
+    name: str
+    country_code: str
+    country: str
+    latitude: float
+    longitude: float
+    population: int
+    region_code: str = ""  # GeoNames admin1 code, e.g. "TX" or "16" (Maharashtra)
+
+    @property
+    def display_name(self) -> str:
+        """Name as shown to users, e.g. "Paris, France" or "Singapore" """
+        if self.name == self.country:
+            return self.name
+        return f"{self.name}, {self.country}"
+
+
+class Gazetteer:
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.places: List[Place] = []
+        self._countries: Dict[str, str] = {}  # normalized code/name -> country code
+        self._regions: Dict[str, List[Tuple[str, str]]] = {}  # normalized name/alias -> (country, region) codes
+        self._by_name: Dict[str, List[int]] = {}
+        self._by_alias: Dict[str, List[int]] = {}
+        self._sorted_keys: List[str] = []
+        # Built on first use (or by warm()) to keep the initial load cheap
+        self._fuzzy_index: Optional[Dict[str, List[str]]] = None
+        self._kdtree: Optional[KDTree] = None
+        self._build_lock = threading.Lock()
+        self._load(data_dir)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _load(self, data_dir: str):
+        country_names = {}
+        with open(os.path.join(data_dir, "countries.tsv"), encoding="utf-8") as f:
+            for line in f:
+                code, name, display = line.rstrip("\n").split("\t")
+                country_names[code] = display
+                for key in (code, name, display):
+                    self._countries[normalize(key)] = code
+
+        with open(os.path.join(data_dir, "regions.tsv"), encoding="utf-8") as f:
+            for line in f:
+                code, region, name, aliases = line.rstrip("\n").split("\t")
+                for key in [name, *aliases.split("|")]:
+                    if key:
+                        self._regions.setdefault(normalize(key), []).append((code, region))
+
+        # Rows are sorted by population, so id lists stay ordered biggest first
+        with gzip.open(os.path.join(data_dir, "places.tsv.gz"), "rt", encoding="utf-8") as f:
+            for line in f:
+                name, code, region, lat, lon, population, aliases = line.rstrip("\n").split("\t")
+                place_id = len(self.places)
+                self.places.append(Place(name, code, country_names.get(code, code),
+                                         float(lat), float(lon), int(population), region))
+                self._by_name.setdefault(normalize(name), []).append(place_id)
+                if aliases:
+                    for alias in aliases.split("|"):
+                        self._by_alias.setdefault(normalize(alias), []).append(place_id)
+
+        self._sorted_keys = sorted(set(self._by_name) | set(self._by_alias))
+        logger.info(f"Gazetteer loaded {len(self.places)} places")
+
+    def _get_fuzzy_index(self) -> Dict[str, List[str]]:
+        if self._fuzzy_index is None:
+            with self._build_lock:
+                if self._fuzzy_index is None:
+                    index: Dict[str, List[str]] = {}
+                    for key in self._by_name:
+                        if len(key) < 5:
+                            continue
+                        for deleted in _deletes(key):
+                            index.setdefault(deleted, []).append(key)
+                    self._fuzzy_index = index
+        return self._fuzzy_index
+
+    def _get_kdtree(self) -> KDTree:
+        if self._kdtree is None:
+            with self._build_lock:
+                if self._kdtree is None:
+                    self._kdtree = KDTree([(p.latitude, p.longitude) for p in self.places])
+        return self._kdtree
+
+    def warm(self):
+        """Build the lazily-initialized typo and spatial indexes up front"""
+        self._get_fuzzy_index()
+        self._get_kdtree()
+
+    def _ids_for_key(self, key: str) -> List[int]:
+        return self._by_name.get(key) or self._by_alias.get(key) or []
+
+    @staticmethod
+    def _matches(place: Place, country_code: Optional[str], regions: Optional[Set[Tuple[str, str]]]) -> bool:
+        if country_code and place.country_code != country_code:
+            return False
+        return regions is None or (place.country_code, place.region_code) in regions
+
+    def _pick(self, ids: List[int], country_code: Optional[str],
+              regions: Optional[Set[Tuple[str, str]]] = None) -> Optional[Place]:
+        for i in ids:
+            if self._matches(self.places[i], country_code, regions):
+                return self.places[i]
+        return None
+
+    def resolve_country(self, text: str) -> Optional[str]:
+        """Resolve a country name or ISO code to its ISO code"""
+        return self._countries.get(normalize(text))
+
+    def resolve_region(self, text: str) -> List[Tuple[str, str]]:
+        """(country, region) codes of the states or provinces named text, e.g. "Texas" or "TX" """
+        return self._regions.get(normalize(text), [])
+
+    def lookup(self, query: str, country: Optional[str] = None, fuzzy: bool = True) -> Optional[Place]:
+        """
+        Resolve a place name such as "Paris", "Mumbai, Maharashtra", "Paris, TX" or "London, UK".
+        Qualifiers after the name restrict the match to that country or region;
+        a qualifier that is neither matches nothing rather than being ignored.
+        """
+        if not query:
+            return None
+        name, _, qualifier = query.partition(",")
+        country_code = self.resolve_country(country) if country else None
+        regions: Optional[Set[Tuple[str, str]]] = None
+        for part in qualifier.split(","):
+            if not normalize(part):
+                continue
+            code = self.resolve_country(part)
+            if code:
+                country_code = country_code or code
+                continue
+            found = self.resolve_region(part)
+            if not found:
+                return None
+            regions = set(found) if regions is None else regions & set(found)
+        if regions is not None and country_code:
+            regions = {region for region in regions if region[0] == country_code}
+
+        key = normalize(name)
+        if not key:
+            return None
+        place = self._pick(self._by_name.get(key, []), country_code, regions)
+        if place:
+            return place
+        alias = self._pick(self._by_alias.get(key, []), country_code, regions)
+        if not alias and not country_code and regions is None and self.resolve_country(key):
+            return None  # A bare country name is not a place we can search around
+        if fuzzy:
+            for candidate in self.fuzzy_lookup(key):
+                if self._matches(candidate, country_code, regions):
+                    if alias is None or candidate.population > ALIAS_POPULATION_RATIO * alias.population:
+                        return candidate
+                    break
+        return alias
+
+    def fuzzy_lookup(self, query: str, limit: int = 5) -> List[Place]:
+        """Typo-tolerant lookup; one edit for short names, two for long ones"""
+        key = normalize(query)
+        if len(key) < 5 or key in _STOPWORDS:
+            return []
+        max_distance = 1 if len(key) < 8 else 2
+        fuzzy_index = self._get_fuzzy_index()
+        candidates = set()
+        for deleted in _deletes(key):
+            candidates.update(fuzzy_index.get(deleted, ()))
+        scored = []
+        for candidate in candidates:
+            distance = _edit_distance(key, candidate, max_distance)
+            if distance <= max_distance:
+                best = self.places[self._by_name[candidate][0]]
+                scored.append((distance, -best.population, candidate))
+        scored.sort()
+        return [self.places[self._by_name[c][0]] for _, _, c in scored[:limit]]
+
+    def search_prefix(self, prefix: str, limit: int = 10) -> List[Place]:
+        """Autocomplete: places whose name or alias starts with prefix, biggest first"""
+        key = normalize(prefix)
+        if not key:
+            return []
+        start = bisect.bisect_left(self._sorted_keys, key)
+        ids = set()
+        for k in self._sorted_keys[start:start + MAX_PREFIX_SCAN]:
+            if not k.startswith(key):
+                break
+            ids.update(self._ids_for_key(k))
+        ranked = sorted(ids)  # ids are in population order
+        return [self.places[i] for i in ranked[:limit]]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> List[Tuple[Place, float]]:
+        """Return the k places closest to a coordinate with their distance in km"""
+        return [(self.places[i], km) for i, km in self._get_kdtree().nearest(latitude, longitude, k)]
+
+    def find_in_text(self, text: str) -> Optional[Place]:
+        """
+        Find the destination mentioned in free text. Names following a
+        preposition ("trip to Rome") win; otherwise only well-known places count.
+        """
+        # The words of normalize(text), remembering which were capitalized
+        tokens = [token for token in _WORD_SEPARATOR_RE.split(_fold(text)) if token]
+        words = [token.lower() for token in tokens]
+        best: Optional[Tuple[Tuple[int, int, int], Place]] = None
+        for start in range(len(words)):
+            anchored = start > 0 and words[start - 1] in _LOCATION_PREPOSITIONS
+            for size in range(min(MAX_NGRAM_WORDS, len(words) - start), 0, -1):
+                phrase_words = words[start:start + size]
+                if phrase_words[0] in _FUNCTION_WORDS or phrase_words[-1] in _FUNCTION_WORDS:
+                    continue
+                if size == 1 and phrase_words[0] in _STOPWORDS and not tokens[start][0].isupper():
+                    continue
+                ids = self._ids_for_key(" ".join(phrase_words))
+                if not ids:
+                    continue
+                place = self.places[ids[0]]
+                if not anchored and place.population < MIN_UNANCHORED_POPULATION:
+                    continue
+                score = (int(anchored), size, place.population)
+                if best is None or score > best[0]:
+                    best = (score, place)
+                break  # Longest match at this position wins
+        return best[1] if best else None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide gazetteer, loading it on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
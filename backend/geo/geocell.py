@@ -0,0 +1,100 @@
+"""
+Geohash cells for caching location-bound reference data.
+
+A cell is a geohash string; at the default precision of 3 it spans
+1.40625 degrees in each direction (about 156 x 156 km at the equator). Data
+fetched for a cell's circumscribing circle is trimmed to the cell itself, so
+neighbouring cells never hold the same point twice.
+"""
+import math
+from typing import List, Tuple
+
+from geo.kdtree import EARTH_RADIUS_KM, haversine_km
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: value for value, char in enumerate(_BASE32)}
+
+
+def _bits(precision: int) -> Tuple[int, int]:
+    """(longitude bits, latitude bits); geohash interleaves starting with longitude"""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(latitude degrees, longitude degrees) spanned by a cell"""
+    lon_bits, lat_bits = _bits(precision)
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def encode(latitude: float, longitude: float, precision: int = 3) -> str:
+    lon_bits, lat_bits = _bits(precision)
+    lat_steps, lon_steps = 2 ** lat_bits, 2 ** lon_bits
+    lat_index = min(int((latitude + 90.0) / 180.0 * lat_steps), lat_steps - 1)
+    lon_index = min(int(((longitude + 180.0) % 360.0) / 360.0 * lon_steps), lon_steps - 1)
+    code = 0
+    for bit in range(5 * precision):
+        # Even bits carry longitude, odd bits latitude, most significant first
+        if bit % 2 == 0:
+            lon_bits -= 1
+            code = (code << 1) | ((lon_index >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            code = (code << 1) | ((lat_index >> lat_bits) & 1)
+    return "".join(_BASE32[(code >> shift) & 31] for shift in range(5 * (precision - 1), -1, -5))
+
+
+def bounds(cell: str) -> Tuple[float, float, float, float]:
+    """(min latitude, min longitude, max latitude, max longitude) of a cell"""
+    code = 0
+    for char in cell:
+        code = (code << 5) | _DECODE[char]
+    lat_index = lon_index = 0
+    for bit in range(5 * len(cell) - 1, -1, -1):
+        if (5 * len(cell) - 1 - bit) % 2 == 0:
+            lon_index = (lon_index << 1) | ((code >> bit) & 1)
+        else:
+            lat_index = (lat_index << 1) | ((code >> bit) & 1)
+    lat_size, lon_size = cell_size(len(cell))
+    min_lat = lat_index * lat_size - 90.0
+    min_lon = lon_index * lon_size - 180.0
+    return min_lat, min_lon, min_lat + lat_size, min_lon + lon_size
+
+
+def center(cell: str) -> Tuple[float, float]:
+    min_lat, min_lon, max_lat, max_lon = bounds(cell)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def circumradius_km(cell: str) -> float:
+    """Radius around the cell centre that reaches every corner of the cell"""
+    lat, lon = center(cell)
+    min_lat, min_lon, max_lat, max_lon = bounds(cell)
+    return max(haversine_km(lat, lon, corner_lat, corner_lon)
+               for corner_lat in (min_lat, max_lat) for corner_lon in (min_lon, max_lon))
+
+
+def covering(latitude: float, longitude: float, radius_km: float, precision: int = 3) -> List[str]:
+    """Cells overlapping the bounding box of a search circle, nearest first"""
+    lat_size, lon_size = cell_size(precision)
+    lat_span = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(min(abs(latitude) + lat_span, 89.9)))
+    lon_span = min(180.0, lat_span / max(cos_lat, 1e-6))
+    min_lat, max_lat = max(latitude - lat_span, -90.0), min(latitude + lat_span, 90.0)
+
+    cells = {}
+    lat = min_lat
+    while True:
+        lon = longitude - lon_span
+        while True:
+            cell = encode(lat, lon, precision)
+            if cell not in cells:
+                cell_lat, cell_lon = center(cell)
+                cells[cell] = haversine_km(latitude, longitude, cell_lat, cell_lon)
+            if lon >= longitude + lon_span:
+                break
+            lon = min(lon + lon_size, longitude + lon_span)
+        if lat >= max_lat:
+            break
+        lat = min(lat + lat_size, max_lat)
+    return sorted(cells, key=cells.get)
@@ -0,0 +1,133 @@
+"""
+Static KD-tree for nearest-neighbour and radius queries over lat/lon points.
+
+Points are projected onto the unit sphere so plain Euclidean (chord) distance
+preserves great-circle ordering; results are converted back to kilometres.
+"""
+import heapq
+import math
+from typing import List, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _to_xyz(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(math.pi / 2, km / (2 * EARTH_RADIUS_KM)))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class KDTree:
+    """Array-backed KD-tree; node i of the implicit tree is `self._order[i]`."""
+
+    def __init__(self, coordinates: Sequence[Tuple[float, float]]):
+        self._points = [_to_xyz(lat, lon) for lat, lon in coordinates]
+        self._order = list(range(len(self._points)))
+        self._axis = [0] * len(self._points)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _build(self):
+        points = self._points
+        order = self._order
+        stack = [(0, len(order))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= 0:
+                continue
+            # Split on the axis with the widest spread in this range
+            segment = order[lo:hi]
+            spreads = []
+            for axis in range(3):
+                values = [points[i][axis] for i in segment]
+                spreads.append(max(values) - min(values))
+            axis = spreads.index(max(spreads))
+            segment.sort(key=lambda i: points[i][axis])
+            order[lo:hi] = segment
+            mid = (lo + hi) // 2
+            self._axis[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> List[Tuple[int, float]]:
+        """Return up to k (point_index, distance_km) pairs, closest first"""
+        if not self._points or k <= 0:
+            return []
+        target = _to_xyz(latitude, longitude)
+        points = self._points
+        order = self._order
+        axes = self._axis
+        heap: List[Tuple[float, int]] = []  # max-heap on squared chord distance
+
+        def visit(lo: int, hi: int):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            index = order[mid]
+            point = points[index]
+            d2 = ((point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2
+                  + (point[2] - target[2]) ** 2)
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, index))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, index))
+            axis = axes[mid]
+            diff = target[axis] - point[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            visit(*near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(*far)
+
+        visit(0, len(order))
+        return [(index, _chord_to_km(math.sqrt(-neg_d2))) for neg_d2, index in sorted(heap, reverse=True)]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[int, float]]:
+        """Return all (point_index, distance_km) pairs within radius_km, closest first"""
+        if not self._points or radius_km < 0:
+            return []
+        target = _to_xyz(latitude, longitude)
+        limit2 = _km_to_chord(radius_km) ** 2
+        points = self._points
+        order = self._order
+        axes = self._axis
+        found: List[Tuple[float, int]] = []
+        stack = [(0, len(order))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            index = order[mid]
+            point = points[index]
+            d2 = ((point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2
+                  + (point[2] - target[2]) ** 2)
+            if d2 <= limit2:
+                found.append((d2, index))
+            axis = axes[mid]
+            diff = target[axis] - point[axis]
+            if diff < 0 or diff * diff <= limit2:
+                stack.append((lo, mid))
+            if diff >= 0 or diff * diff <= limit2:
+                stack.append((mid + 1, hi))
+        found.sort()
+        return [(index, _chord_to_km(math.sqrt(d2))) for d2, index in found]
@@ -0,0 +1 @@
+# Local upstream stand-ins and the load-test harness
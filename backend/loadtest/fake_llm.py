@@ -0,0 +1,163 @@
+"""
+Fake OpenAI-compatible LLM and embeddings provider for offline load tests.
+
+Chat completions wait a time-to-first-token (the profile latency) and then
+"generate" output_tokens at tokens_per_second, streamed as server-sent
+events when the client asks for it. Embeddings take embedding_latency_ms
+and are deterministic pseudo-random unit vectors, so the same text always
+maps to the same vector. Run it and point the backend at it:
+
+    python -m loadtest.fake_llm --port 8082 --tokens-per-second 80 --output-tokens 400
+    LLM_BASE_URL=http://127.0.0.1:8082/v1 uvicorn main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from loadtest.profile import Profile, add_profile_arguments, profile_from_args
+
+DEFAULT_TOKENS_PER_SECOND = 80.0
+DEFAULT_OUTPUT_TOKENS = 400
+DEFAULT_EMBEDDING_DIM = 768
+DEFAULT_EMBEDDING_LATENCY_MS = 50.0
+# Tokens flushed per streamed chunk
+STREAM_CHUNK_TOKENS = 8
+
+_DAYS_RE = re.compile(r"(\d+)[- ]day", re.IGNORECASE)
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+def itinerary_words(prompt: str, output_tokens: int) -> List[str]:
+    """About output_tokens words of itinerary-shaped markdown"""
+    match = _DAYS_RE.search(prompt)
+    days = min(int(match.group(1)), 14) if match else 3
+    lines = ["# Trip Itinerary", ""]
+    per_day = max(output_tokens // (days + 1), 12)
+    for day in range(1, days + 1):
+        lines += [f"## Day {day}: Exploring", ""]
+        lines += ["• ⏰ Morning: " + " ".join(["sightseeing"] * max(per_day // 3 - 3, 1))]
+        lines += ["• 🍽️ Lunch: " + " ".join(["local"] * max(per_day // 3 - 3, 1))]
+        lines += ["• ⏰ Afternoon: " + " ".join(["walk"] * max(per_day // 3 - 3, 1)), ""]
+    lines += ["## 💰 Budget Estimates", "• Total: moderate"]
+    words = "\n".join(lines).split(" ")
+    return words[:max(output_tokens, 1)]
+
+
+def embedding(text: str, dim: int) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+
+def create_app(profile: Profile = None, tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND,
+               output_tokens: int = DEFAULT_OUTPUT_TOKENS, embedding_dim: int = DEFAULT_EMBEDDING_DIM,
+               embedding_latency_ms: float = DEFAULT_EMBEDDING_LATENCY_MS) -> FastAPI:
+    profile = profile or Profile()
+    app = FastAPI(title="Fake LLM provider")
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "fake-travel", "object": "model"},
+                                           {"id": "fake-embedding", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fault = profile.fault()
+        if fault:
+            return fault
+        prompt = _prompt_text(body.get("messages", []))
+        limit = min(int(body.get("max_tokens") or body.get("max_completion_tokens") or output_tokens), output_tokens)
+        words = itinerary_words(prompt, limit)
+        usage = {"prompt_tokens": max(len(prompt) // 4, 1), "completion_tokens": len(words),
+                 "total_tokens": max(len(prompt) // 4, 1) + len(words)}
+        completion_id = f"chatcmpl-{int(time.time() * 1000)}"
+        model = body.get("model", "fake-travel")
+        await profile.delay()  # time to first token
+
+        if body.get("stream"):
+            async def events():
+                for start in range(0, len(words), STREAM_CHUNK_TOKENS):
+                    chunk = words[start:start + STREAM_CHUNK_TOKENS]
+                    await asyncio.sleep(len(chunk) / tokens_per_second)
+                    text = " ".join(chunk) + (" " if start + STREAM_CHUNK_TOKENS < len(words) else "")
+                    yield "data: " + json.dumps({
+                        "id": completion_id, "object": "chat.completion.chunk", "model": model,
+                        "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                    }) + "\n\n"
+                yield "data: " + json.dumps({
+                    "id": completion_id, "object": "chat.completion.chunk", "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage,
+                }) + "\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(len(words) / tokens_per_second)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                         "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        fault = profile.fault()
+        if fault:
+            return fault
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        await asyncio.sleep(embedding_latency_ms / 1000)
+        data = [{"object": "embedding", "index": i, "embedding": embedding(str(text), embedding_dim)}
+                for i, text in enumerate(inputs)]
+        tokens = sum(len(str(text)) // 4 for text in inputs)
+        return {"object": "list", "data": data, "model": body.get("model", "fake-embedding"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @app.get("/stats")
+    async def stats():
+        return profile.stats()
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake LLM and embeddings provider")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND)
+    parser.add_argument("--output-tokens", type=int, default=DEFAULT_OUTPUT_TOKENS)
+    parser.add_argument("--embedding-dim", type=int, default=DEFAULT_EMBEDDING_DIM)
+    parser.add_argument("--embedding-latency-ms", type=float, default=DEFAULT_EMBEDDING_LATENCY_MS)
+    add_profile_arguments(parser, default_latency_ms=400)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(profile_from_args(args), args.tokens_per_second, args.output_tokens, args.embedding_dim,
+                     args.embedding_latency_ms)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
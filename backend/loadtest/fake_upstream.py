@@ -0,0 +1,44 @@
+"""
+In-process upstream stand-in for tests.
+
+fake_upstream(handler) routes the shared HTTP client to an async handler for
+the duration of the block and records the requests it served and how many
+of them were in flight at once:
+
+    async with fake_upstream(handler) as upstream:
+        await agent.search_hotels(...)
+    assert upstream.peak > 1
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List
+
+import httpx
+
+from core.http_client import use_transport
+
+Handler = Callable[[httpx.Request], Awaitable[httpx.Response]]
+
+
+class UpstreamStats:
+    def __init__(self):
+        self.requests: List[httpx.Request] = []
+        self.in_flight = 0
+        self.peak = 0
+
+
+@asynccontextmanager
+async def fake_upstream(handler: Handler) -> AsyncIterator[UpstreamStats]:
+    """Serve shared-client requests with handler until the block exits"""
+    stats = UpstreamStats()
+
+    async def counted(request: httpx.Request) -> httpx.Response:
+        stats.requests.append(request)
+        stats.in_flight += 1
+        stats.peak = max(stats.peak, stats.in_flight)
+        try:
+            return await handler(request)
+        finally:
+            stats.in_flight -= 1
+
+    async with use_transport(httpx.MockTransport(counted)):
+        yield stats
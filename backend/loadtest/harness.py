@@ -0,0 +1,234 @@
+"""
+End-to-end load-test harness for the backend.
+
+Drives the search, RAG and chat endpoints at set concurrency levels (closed
+loop: each worker sends its next request when the last one returns) and
+reports throughput and p50/p95/p99 latency per scenario and level. Results
+can be saved as JSON and compared against an earlier run to flag
+regressions. Start the stand-ins (loadtest.mock_amadeus, loadtest.fake_llm)
+and the backend pointed at them, then:
+
+    python -m loadtest.harness --scenario search-flights,search-hotels --concurrency 1,8,32 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+ROUTES = [("Delhi", "Mumbai"), ("Mumbai", "Goa"), ("Bangalore", "Delhi"), ("Chennai", "Kolkata"),
+          ("Paris", "London"), ("New York", "Tokyo"), ("Dubai", "Singapore"), ("Mumbai", "Dubai")]
+CITIES = ["Mumbai", "New Delhi", "Bangalore", "Goa", "Paris", "Tokyo", "Dubai", "London"]
+
+Request = Tuple[str, str, Dict[str, Any]]  # method, path, httpx keyword arguments
+
+
+def _day(rng: random.Random, pool: int) -> str:
+    return (date.today() + timedelta(days=30 + rng.randrange(pool))).isoformat()
+
+
+def search_flights(rng: random.Random, pool: int) -> Request:
+    origin, destination = rng.choice(ROUTES)
+    return "POST", "/api/search-flights", {"json": {
+        "origin": origin, "destination": destination, "departure_date": _day(rng, pool), "adults": 1}}
+
+
+def search_hotels(rng: random.Random, pool: int) -> Request:
+    check_in = _day(rng, pool)
+    check_out = (date.fromisoformat(check_in) + timedelta(days=3)).isoformat()
+    return "POST", "/api/search-hotels", {"json": {
+        "destination": rng.choice(CITIES), "check_in": check_in, "check_out": check_out, "adults": 2}}
+
+
+def rag(rng: random.Random, pool: int) -> Request:
+    query = f"Plan a {rng.randint(2, 5)}-day trip to {rng.choice(CITIES)}"
+    return "GET", "/rag", {"params": {"query": query}}
+
+
+def _chat_message(rng: random.Random, pool: int) -> str:
+    origin, destination = rng.choice(ROUTES)
+    return rng.choice((
+        f"Find flights from {origin} to {destination} on {_day(rng, pool)}",
+        f"Find hotels in {destination} from {_day(rng, pool)} to {_day(rng, pool)}",
+        f"Plan a {rng.randint(2, 5)}-day trip from {origin} to {destination}",
+    ))
+
+
+def chat(rng: random.Random, pool: int) -> Request:
+    # /chat answers from the RAG agent alone; see "orchestrator" for the multi-agent path
+    return "POST", "/chat", {"json": {"message": _chat_message(rng, pool)}}
+
+
+def orchestrator(rng: random.Random, pool: int) -> Request:
+    # Intent detection, entity extraction and the flight/hotel/itinerary agents behind it
+    message = _chat_message(rng, pool)
+    return "POST", "/chat/agents", {"json": {"message": message, "user_id": f"load-{rng.randrange(100)}"}}
+
+
+SCENARIOS: Dict[str, Callable[[random.Random, int], Request]] = {
+    "search-flights": search_flights,
+    "search-hotels": search_hotels,
+    "rag": rag,
+    "chat": chat,
+    "orchestrator": orchestrator,
+}
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), -(-len(sorted_values) * q // 100)))
+    return sorted_values[int(rank) - 1]
+
+
+def _outcome(response: httpx.Response) -> str:
+    if response.status_code >= 400:
+        return str(response.status_code)
+    # The search endpoints report failures as 200 {"success": false}
+    if response.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = response.json()
+        except ValueError:
+            return "invalid_json"
+        if isinstance(body, dict) and body.get("success") is False:
+            return "app_error"
+    return "ok"
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, concurrency: int, requests: int,
+                       duration: Optional[float] = None, pool: int = 20, seed: int = 0) -> Dict[str, Any]:
+    """
+    Send requests (or keep sending for duration seconds) from concurrency
+    workers and summarise latency and outcomes. pool is the number of
+    distinct dates drawn from, which sets how often caches can hit.
+    """
+    make_request = SCENARIOS[scenario]
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+    sent = 0
+    started = time.perf_counter()
+    stop_at = started + duration if duration else None
+
+    async def worker():
+        nonlocal sent
+        while (sent < requests) if stop_at is None else (time.perf_counter() < stop_at):
+            sent += 1
+            method, path, kwargs = make_request(rng, pool)
+            request_start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                outcome = _outcome(response)
+            except httpx.TimeoutException:
+                outcome = "timeout"
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - request_start)
+            outcomes[outcome] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": completed,
+        "errors": completed - outcomes["ok"],
+        "outcomes": dict(outcomes),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+    }
+
+
+async def run(client: httpx.AsyncClient, scenarios: Sequence[str], concurrencies: Sequence[int], requests: int,
+              duration: Optional[float] = None, pool: int = 20, warmup: int = 0) -> List[Dict[str, Any]]:
+    results = []
+    for scenario in scenarios:
+        if warmup:
+            await run_scenario(client, scenario, 1, warmup, pool=pool, seed=-1)
+        for concurrency in concurrencies:
+            results.append(await run_scenario(client, scenario, concurrency, requests, duration, pool))
+    return results
+
+
+def format_report(results: Sequence[Dict[str, Any]]) -> str:
+    header = f"{'scenario':<16}{'conc':>6}{'reqs':>7}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(f"{r['scenario']:<16}{r['concurrency']:>6}{r['requests']:>7}{r['errors']:>8}"
+                     f"{r['throughput_rps']:>9.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+    return "\n".join(lines)
+
+
+def compare(results: Sequence[Dict[str, Any]], baseline: Sequence[Dict[str, Any]],
+            tolerance: float = 0.2) -> List[str]:
+    """Describe each scenario/concurrency whose p95 or throughput is worse than baseline by more than tolerance"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        before = previous.get((r["scenario"], r["concurrency"]))
+        if not before:
+            continue
+        label = f"{r['scenario']} @ {r['concurrency']}"
+        if before["p95_ms"] and r["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95_ms']} -> {r['p95_ms']} ms")
+        if before["throughput_rps"] and r["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {before['throughput_rps']} -> {r['throughput_rps']} rps")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the travel chatbot backend")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", default=",".join(SCENARIOS),
+                        help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--duration", type=float, default=None, help="seconds per level instead of --requests")
+    parser.add_argument("--pool", type=int, default=20, help="distinct dates per scenario; smaller = more cache hits")
+    parser.add_argument("--warmup", type=int, default=0, help="sequential requests before measuring")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenario.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    concurrencies = [int(level) for level in args.concurrency.split(",")]
+
+    async def go():
+        limits = httpx.Limits(max_connections=max(concurrencies), max_keepalive_connections=max(concurrencies))
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            return await run(client, scenarios, concurrencies, args.requests, args.duration, args.pool, args.warmup)
+
+    results = asyncio.run(go())
+    print(format_report(results))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
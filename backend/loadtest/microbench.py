@@ -0,0 +1,294 @@
+"""
+Microbenchmarks for the per-request CPU hot paths.
+
+Times intent detection, entity extraction, markdown clean-up and the RAG
+agent's flight/hotel formatting and fallback itinerary on synthetic inputs,
+each at a realistic size and an oversized one (500 flight offers, 1,000
+hotels, a 5,000-word LLM answer). Reports ops/sec and the peak memory
+allocated per call; results can be saved as a baseline and later runs
+compared against it:
+
+    python -m loadtest.microbench --json bench.json
+    python -m loadtest.microbench --baseline bench.json --tolerance 0.15
+"""
+import argparse
+import gc
+import json
+import logging
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from loadtest.mock_amadeus import flight_offers
+
+DEFAULT_MIN_TIME = 0.5  # seconds of timing per repeat
+DEFAULT_REPEATS = 3
+
+CITIES = ["Mumbai", "New Delhi", "Bangalore", "Goa", "Paris", "Tokyo", "Dubai", "London", "New York", "Singapore"]
+PREFERENCES = ["luxury", "budget", "beach", "museum", "hiking", "honeymoon", "family", "business"]
+
+
+# Synthetic inputs
+
+def chat_message(rng: random.Random, words: int = 0) -> str:
+    """A chat message like the ones the orchestrator routes, padded with filler to about words words"""
+    origin, destination = rng.sample(CITIES, 2)
+    day = (date.today() + timedelta(days=rng.randint(10, 90))).isoformat()
+    message = rng.choice((
+        f"Find flights from {origin} to {destination} on {day} for {rng.randint(1, 4)} adults",
+        f"I need hotels in {destination} from {day} for 2 rooms and {rng.randint(1, 4)} people",
+        f"Plan a {rng.randint(2, 7)}-day {rng.choice(PREFERENCES)} trip to {destination} with flights from {origin}",
+    ))
+    filler = ["we", "would", "really", "like", "something", "near", "the", "centre", "and", "quiet", "at", "night"]
+    while len(message.split()) < words:
+        message += " " + " ".join(rng.choice(filler) for _ in range(12))
+    return message
+
+
+def flight_payload(offers: int, seed: int = 0) -> Dict[str, Any]:
+    """An Amadeus flight-offers response with offers offers"""
+    departure = (date.today() + timedelta(days=30 + seed)).isoformat()
+    return flight_offers("DEL", "BOM", departure, 1, offers)
+
+
+def hotel_list(hotels: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Amadeus by-geocode hotels around Mumbai, about two thirds of them priced"""
+    rng = random.Random(seed)
+    data = []
+    for index in range(hotels):
+        hotel = {
+            "hotelId": f"HT{index:06d}",
+            "name": f"HOTEL {index}",
+            "geoCode": {"latitude": round(19.07 + rng.uniform(-0.3, 0.3), 5),
+                        "longitude": round(72.87 + rng.uniform(-0.3, 0.3), 5)},
+            "rating": rng.randint(1, 5),
+            "distance": {"value": round(rng.uniform(0.1, 40), 2), "unit": "KM"},
+        }
+        if rng.random() < 0.66:
+            hotel["available"] = True
+            hotel["offers"] = [{"price": {"currency": "INR", "total": f"{rng.uniform(2000, 30000):.2f}"}}]
+        data.append(hotel)
+    return data
+
+
+def llm_output(words: int, seed: int = 0) -> str:
+    """Itinerary-shaped markdown of about words words, with the quirks preprocess_markdown cleans up"""
+    rng = random.Random(seed)
+    vocabulary = ["visit", "the", "old", "fort", "market", "lunch", "at", "a", "local", "cafe", "walk", "along",
+                  "beach", "museum", "sunset", "dinner", "temple", "boat", "ride", "**Tip:**", "(approx. ₹500)"]
+    lines = ["#Trip Itinerary", "---"]
+    day = 0
+    while sum(len(line.split()) for line in lines) < words:
+        day += 1
+        lines += [f"##Day {day}: Exploring", "", "**Morning:**"]
+        for bullet in ("* ", "- ", "* "):
+            lines.append(bullet + " ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 20))))
+        lines += ["Afternoon: " + " ".join(rng.choice(vocabulary) for _ in range(15)), "***", "", "", ""]
+    return "\n".join(lines)
+
+
+# Benchmarks
+
+class Benchmark(NamedTuple):
+    name: str
+    size: str
+    setup: Callable[[], Callable[[], Any]]  # imports the target and builds its input; returns the call to time
+
+
+def _orchestrator():
+    from orchestrator.chatbot_orchestrator import ChatbotOrchestrator
+    # The methods under test only need the instance, not the agents __init__ builds
+    return ChatbotOrchestrator.__new__(ChatbotOrchestrator)
+
+
+def _rag_agent(flight_data: Optional[Dict[str, Any]] = None, hotel_data: Optional[Dict[str, Any]] = None):
+    from agents.rag_agent.rag_agent import RAGAgent
+    # Skip __init__: it loads the LLM and the vector index, which the formatters never touch
+    agent = RAGAgent.__new__(RAGAgent)
+    agent.flight_data = flight_data
+    agent.hotel_data = hotel_data
+    return agent
+
+
+def detect_intent(words: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        orchestrator = _orchestrator()
+        message = chat_message(random.Random(words), words)
+        return lambda: orchestrator._detect_intent(message)
+    return setup
+
+
+def extract_entities(words: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        orchestrator = _orchestrator()
+        message = chat_message(random.Random(words), words)
+        return lambda: orchestrator._extract_entities(message)
+    return setup
+
+
+def preprocess_markdown(words: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        from main import preprocess_markdown as target
+        text = llm_output(words)
+        return lambda: target(text)
+    return setup
+
+
+def format_flight_info(offers: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        # Raw offers, so each call also pays for parsing them into the compact form
+        agent = _rag_agent(flight_data=flight_payload(offers))
+        return agent._format_flight_info
+    return setup
+
+
+def format_hotel_info(hotels: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        agent = _rag_agent(hotel_data={"data": hotel_list(hotels)})
+        return agent._format_hotel_info
+    return setup
+
+
+def fallback_itinerary(offers: int, hotels: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        agent = _rag_agent(flight_data=flight_payload(offers), hotel_data={"data": hotel_list(hotels)})
+        query = "Plan a 7-day romantic beach trip to Goa with museums and some luxury hotels"
+        return lambda: agent._generate_fallback_itinerary(query)
+    return setup
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("detect_intent", "20 words", detect_intent(20)),
+    Benchmark("detect_intent", "2,000 words", detect_intent(2000)),
+    Benchmark("extract_entities", "20 words", extract_entities(20)),
+    Benchmark("extract_entities", "2,000 words", extract_entities(2000)),
+    Benchmark("preprocess_markdown", "600 words", preprocess_markdown(600)),
+    Benchmark("preprocess_markdown", "5,000 words", preprocess_markdown(5000)),
+    Benchmark("format_flight_info", "20 offers", format_flight_info(20)),
+    Benchmark("format_flight_info", "500 offers", format_flight_info(500)),
+    Benchmark("format_hotel_info", "50 hotels", format_hotel_info(50)),
+    Benchmark("format_hotel_info", "1,000 hotels", format_hotel_info(1000)),
+    Benchmark("fallback_itinerary", "20 offers, 50 hotels", fallback_itinerary(20, 50)),
+    Benchmark("fallback_itinerary", "500 offers, 1,000 hotels", fallback_itinerary(500, 1000)),
+]
+
+
+def measure(call: Callable[[], Any], min_time: float = DEFAULT_MIN_TIME,
+            repeats: int = DEFAULT_REPEATS) -> Dict[str, float]:
+    """
+    Best-of-repeats ops/sec, with the loop count grown until one repeat
+    takes min_time, and the peak bytes traced while making one call.
+    """
+    call()  # warm up lazy imports and memo tables
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            call()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 4 or loops >= 1 << 24:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(int(min_time / 4 / elapsed) + 1, 10))
+    loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+
+    best = float("inf")
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for _ in range(loops):
+                call()
+            best = min(best, (time.perf_counter() - started) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ops_per_sec": round(1 / best, 1) if best else 0.0,
+            "mean_us": round(best * 1e6, 2),
+            "alloc_kb": round(peak / 1024, 1)}
+
+
+def run(benchmarks: Sequence[Benchmark] = BENCHMARKS, min_time: float = DEFAULT_MIN_TIME,
+        repeats: int = DEFAULT_REPEATS) -> List[Dict[str, Any]]:
+    """Measure each benchmark; one whose target cannot be imported is reported as skipped"""
+    results = []
+    for benchmark in benchmarks:
+        result: Dict[str, Any] = {"name": benchmark.name, "size": benchmark.size}
+        try:
+            call = benchmark.setup()
+        except ImportError as e:
+            result["skipped"] = f"{type(e).__name__}: {e}"
+        else:
+            result.update(measure(call, min_time, repeats))
+        results.append(result)
+    return results
+
+
+def format_report(results: Sequence[Dict[str, Any]]) -> str:
+    header = f"{'benchmark':<22}{'input':<28}{'ops/sec':>12}{'mean us':>14}{'alloc KB':>10}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if "skipped" in r:
+            lines.append(f"{r['name']:<22}{r['size']:<28}  skipped ({r['skipped']})")
+        else:
+            lines.append(f"{r['name']:<22}{r['size']:<28}{r['ops_per_sec']:>12,.1f}{r['mean_us']:>14,.2f}"
+                         f"{r['alloc_kb']:>10,.1f}")
+    return "\n".join(lines)
+
+
+def compare(results: Sequence[Dict[str, Any]], baseline: Sequence[Dict[str, Any]],
+            tolerance: float = 0.2) -> List[str]:
+    """Describe each benchmark whose ops/sec fell, or whose allocations grew, by more than tolerance"""
+    previous = {(r["name"], r["size"]): r for r in baseline if "skipped" not in r}
+    regressions = []
+    for r in results:
+        before = previous.get((r["name"], r["size"]))
+        if not before or "skipped" in r:
+            continue
+        label = f"{r['name']} [{r['size']}]"
+        if before["ops_per_sec"] and r["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{label}: {before['ops_per_sec']} -> {r['ops_per_sec']} ops/sec")
+        if before["alloc_kb"] and r["alloc_kb"] > before["alloc_kb"] * (1 + tolerance):
+            regressions.append(f"{label}: {before['alloc_kb']} -> {r['alloc_kb']} KB allocated")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmark the backend's CPU hot paths")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="seconds per timing repeat")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    # The agents log at INFO on every call, which would swamp the report and the timings
+    logging.disable(logging.INFO)
+
+    selected = [b for b in BENCHMARKS if args.filter in b.name]
+    results = run(selected, args.min_time, args.repeats)
+    print(format_report(results))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Amadeus-compatible stand-in for offline load tests.
+
+Serves the endpoints the agents call: OAuth token, flight offers, hotel
+list by geocode and hotel offers. Responses are synthetic but shaped like
+the real API and deterministic for the same query, so caches behave as
+they would in production. Run it and point the backend at it:
+
+    python -m loadtest.mock_amadeus --port 8081 --latency-ms 300 --rate-limit 10
+    AMADEUS_BASE_URL=http://127.0.0.1:8081 AMADEUS_API_KEY=mock AMADEUS_API_SECRET=mock uvicorn main:app
+"""
+import argparse
+import hashlib
+import itertools
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from loadtest.profile import Profile, add_profile_arguments, profile_from_args
+
+CARRIERS = {"AI": "AIR INDIA", "6E": "INDIGO", "UK": "VISTARA", "EK": "EMIRATES", "SQ": "SINGAPORE AIRLINES"}
+FLIGHT_OFFERS_PER_SEARCH = 20
+# Hotels are laid out on a fixed grid of tiles so overlapping searches see the same hotels
+HOTEL_TILE_DEGREES = 0.05
+HOTELS_PER_TILE = 1
+HOTEL_OFFER_RATE = 0.7  # share of hotels with availability
+
+
+def _unauthorized() -> JSONResponse:
+    return JSONResponse({"errors": [{"status": 401, "code": 38190, "title": "Invalid access token"}]},
+                        status_code=401)
+
+
+def flight_offers(origin: str, destination: str, departure_date: str, adults: int, count: int) -> Dict[str, Any]:
+    rng = random.Random(f"{origin}-{destination}-{departure_date}-{adults}")
+    departure_day = datetime.strptime(departure_date, "%Y-%m-%d")
+    offers = []
+    for index in range(count):
+        carrier = rng.choice(list(CARRIERS))
+        stops = rng.choice((0, 0, 0, 1, 1, 2))
+        minutes = rng.randint(70, 240) + stops * rng.randint(60, 180)
+        departure = departure_day + timedelta(minutes=rng.randint(0, 23 * 60))
+        price = round(rng.uniform(2500, 25000) * adults, 2)
+        segments = []
+        leg_start = departure
+        for leg in range(stops + 1):
+            leg_end = departure + timedelta(minutes=minutes * (leg + 1) // (stops + 1))
+            segments.append({
+                "departure": {"iataCode": origin if leg == 0 else f"X{leg}{origin[:1]}", "at": leg_start.isoformat()},
+                "arrival": {"iataCode": destination if leg == stops else f"X{leg + 1}{origin[:1]}",
+                            "at": leg_end.isoformat()},
+                "carrierCode": carrier,
+                "number": str(rng.randint(100, 9999)),
+                "aircraft": {"code": rng.choice(("320", "321", "738", "77W", "359"))},
+                "numberOfStops": 0,
+            })
+            leg_start = leg_end
+        offers.append({
+            "type": "flight-offer",
+            "id": str(index + 1),
+            "source": "GDS",
+            "numberOfBookableSeats": rng.randint(1, 9),
+            "itineraries": [{"duration": f"PT{minutes // 60}H{minutes % 60}M", "segments": segments}],
+            "price": {"currency": "INR", "total": f"{price:.2f}", "base": f"{price * 0.85:.2f}",
+                      "grandTotal": f"{price:.2f}"},
+            "validatingAirlineCodes": [carrier],
+        })
+    return {
+        "meta": {"count": len(offers)},
+        "data": offers,
+        "dictionaries": {"carriers": {code: CARRIERS[code] for code in {o["validatingAirlineCodes"][0] for o in offers}}},
+    }
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2)
+    return 2 * 6371.0088 * math.asin(min(1.0, math.sqrt(a)))
+
+
+def hotels_by_geocode(latitude: float, longitude: float, radius_km: float) -> List[Dict[str, Any]]:
+    lat_span = radius_km / 111.2
+    lon_span = lat_span / max(math.cos(math.radians(latitude)), 0.01)
+    hotels = []
+    rows = range(math.floor((latitude - lat_span) / HOTEL_TILE_DEGREES),
+                 math.floor((latitude + lat_span) / HOTEL_TILE_DEGREES) + 1)
+    columns = range(math.floor((longitude - lon_span) / HOTEL_TILE_DEGREES),
+                    math.floor((longitude + lon_span) / HOTEL_TILE_DEGREES) + 1)
+    for row, column in itertools.product(rows, columns):
+        rng = random.Random(f"tile-{row}-{column}")
+        for n in range(HOTELS_PER_TILE):
+            hotel_lat = (row + rng.random()) * HOTEL_TILE_DEGREES
+            hotel_lon = (column + rng.random()) * HOTEL_TILE_DEGREES
+            distance = _haversine_km(latitude, longitude, hotel_lat, hotel_lon)
+            if distance > radius_km:
+                continue
+            chain = rng.choice(("MC", "HI", "HL", "RT", "AC", "YX"))
+            hotels.append({
+                "chainCode": chain,
+                "iataCode": "XXX",
+                "dupeId": 700000000 + abs(row * 100003 + column) % 100000000,
+                "name": f"{chain} HOTEL {abs(row) % 1000}-{abs(column) % 1000}-{n}",
+                "hotelId": chain + hashlib.md5(f"{row}:{column}:{n}".encode()).hexdigest()[:6].upper(),
+                "geoCode": {"latitude": round(hotel_lat, 5), "longitude": round(hotel_lon, 5)},
+                "address": {"countryCode": "XX"},
+                "rating": rng.randint(2, 5),
+                "distance": {"value": round(distance, 2), "unit": "KM"},
+            })
+    hotels.sort(key=lambda hotel: hotel["distance"]["value"])
+    return hotels
+
+
+def hotel_offers(hotel_ids: List[str], check_in: str, check_out: str, adults: int) -> List[Dict[str, Any]]:
+    nights = max((datetime.strptime(check_out, "%Y-%m-%d") - datetime.strptime(check_in, "%Y-%m-%d")).days, 1)
+    data = []
+    for hotel_id in hotel_ids:
+        rng = random.Random(f"{hotel_id}-{check_in}-{check_out}-{adults}")
+        if rng.random() > HOTEL_OFFER_RATE:
+            continue
+        nightly = rng.uniform(2000, 30000)
+        data.append({
+            "type": "hotel-offers",
+            "hotel": {"type": "hotel", "hotelId": hotel_id},
+            "available": True,
+            "offers": [{
+                "id": f"{hotel_id}{check_in.replace('-', '')}",
+                "checkInDate": check_in,
+                "checkOutDate": check_out,
+                "guests": {"adults": adults},
+                "price": {"currency": "INR", "base": f"{nightly * nights * 0.88:.2f}",
+                          "total": f"{nightly * nights:.2f}"},
+            }],
+        })
+    return data
+
+
+def create_app(profile: Profile = None) -> FastAPI:
+    profile = profile or Profile()
+    app = FastAPI(title="Amadeus stand-in")
+    tokens = itertools.count(1)
+
+    def authorized(request: Request) -> bool:
+        return request.headers.get("authorization", "").startswith("Bearer mock-")
+
+    @app.post("/v1/security/oauth2/token")
+    async def token(request: Request):
+        await profile.delay()
+        form = parse_qs((await request.body()).decode())
+        if form.get("grant_type") != ["client_credentials"]:
+            return JSONResponse({"error": "invalid_request"}, status_code=400)
+        return {"type": "amadeusOAuth2Token", "access_token": f"mock-{next(tokens)}",
+                "token_type": "Bearer", "expires_in": 1799, "state": "approved"}
+
+    @app.get("/v2/shopping/flight-offers")
+    async def search_flights(request: Request):
+        if not authorized(request):
+            return _unauthorized()
+        await profile.delay()
+        fault = profile.fault()
+        if fault:
+            return fault
+        params = request.query_params
+        count = min(int(params.get("max", FLIGHT_OFFERS_PER_SEARCH)), FLIGHT_OFFERS_PER_SEARCH)
+        return flight_offers(params["originLocationCode"], params["destinationLocationCode"],
+                             params["departureDate"], int(params.get("adults", 1)), count)
+
+    @app.get("/v1/reference-data/locations/hotels/by-geocode")
+    async def search_hotels(request: Request):
+        if not authorized(request):
+            return _unauthorized()
+        await profile.delay()
+        fault = profile.fault()
+        if fault:
+            return fault
+        params = request.query_params
+        hotels = hotels_by_geocode(float(params["latitude"]), float(params["longitude"]),
+                                   float(params.get("radius", 5)))
+        return {"data": hotels, "meta": {"count": len(hotels)}}
+
+    @app.get("/v3/shopping/hotel-offers")
+    async def search_hotel_offers(request: Request):
+        if not authorized(request):
+            return _unauthorized()
+        await profile.delay()
+        fault = profile.fault()
+        if fault:
+            return fault
+        params = request.query_params
+        data = hotel_offers(params["hotelIds"].split(","), params["checkInDate"], params["checkOutDate"],
+                            int(params.get("adults", 1)))
+        if not data:
+            return JSONResponse({"errors": [{"status": 400, "code": 3664, "title": "NO ROOMS AVAILABLE"}]},
+                                status_code=400)
+        return {"data": data}
+
+    @app.get("/stats")
+    async def stats():
+        return profile.stats()
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Amadeus stand-in")
+    parser.add_argument("--port", type=int, default=8081)
+    add_profile_arguments(parser, default_latency_ms=300)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(profile_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Latency and failure profile shared by the local upstream stand-ins.
+
+Each request waits latency_ms +/- jitter_ms, is refused with 429 and a
+Retry-After once more than rate_limit requests arrive per second (0 turns
+this off), and otherwise fails with a 500 at error_rate.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+
+
+class Profile:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._random = random.Random(seed)
+        self._tokens = max(rate_limit, 1.0)
+        self._updated = time.monotonic()
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "Profile":
+        """Read <PREFIX>_LATENCY_MS, _JITTER_MS, _ERROR_RATE and _RATE_LIMIT"""
+        return cls(
+            latency_ms=float(os.getenv(f"{prefix}_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv(f"{prefix}_JITTER_MS", "0")),
+            error_rate=float(os.getenv(f"{prefix}_ERROR_RATE", "0")),
+            rate_limit=float(os.getenv(f"{prefix}_RATE_LIMIT", "0")),
+        )
+
+    async def delay(self):
+        seconds = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    def fault(self) -> Optional[JSONResponse]:
+        """The error response this request gets, or None to serve it"""
+        self.requests += 1
+        if self.rate_limit > 0:
+            now = time.monotonic()
+            self._tokens = min(max(self.rate_limit, 1.0), self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens < 1:
+                self.throttled += 1
+                retry_after = (1 - self._tokens) / self.rate_limit
+                return JSONResponse({"errors": [{"status": 429, "code": 38194, "title": "Too many requests"}]},
+                                    status_code=429, headers={"Retry-After": f"{retry_after:.2f}"})
+            self._tokens -= 1
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.failed += 1
+            return JSONResponse({"errors": [{"status": 500, "code": 141, "title": "SYSTEM ERROR HAS OCCURRED"}]},
+                                status_code=500)
+        return None
+
+    def stats(self):
+        return {"requests": self.requests, "throttled": self.throttled, "failed": self.failed}
+
+
+def add_profile_arguments(parser, default_latency_ms: float):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency-ms", type=float, default=default_latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=default_latency_ms / 4)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failed with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/second before 429s; 0 = unlimited")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def profile_from_args(args) -> Profile:
+    return Profile(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit, args.seed)
@@ -0,0 +1,169 @@
+"""
+Startup benchmark: import time and memory per backend module.
+
+Imports each module in a fresh interpreter (as a worker process would) and
+records the wall time of the import and how much the process's peak RSS
+grew, taking the median over a few runs. --top lists the top-level
+packages that took longest to import, from python -X importtime. Results
+can be saved as a baseline and later runs compared against it:
+
+    python -m loadtest.startup --json startup.json --top 10
+    python -m loadtest.startup --baseline startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "core.tracing",
+    "geo.gazetteer",
+    "agents.flight_agent.flight_agent",
+    "agents.hotel_agent.hotel_agent",
+    "agents.rag_agent.rag_agent",
+    "orchestrator.chatbot_orchestrator",
+    "main",
+]
+
+RESULT_PREFIX = "STARTUP_RESULT "
+
+# Runs in the child interpreter; prints one result line after the import
+_PROBE = """
+import importlib, json, sys, time
+sys.path.insert(0, {backend!r})
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS, KB elsewhere
+
+before = peak_rss_kb()
+started = time.perf_counter()
+error = None
+try:
+    importlib.import_module({module!r})
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+result = {{"import_ms": (time.perf_counter() - started) * 1000, "baseline_rss_kb": before,
+          "rss_kb": peak_rss_kb() - before, "modules_loaded": len(sys.modules), "error": error}}
+print({prefix!r} + json.dumps(result))
+"""
+
+
+def _run_probe(module: str, extra_args: Sequence[str] = ()) -> Tuple[Dict[str, Any], str]:
+    probe = _PROBE.format(backend=BACKEND_DIR, module=module, prefix=RESULT_PREFIX)
+    completed = subprocess.run([sys.executable, *extra_args, "-c", probe], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, timeout=300)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):]), completed.stderr
+    return {"error": (completed.stderr.strip().splitlines() or ["probe produced no result"])[-1]}, completed.stderr
+
+
+def measure_module(module: str, runs: int = 3) -> Dict[str, Any]:
+    """Median import time and RSS growth of module over runs fresh interpreters"""
+    samples = []
+    for _ in range(runs):
+        sample, _ = _run_probe(module)
+        if sample.get("error"):
+            return {"module": module, "error": sample["error"]}
+        samples.append(sample)
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "rss_mb": round(statistics.median(s["rss_kb"] for s in samples) / 1024, 1),
+        "baseline_rss_mb": round(statistics.median(s["baseline_rss_kb"] for s in samples) / 1024, 1),
+        "modules_loaded": samples[0]["modules_loaded"],
+    }
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int]]:
+    """(package, cumulative microseconds) for each top-level import in -X importtime output"""
+    packages = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part for part in line[len("import time:"):].split("|"))
+        # Nested imports are indented under the module that triggered them
+        if not name.startswith("  "):
+            packages.append((name.strip(), int(cumulative)))
+    return packages
+
+
+def slowest_imports(module: str, top: int = 10) -> List[Dict[str, Any]]:
+    _, stderr = _run_probe(module, ("-X", "importtime"))
+    packages = sorted(parse_importtime(stderr), key=lambda item: item[1], reverse=True)
+    return [{"package": name, "cumulative_ms": round(us / 1000, 1)} for name, us in packages[:top]]
+
+
+def format_report(results: Sequence[Dict[str, Any]]) -> str:
+    header = f"{'module':<38}{'import ms':>11}{'RSS MB':>9}{'modules':>9}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if r.get("error"):
+            lines.append(f"{r['module']:<38}  failed ({r['error']})")
+        else:
+            lines.append(f"{r['module']:<38}{r['import_ms']:>11.1f}{r['rss_mb']:>9.1f}{r['modules_loaded']:>9}")
+    return "\n".join(lines)
+
+
+def compare(results: Sequence[Dict[str, Any]], baseline: Sequence[Dict[str, Any]],
+            tolerance: float = 0.2) -> List[str]:
+    """Describe each module whose import time or RSS grew by more than tolerance"""
+    previous = {r["module"]: r for r in baseline if not r.get("error")}
+    regressions = []
+    for r in results:
+        before = previous.get(r["module"])
+        if not before or r.get("error"):
+            continue
+        if before["import_ms"] and r["import_ms"] > before["import_ms"] * (1 + tolerance):
+            regressions.append(f"{r['module']}: import {before['import_ms']} -> {r['import_ms']} ms")
+        if before["rss_mb"] and r["rss_mb"] > before["rss_mb"] * (1 + tolerance):
+            regressions.append(f"{r['module']}: RSS {before['rss_mb']} -> {r['rss_mb']} MB")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure import time and memory of backend modules")
+    parser.add_argument("--module", default=",".join(MODULES), help="comma-separated modules to import")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per module (median is reported)")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest top-level imports per module")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    modules = [name.strip() for name in args.module.split(",") if name.strip()]
+    results = [measure_module(module, args.runs) for module in modules]
+    if args.top:
+        for result in results:
+            if not result.get("error"):
+                result["slowest_imports"] = slowest_imports(result["module"], args.top)
+    print(format_report(results))
+    for result in results:
+        if result.get("slowest_imports"):
+            print(f"\n{result['module']}:")
+            for item in result["slowest_imports"]:
+                print(f"  {item['cumulative_ms']:>9.1f} ms  {item['package']}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
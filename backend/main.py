@@ -19,20 +19,185 @@ print(f"GEMINI_API_KEY loaded: {os.getenv('GEMINI_API_KEY') is not None}")
 # Add the backend directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from agents.flight_agent.flight_agent import FlightAgent
-from agents.hotel_agent.hotel_agent import HotelAgent
+from agents.flight_agent.flight_agent import (FlightAgent, calendar_dates, flight_offer_cache, flight_search_coalescer,
+                                              flight_upstream)
+from agents.flight_agent.offers import DEFAULT_PAGE_SIZE, query_offers, serialize_result
+from agents.hotel_agent.hotel_agent import (HotelAgent, hotel_offer_cache, hotel_offers_upstream,
+                                           hotel_search_coalescer, hotel_upstream)
+from agents.hotel_agent.ranking import DEFAULT_PAGE_SIZE as HOTEL_PAGE_SIZE, rank_hotels
+from agents.hotel_agent.reference import hotel_reference_cache
 from agents.rag_agent.rag_agent import RAGAgent
+from agents.rag_agent.router import LLMRouter
 from orchestrator.chatbot_orchestrator import ChatbotOrchestrator
+from core.admission import AdmissionClass, AdmissionMiddleware
+from core.compression import CompressionMiddleware
+from core.deadline import DeadlineMiddleware
+from core.http_client import close_http_client, get_http_client
+from core.markdown import MarkdownNormalizer, normalize_markdown
+from core.jobs import FINISHED as FINISHED_JOB_STATUSES, PRIORITIES, JobQueue, QueueFull
+from core.responses import FastJSONResponse, project
+from core.tracing import metrics, span, traced
+from geo.gazetteer import get_gazetteer
+from geo.airports import get_airport_index
 import asyncio
 import json
 import logging
+import time
 from datetime import datetime, timedelta
-import re
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="NLP Multi-Agent Travel Chatbot", version="1.0.0")
+# Seconds startup waits for warm-up before serving; slower components finish in the background
+STARTUP_WARMUP_TIMEOUT = float(os.getenv("STARTUP_WARMUP_TIMEOUT", "60"))
+
+# Set once the RAG warm-up has built the shared index and LLM clients
+orchestrator: ChatbotOrchestrator = None
+chat_agent: RAGAgent = None
+
+# component -> {"status": pending|ready|degraded|skipped|failed, "elapsed_ms", "detail"}
+readiness: dict = {}
+
+async def _warm_component(name: str, warm):
+    """Run one warm-up step and record how it went for /ready"""
+    readiness[name] = {"status": "pending"}
+    started = time.perf_counter()
+    try:
+        status, detail = await warm()
+    except Exception as e:
+        logging.warning(f"Warm-up of {name} failed: {e}")
+        status, detail = "failed", str(e)
+    readiness[name] = {"status": status, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if detail:
+        readiness[name]["detail"] = detail
+
+async def _warm_rag():
+    global orchestrator, chat_agent
+    # Opens (or builds) the vector index and LLM clients once; every later RAGAgent() reuses them
+    # (a failed build is kept and retried in the background, never per request)
+    chat_agent, orchestrator = await asyncio.to_thread(lambda: (RAGAgent(), ChatbotOrchestrator()))
+    if chat_agent.degraded:
+        return "degraded", chat_agent.initialization_error or "vector index unavailable; using fallback itineraries"
+    return "ready", None
+
+def _unavailable(what: str, component: str = "rag_index") -> HTTPException:
+    """503 for an endpoint whose warm-up component isn't usable, worded the way /ready reports it"""
+    state = readiness.get(component, {"status": "pending"})
+    if state["status"] == "pending":
+        detail = f"{what} is still warming up. Check /ready."
+    else:
+        detail = f"{what} is unavailable ({component} {state['status']}: {state.get('detail', 'unknown error')}). Check /ready."
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+
+def _rag_agent() -> RAGAgent:
+    """A RAGAgent sharing the components the warm-up built; 503 until it has built them"""
+    if not chat_agent:
+        raise _unavailable("RAG agent")
+    return RAGAgent()
+
+async def _warm_token():
+    tokens = FlightAgent().tokens
+    if not tokens.has_credentials:
+        return "skipped", "Amadeus credentials not configured"
+    await tokens.get_token()
+    return "ready", None
+
+async def _warm_http_pool():
+    get_http_client()
+    return "ready", None
+
+async def _warm_caches():
+    loaded = await asyncio.gather(*(cache.prefill() for cache in
+                                    (flight_offer_cache, hotel_offer_cache, hotel_reference_cache)))
+    return "ready", f"{sum(loaded)} entries loaded"
+
+async def _warm_gazetteer():
+    def warm():
+        get_gazetteer().warm()
+        get_airport_index().warm()
+
+    await asyncio.to_thread(warm)
+    return "ready", None
+
+WARMUP_STEPS = {
+    "rag_index": _warm_rag,
+    "amadeus_token": _warm_token,
+    "http_pool": _warm_http_pool,
+    "caches": _warm_caches,
+    "gazetteer": _warm_gazetteer,
+}
+
+# Itinerary generation submitted as background jobs (see /api/itinerary-jobs)
+itinerary_jobs = JobQueue(
+    "itinerary_jobs",
+    os.getenv("ITINERARY_JOB_STORE_PATH", "cache/itinerary_jobs.sqlite3"),
+    workers=int(os.getenv("ITINERARY_JOB_WORKERS", "2")),
+    max_queued=int(os.getenv("ITINERARY_JOB_MAX_QUEUED", "100")),
+    job_timeout=float(os.getenv("ITINERARY_JOB_TIMEOUT", "300")),
+)
+# Longest a status long-poll or event stream stays open; kept under the default request deadline
+JOB_WAIT_MAX_SECONDS = 25.0
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(_warm_component(name, warm)) for name, warm in WARMUP_STEPS.items()]
+    itinerary_jobs.register("itinerary", lambda params: generate_integrated_itinerary(**params))
+    await itinerary_jobs.start()
+    _, pending = await asyncio.wait(tasks, timeout=STARTUP_WARMUP_TIMEOUT)
+    logging.info(f"Warm-up finished in {time.perf_counter() - started:.1f}s "
+                 f"({len(pending)} component(s) still warming in the background)")
+    yield
+    for task in pending:
+        task.cancel()
+    await itinerary_jobs.stop()
+    # Drop pooled upstream connections cleanly on shutdown
+    await close_http_client()
+
+app = FastAPI(title="NLP Multi-Agent Travel Chatbot", version="1.0.0", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
+
+# Per-endpoint request budgets in seconds; clients can ask for less via X-Request-Timeout
+ENDPOINT_DEADLINES = {
+    "/chat": 60.0,
+    "/chat/agents": 60.0,
+    "/rag": 60.0,
+    "/rag/integrated": 90.0,
+    "/rag/stream": 60.0,
+    "/flight": 30.0,
+    "/api/search-flights": 30.0,
+    "/api/flight-calendar": 45.0,
+    "/hotel": 20.0,
+    "/api/search-hotels": 20.0,
+}
+
+# Concurrency and queue limits per endpoint class, so LLM spikes can't starve searches and reads
+ADMISSION_CLASSES = [
+    AdmissionClass.from_env("llm", max_concurrency=8, max_queued=16, queue_timeout=10.0),
+    AdmissionClass.from_env("search", max_concurrency=32, max_queued=64, queue_timeout=5.0),
+    AdmissionClass.from_env("read", max_concurrency=256, max_queued=256, queue_timeout=2.0),
+]
+ENDPOINT_CLASSES = {
+    "/chat": "llm",
+    "/chat/agents": "llm",
+    "/rag": "llm",
+    "/rag/integrated": "llm",
+    "/rag/stream": "llm",
+    "/flight": "search",
+    "/hotel": "search",
+    "/api/search-flights": "search",
+    "/api/search-hotels": "search",
+    "/api/flight-calendar": "search",
+}
+
+# Inside the deadline middleware, so time spent queued counts against the request's budget
+app.add_middleware(AdmissionMiddleware, classes=ADMISSION_CLASSES, endpoint_classes=ENDPOINT_CLASSES,
+                   default_class="read", exempt=("/ready", "/metrics"))
+app.add_middleware(DeadlineMiddleware, endpoint_deadlines=ENDPOINT_DEADLINES)
+# gzip/brotli per Accept-Encoding; streamed bodies are compressed chunk by chunk
+app.add_middleware(CompressionMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -43,16 +208,95 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the orchestrator
-orchestrator = ChatbotOrchestrator()
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span per request; named after the route template to keep metric labels bounded"""
+    with span("http.request", method=request.method) as request_span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        request_span.name = f"{request.method} {route.path if route else 'unmatched'}"
+        request_span.set_attribute("status_code", response.status_code)
+        return response
+
+def _single_flight_samples():
+    samples = []
+    for coalescer in (flight_search_coalescer, hotel_search_coalescer):
+        stats = coalescer.stats()
+        labels = {"name": stats["name"]}
+        samples.append(("travel_single_flight_calls_total", "counter", labels, stats["calls"]))
+        samples.append(("travel_single_flight_hits_total", "counter", labels, stats["hits"]))
+        samples.append(("travel_single_flight_waiters", "gauge", labels, stats["waiters"]))
+    return samples
+
+metrics.register_collector(_single_flight_samples)
+
+def _cache_samples():
+    samples = []
+    for cache in (flight_offer_cache, hotel_offer_cache, hotel_reference_cache):
+        stats = cache.stats()
+        labels = {"name": stats["name"]}
+        samples.append(("travel_cache_entries", "gauge", labels, stats["size"]))
+        for outcome in ("hits", "stale_hits", "misses", "evictions"):
+            samples.append((f"travel_cache_{outcome}_total", "counter", labels, stats[outcome]))
+    return samples
+
+metrics.register_collector(_cache_samples)
+
+def _upstream_samples():
+    samples = []
+    for provider in (flight_upstream, hotel_upstream, hotel_offers_upstream):
+        stats = provider.stats()
+        labels = {"provider": stats["name"]}
+        samples.append(("travel_upstream_circuit_open", "gauge", labels, int(stats["circuit"] != "closed")))
+        samples.append(("travel_upstream_in_flight", "gauge", labels, stats["in_flight"]))
+        samples.append(("travel_upstream_queued", "gauge", labels, stats["queued"] + stats["rate_limit_waiting"]))
+        samples.append(("travel_upstream_retries_total", "counter", labels, stats["retries"]))
+        samples.append(("travel_upstream_rejected_total", "counter", labels, stats["rejected"]))
+    return samples
+
+metrics.register_collector(_upstream_samples)
+
+def _job_samples():
+    stats = itinerary_jobs.stats()
+    labels = {"queue": stats["name"]}
+    samples = [("travel_jobs_queued", "gauge", labels, stats["queued"]),
+               ("travel_jobs_running", "gauge", labels, stats["running"])]
+    for outcome in ("submitted", "succeeded", "failed", "rejected"):
+        samples.append((f"travel_jobs_{outcome}_total", "counter", labels, stats[outcome]))
+    return samples
+
+metrics.register_collector(_job_samples)
+
+def _admission_samples():
+    samples = []
+    for admission in ADMISSION_CLASSES:
+        stats = admission.stats()
+        labels = {"class": stats["name"]}
+        samples.append(("travel_admission_in_flight", "gauge", labels, stats["in_flight"]))
+        samples.append(("travel_admission_queued", "gauge", labels, stats["queued"]))
+        samples.append(("travel_admission_admitted_total", "counter", labels, stats["admitted"]))
+        for reason in ("queue_full", "queue_timeout"):
+            samples.append(("travel_admission_shed_total", "counter", {**labels, "reason": reason},
+                            stats[f"shed_{reason}"]))
+    return samples
 
-# Initialize RAG agent for chat endpoint
-rag_agent = None
-try:
-    rag_agent = RAGAgent()
-    logging.info("RAG agent initialized successfully")
-except Exception as e:
-    logging.error(f"Failed to initialize RAG agent: {e}")
+metrics.register_collector(_admission_samples)
+
+def _llm_router_stats():
+    llm = getattr(chat_agent, "llm", None)
+    return llm.stats() if isinstance(llm, LLMRouter) else []
+
+def _llm_samples():
+    samples = []
+    for stats in _llm_router_stats():
+        labels = {"provider": stats["name"]}
+        samples.append(("travel_llm_circuit_open", "gauge", labels, int(stats["circuit"] != "closed")))
+        samples.append(("travel_llm_error_rate", "gauge", labels, stats["error_rate"]))
+        for outcome in ("calls", "wins", "hedges", "errors", "cancelled"):
+            samples.append((f"travel_llm_{outcome}_total", "counter", labels, stats[outcome]))
+    return samples
+
+metrics.register_collector(_llm_samples)
 
 # Pydantic models for request/response
 class ChatMessage(BaseModel):
@@ -77,11 +321,12 @@ def read_root():
 async def flight_agent(
     origin: str = Query(..., description="Origin airport code"),
     destination: str = Query(..., description="Destination airport code"),
-    departure_date: str = Query(..., description="Departure date in YYYY-MM-DD format")
+    departure_date: str = Query(..., description="Departure date in YYYY-MM-DD format"),
+    fields: str = Query(None, description="Comma-separated dotted field paths to return, e.g. offers.total")
 ):
     agent = FlightAgent()
     result = await agent.search_flights(origin, destination, departure_date)
-    return result
+    return project(serialize_result(result), fields)
 
 @app.get("/hotel")
 async def hotel_agent(
@@ -90,7 +335,12 @@ async def hotel_agent(
     checkin: str = Query(..., description="Check-in date in YYYY-MM-DD format"),
     checkout: str = Query(..., description="Check-out date in YYYY-MM-DD format"),
     adults: int = Query(2, description="Number of adults"),
-    radius: int = Query(50, description="Search radius in kilometers")
+    radius: int = Query(50, description="Search radius in kilometers"),
+    with_offers: bool = Query(False, description="Attach prices and availability for the nearest hotels"),
+    limit: int = Query(None, description="Return only the nearest N hotels, or the page size when sorting"),
+    sort: str = Query(None, description="Rank and page the hotels: best, distance, price or rating"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    fields: str = Query(None, description="Comma-separated dotted field paths to return, e.g. data.name,data.geoCode")
 ):
     try:
         agent = HotelAgent()
@@ -100,9 +350,17 @@ async def hotel_agent(
             checkin=checkin,
             checkout=checkout,
             adults=adults,
-            radius=radius
+            radius=radius,
+            with_offers=with_offers,
+            # Ranking needs every hotel in the radius, not just the nearest
+            limit=None if sort else limit
         )
-        return result
+        if sort:
+            page, next_cursor, total = rank_hotels(result.get("data") or [], sort, cursor, limit or HOTEL_PAGE_SIZE)
+            result = {**result, "data": page, "next_cursor": next_cursor, "total": total}
+        return project(result, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Hotel agent error: {e}")
         raise HTTPException(status_code=500, detail=f"Hotel search failed: {str(e)}")
@@ -111,14 +369,15 @@ async def hotel_agent(
 async def rag_agent(
     query: str = Query(..., description="Travel query for itinerary generation"),
     include_flights: bool = Query(False, description="Include flight data in itinerary"),
-    include_hotels: bool = Query(False, description="Include hotel data in itinerary")
+    include_hotels: bool = Query(False, description="Include hotel data in itinerary"),
+    fields: str = Query(None, description="Comma-separated dotted field paths to return, e.g. itinerary,location,flight_data.offers.total")
 ):
     """
     Generate a travel itinerary using RAG agent
     Example: /rag?query=Plan a 5-day luxury trip to Tokyo&include_flights=true&include_hotels=true
     """
     try:
-        agent = RAGAgent()
+        agent = _rag_agent()
         
         # Check if initialization failed
         if agent.initialization_error:
@@ -137,7 +396,7 @@ async def rag_agent(
         if "itinerary" in result:
             result["itinerary"] = preprocess_markdown(result["itinerary"])
         
-        return {
+        return project({
             "success": True,
             "query": query,
             "itinerary": result.get("itinerary"),
@@ -146,13 +405,41 @@ async def rag_agent(
             "sources": result.get("sources", []),
             "flight_data": result.get("flight_data") if include_flights else None,
             "hotel_data": result.get("hotel_data") if include_hotels else None
-        }
+        }, fields)
     except HTTPException:
         raise
     except Exception as e:
         logging.error(f"RAG endpoint error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"RAG agent exception: {str(e)}")
 
+@app.get("/rag/stream")
+async def stream_itinerary(query: str = Query(..., description="Travel query for itinerary generation")):
+    """The itinerary as normalized markdown, streamed line by line while the LLM writes it"""
+    agent = _rag_agent()
+    if agent.initialization_error:
+        raise HTTPException(status_code=500,
+                            detail=f"RAG agent initialization failed: {agent.initialization_error}")
+
+    async def body():
+        normalizer = MarkdownNormalizer()
+        started = time.perf_counter()
+        first_line_at = None
+        try:
+            async for text in agent.stream_itinerary(query):
+                piece = normalizer.feed(text)
+                if piece:
+                    first_line_at = first_line_at or time.perf_counter()
+                    yield piece
+            yield normalizer.close()
+        except Exception as e:
+            # The status line is already sent; end the stream and leave the reason in the logs
+            logging.error(f"RAG stream error: {e}")
+            return
+        logging.info(f"Streamed itinerary in {time.perf_counter() - started:.1f}s"
+                     + (f", first line after {first_line_at - started:.2f}s" if first_line_at else ""))
+
+    return StreamingResponse(body(), media_type="text/markdown; charset=utf-8")
+
 @app.get("/rag/integrated")
 async def integrated_itinerary(
     query: str = Query(..., description="Travel query"),
@@ -160,61 +447,66 @@ async def integrated_itinerary(
     destination: str = Query(None, description="Destination airport code"),
     departure_date: str = Query(None, description="Departure date in YYYY-MM-DD format"),
     arrival_date: str = Query(None, description="Arrival date in YYYY-MM-DD format"),
-    departure_date_hotel: str = Query(None, description="Hotel departure date in YYYY-MM-DD format")
+    departure_date_hotel: str = Query(None, description="Hotel departure date in YYYY-MM-DD format"),
+    fields: str = Query(None, description="Comma-separated dotted field paths to return, e.g. itinerary,location")
 ):
     """Generate integrated itinerary with flight and hotel data"""
     try:
-        # Initialize agents
-        flight_agent = FlightAgent()
-        hotel_agent = HotelAgent()
-        rag_agent = RAGAgent()
-        
-        # Set default dates if not provided
-        if not departure_date:
-            departure_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
-        if not arrival_date:
-            arrival_date = (datetime.now() + timedelta(days=37)).strftime("%Y-%m-%d")
-        if not departure_date_hotel:
-            departure_date_hotel = arrival_date
-        
-        # Search for flights if destination is provided
-        flight_data = None
-        if destination:
-            try:
-                flight_data = await flight_agent.search_flights(origin, destination, departure_date)
-                rag_agent.set_flight_data(flight_data)
-            except Exception as e:
-                logging.warning(f"Could not fetch flight data: {e}")
-        
-        # Search for hotels if destination is provided
-        hotel_data = None
-        if destination:
-            try:
-                # Use a simplified destination ID mapping
-                dest_id = "-1456928"  # Default destination ID
-                hotel_data = await hotel_agent.search_hotels(
-                    dest_id=dest_id,
-                    search_type="CITY",
-                    arrival_date=departure_date,
-                    departure_date=departure_date_hotel,
-                    adults=2
-                )
-                rag_agent.set_hotel_data(hotel_data)
-            except Exception as e:
-                logging.warning(f"Could not fetch hotel data: {e}")
-        
-        # Generate integrated itinerary
-        result = await rag_agent.generate_itinerary(query)
-        return result
+        result = await generate_integrated_itinerary(query, origin, destination, departure_date, arrival_date,
+                                                     departure_date_hotel)
+        return project(result, fields)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def generate_integrated_itinerary(query: str, origin: str = "NYC", destination: str = None,
+                                        departure_date: str = None, arrival_date: str = None,
+                                        departure_date_hotel: str = None) -> dict:
+    """Fetch flights and hotels for the destination and generate an itinerary around them"""
+    # Initialize agents
+    flight_agent = FlightAgent()
+    hotel_agent = HotelAgent()
+    rag_agent = _rag_agent()
+    
+    # Set default dates if not provided
+    if not departure_date:
+        departure_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+    if not arrival_date:
+        arrival_date = (datetime.now() + timedelta(days=37)).strftime("%Y-%m-%d")
+    if not departure_date_hotel:
+        departure_date_hotel = arrival_date
+    
+    # Search for flights if destination is provided
+    if destination:
+        try:
+            flight_data = await flight_agent.search_flights(origin, destination, departure_date)
+            rag_agent.set_flight_data(flight_data)
+        except Exception as e:
+            logging.warning(f"Could not fetch flight data: {e}")
+    
+    # Search for hotels if destination is provided and resolvable
+    place = get_gazetteer().lookup(destination) if destination else None
+    if place:
+        try:
+            hotel_data = await hotel_agent.search_hotels(
+                latitude=place.latitude,
+                longitude=place.longitude,
+                checkin=departure_date,
+                checkout=departure_date_hotel,
+                adults=2
+            )
+            rag_agent.set_hotel_data(hotel_data)
+        except Exception as e:
+            logging.warning(f"Could not fetch hotel data: {e}")
+    
+    # Generate integrated itinerary
+    return await rag_agent.generate_itinerary(query)
+
 @app.post("/rag/set-flight-data")
 async def set_flight_data_for_rag(flight_data: dict):
     """Set flight data for RAG agent to use in itinerary generation"""
+    agent = _rag_agent()
     try:
-        agent = RAGAgent()
         agent.set_flight_data(flight_data)
         return {"success": True, "message": "Flight data set for RAG agent"}
     except Exception as e:
@@ -223,8 +515,8 @@ async def set_flight_data_for_rag(flight_data: dict):
 @app.post("/rag/set-hotel-data")
 async def set_hotel_data_for_rag(hotel_data: dict):
     """Set hotel data for RAG agent to use in itinerary generation"""
+    agent = _rag_agent()
     try:
-        agent = RAGAgent()
         agent.set_hotel_data(hotel_data)
         return {"success": True, "message": "Hotel data set for RAG agent"}
     except Exception as e:
@@ -237,56 +529,21 @@ async def add_itinerary(
     content: str = Query(..., description="Content of the itinerary"),
     metadata: str = Query(None, description="Optional metadata in JSON format")
 ):
-    agent = RAGAgent()
+    agent = _rag_agent()
     metadata_dict = json.loads(metadata) if metadata else None
     result = await agent.add_itinerary(title, location, content, metadata_dict)
     return result
 
 @app.get("/rag/{itinerary_id}")
 async def get_itinerary(itinerary_id: str):
-    agent = RAGAgent()
+    agent = _rag_agent()
     result = await agent.get_itinerary_by_id(itinerary_id)
     return result
 
+@traced("preprocess_markdown")
 def preprocess_markdown(text: str) -> str:
     """Clean and format markdown text from Gemini for better frontend display"""
-    
-    # Remove excessive dashes/horizontal rules that don't render well
-    text = re.sub(r'^-{3,}$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^\*{3,}$', '', text, flags=re.MULTILINE)
-    
-    # Fix heading formatting - ensure space after # symbols
-    text = re.sub(r'^(#{1,6})([^\s#])', r'\1 \2', text, flags=re.MULTILINE)
-    
-    # Ensure proper spacing around headings (double line break before, single after)
-    text = re.sub(r'\n(#{1,6}\s+[^\n]+)\n', r'\n\n\1\n', text)
-    
-    # Fix list formatting - ensure bullet points are properly formatted
-    text = re.sub(r'^\*\s+', '• ', text, flags=re.MULTILINE)
-    text = re.sub(r'^-\s+', '• ', text, flags=re.MULTILINE)
-    
-    # Ensure spacing before bullet lists (but not if already spaced)
-    text = re.sub(r'([^\n])\n(• )', r'\1\n\n\2', text)
-    
-    # Ensure spacing between bullet points groups
-    text = re.sub(r'(• [^\n]+)\n(#{2})', r'\1\n\n\2', text)
-    
-    # Clean up bold formatting
-    text = re.sub(r'\*\*\*([^*]+)\*\*\*', r'**\1**', text)  # Triple asterisks to double
-    
-    # Add spacing after bold section headers
-    text = re.sub(r'(\*\*[^*]+\*\*:)\s*\n', r'\1\n', text)
-    
-    # Clean up multiple consecutive blank lines (max 2)
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    
-    # Remove trailing whitespace from lines
-    text = '\n'.join(line.rstrip() for line in text.split('\n'))
-    
-    # Trim overall but ensure it starts clean
-    text = text.strip()
-    
-    return text
+    return normalize_markdown(text)
 
 @app.post("/chat")
 async def chat(request: ChatRequest):
@@ -294,11 +551,11 @@ async def chat(request: ChatRequest):
     try:
         logging.info(f"Received chat request: {request.message}")
         
-        if not rag_agent:
+        if not chat_agent:
             logging.error("RAG agent not initialized")
-            raise HTTPException(status_code=500, detail="RAG agent not initialized. Check server logs.")
+            raise _unavailable("RAG agent")
         
-        response = rag_agent.get_response(request.message)
+        response = chat_agent.get_response(request.message)
         
         # Preprocess the markdown response for better formatting
         response = preprocess_markdown(response)
@@ -306,6 +563,8 @@ async def chat(request: ChatRequest):
         logging.info(f"Chat response generated successfully")
         
         return {"response": response}
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
         logging.error(f"PDF file not found: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Travel guide PDF not found: {str(e)}")
@@ -313,18 +572,202 @@ async def chat(request: ChatRequest):
         logging.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+@app.post("/chat/agents")
+async def chat_with_agents(request: ChatMessage):
+    """Route a message through the orchestrator to the flight, hotel and itinerary agents"""
+    if not orchestrator:
+        raise _unavailable("Orchestrator")
+    result = await orchestrator.process_message(request.message, request.user_id)
+    return {"response": result["response"], "intents": result.get("intent_analysis", {}).get("intents", [])}
+
 @app.get("/conversation/{user_id}")
 async def get_conversation_history(user_id: str):
     """Get conversation history for a user"""
+    if not orchestrator:
+        raise _unavailable("Orchestrator")
     history = orchestrator.get_conversation_history(user_id)
     return {"conversation_history": history}
 
+@app.get("/ready")
+async def ready():
+    """Per-component warm-up status; 503 until every component has finished warming"""
+    warming = not readiness or any(c["status"] == "pending" for c in readiness.values())
+    # Serving, but these components fall back or answer 503 (see _unavailable)
+    degraded = sorted(name for name, c in readiness.items() if c["status"] in ("degraded", "failed"))
+    body = {"ready": not warming, "degraded": degraded, "components": readiness}
+    return FastJSONResponse(body, status_code=503 if warming else 200)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Per-stage and per-upstream latency histograms in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/single-flight")
+async def single_flight_stats():
+    """Upstream calls made vs. requests coalesced onto an identical in-flight search"""
+    return {"single_flight": [flight_search_coalescer.stats(), hotel_search_coalescer.stats()]}
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """Hit, stale-hit and miss counts for the upstream response caches"""
+    return {"caches": [flight_offer_cache.stats(), hotel_offer_cache.stats(), hotel_reference_cache.stats()]}
+
+@app.get("/stats/upstreams")
+async def upstream_stats():
+    """Circuit state, concurrency, queueing and retry counts per upstream provider"""
+    return {"upstreams": [flight_upstream.stats(), hotel_upstream.stats(), hotel_offers_upstream.stats()]}
+
 @app.delete("/conversation/{user_id}")
 async def clear_conversation_history(user_id: str):
     """Clear conversation history for a user"""
+    if not orchestrator:
+        raise _unavailable("Orchestrator")
     orchestrator.clear_conversation_history(user_id)
     return {"message": "Conversation history cleared"}
 
+ITINERARY_JOB_PARAMS = ("query", "origin", "destination", "departure_date", "arrival_date", "departure_date_hotel")
+
+def _job_view(job: dict) -> dict:
+    """Public fields of a job record"""
+    view = {key: job.get(key) for key in ("id", "kind", "status", "created_at", "started_at", "finished_at")}
+    if job.get("status") == "succeeded":
+        view["result"] = job.get("result")
+    if job.get("error"):
+        view["error"] = job["error"]
+    return view
+
+@app.post("/api/itinerary-jobs", status_code=202)
+async def submit_itinerary_job(request: dict):
+    """Queue an integrated itinerary and return its job id straight away"""
+    if not request.get("query"):
+        return FastJSONResponse({"success": False, "error": "Missing required parameter: query"}, status_code=400)
+    priority = request.get("priority", "normal")
+    if priority not in PRIORITIES:
+        return FastJSONResponse({"success": False, "error": f"priority must be one of: {', '.join(PRIORITIES)}"},
+                                status_code=400)
+    params = {key: request[key] for key in ITINERARY_JOB_PARAMS if request.get(key) is not None}
+    try:
+        job = await itinerary_jobs.submit("itinerary", params, PRIORITIES[priority])
+    except QueueFull as e:
+        return FastJSONResponse({"success": False, "error": "Too many itineraries are queued; try again later"},
+                                status_code=503, headers={"Retry-After": str(int(e.retry_after + 0.999))})
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "position": job["position"],
+        "status_url": f"/api/itinerary-jobs/{job['id']}",
+        "events_url": f"/api/itinerary-jobs/{job['id']}/events",
+    }
+
+@app.get("/api/itinerary-jobs/{job_id}")
+async def get_itinerary_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the job to change before answering"),
+    fields: str = Query(None, description="Comma-separated dotted field paths to return, e.g. status,result.itinerary")
+):
+    """Job status, and the itinerary once it has succeeded"""
+    if wait:
+        job = await itinerary_jobs.wait(job_id, min(wait, JOB_WAIT_MAX_SECONDS))
+    else:
+        job = await itinerary_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return project({"success": True, "job": _job_view(job)}, fields)
+
+@app.get("/api/itinerary-jobs/{job_id}/events")
+async def itinerary_job_events(job_id: str):
+    """Server-sent events with the job's status on every change, ending once it finishes"""
+    job = await itinerary_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_status = None
+        stop_at = time.monotonic() + JOB_WAIT_MAX_SECONDS
+        current = job
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield f"event: status\ndata: {json.dumps(_job_view(current), default=str)}\n\n"
+            if last_status in FINISHED_JOB_STATUSES:
+                return
+            left = stop_at - time.monotonic()
+            if left <= 0:
+                # EventSource clients reconnect on their own
+                yield "retry: 1000\n\n"
+                return
+            current = await itinerary_jobs.wait(job_id, min(left, 1.0)) or current
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.delete("/api/itinerary-jobs/{job_id}")
+async def cancel_itinerary_job(job_id: str):
+    """Cancel a queued or running itinerary job"""
+    job = await itinerary_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": _job_view(job)}
+
+@app.get("/stats/admission")
+async def admission_stats():
+    return {"success": True, "classes": [admission.stats() for admission in ADMISSION_CLASSES]}
+
+@app.get("/stats/llm")
+async def llm_stats():
+    """First-token latency, errors and hedging per LLM provider, best ranked first"""
+    return {"success": True, "providers": _llm_router_stats()}
+
+@app.get("/stats/jobs")
+async def job_stats():
+    """Queue depth, running jobs and outcomes for the background job queues"""
+    return {"queues": [itinerary_jobs.stats()]}
+
+@app.post("/api/flight-calendar")
+async def flight_calendar_api(request: dict):
+    """Cheapest fare per day for a route, over departure_date +/- window_days or a whole month"""
+    try:
+        origin = request.get("origin")
+        destination = request.get("destination")
+        departure_date = request.get("departure_date")
+        month = request.get("month")
+        
+        if not origin or not destination or not (departure_date or month):
+            return {
+                "success": False,
+                "error": "Missing required parameters: origin, destination and departure_date or month"
+            }
+        try:
+            # str() first so 2.5 and true are rejected rather than truncated to 2 and 1
+            window_days = int(str(request.get("window_days", 3)))
+            if window_days < 0:
+                raise ValueError
+        except ValueError:
+            return FastJSONResponse({"success": False, "error": "window_days must be a non-negative integer"},
+                                    status_code=400)
+        try:
+            dates = calendar_dates(departure_date, window_days, month)
+        except ValueError:
+            return FastJSONResponse({"success": False,
+                                     "error": "Dates must be YYYY-MM-DD (departure_date) or YYYY-MM (month)"},
+                                    status_code=400)
+        
+        flight_agent = FlightAgent()
+        result = await flight_agent.search_price_calendar(
+            origin, destination, dates,
+            request.get("adults", 1), request.get("children", 0), request.get("infants", 0)
+        )
+        if "dates" not in result:
+            return {"success": False, "error": result["error"]}
+        return project({"success": True, **result}, request.get("fields"))
+        
+    except Exception as e:
+        logging.error(f"Flight calendar API error: {e}")
+        return {"success": False, "error": str(e)}
+
+# Optional /api/search-flights body fields passed to agents.flight_agent.offers.filter_offers
+OFFER_FILTERS = ("max_stops", "carriers", "depart_after", "depart_before", "arrive_after", "arrive_before")
+
 # New API endpoint for frontend flight search
 @app.post("/api/search-flights")
 async def search_flights_api(request: dict):
@@ -358,7 +801,16 @@ async def search_flights_api(request: dict):
         outbound_flights = await flight_agent.search_flights(
             origin, destination, departure_date, None, adults, children, infants
         )
-        logging.info(f"Outbound flights result: {outbound_flights}")
+        logging.info(f"Outbound flights result: {len(outbound_flights.get('offers') or [])} offers")
+        
+        # Locally rejected searches (unknown locations, invalid dates) come back as errors
+        if outbound_flights.get("error") and not outbound_flights.get("offers"):
+            return {
+                "success": False,
+                "error": outbound_flights["error"],
+                "outbound_flights": [],
+                "return_flights": []
+            }
         
         # Search for return flights if return_date is provided
         return_flights = None
@@ -367,16 +819,26 @@ async def search_flights_api(request: dict):
                 destination, origin, return_date, None, adults, children, infants
             )
         
-        # Format the response for frontend
-        formatted_response = {
-            "success": True,
-            "outbound_flights": outbound_flights.get("data", []),
-            "return_flights": return_flights.get("data", []) if return_flights else [],
-            "meta": outbound_flights.get("meta", {}),
-            "dictionaries": outbound_flights.get("dictionaries", {})
-        }
+        # Sort, filter and paginate server-side; outbound pages by cursor, return flights
+        # get the same sort and filters and are capped at one page
+        filters = {key: request[key] for key in OFFER_FILTERS if request.get(key) is not None}
+        sort = request.get("sort", "cheapest")
+        limit = request.get("limit", DEFAULT_PAGE_SIZE)
+        try:
+            outbound_page, next_cursor, total = query_offers(
+                outbound_flights, sort, request.get("cursor"), limit, **filters
+            )
+            return_page, _, _ = query_offers(return_flights, sort, None, limit, **filters)
+        except ValueError as e:
+            return {"success": False, "error": str(e), "outbound_flights": [], "return_flights": []}
         
-        return formatted_response
+        return project({
+            "success": True,
+            "outbound_flights": [offer.to_dict() for offer in outbound_page],
+            "return_flights": [offer.to_dict() for offer in return_page],
+            "next_cursor": next_cursor,
+            "total": total
+        }, request.get("fields"))
         
     except Exception as e:
         logging.error(f"Flight search API error: {e}")
@@ -411,31 +873,18 @@ async def search_hotels_api(request: dict):
                 "hotels": []
             }
         
-        hotel_agent = HotelAgent()
-        
-        # Map destination names to coordinates for Amadeus API
-        destination_mapping = {
-            "mumbai, maharashtra": {"latitude": 19.0760, "longitude": 72.8777},
-            "delhi": {"latitude": 28.7041, "longitude": 77.1025}, 
-            "new delhi": {"latitude": 28.7041, "longitude": 77.1025},
-            "bangalore, karnataka": {"latitude": 12.9716, "longitude": 77.5946},
-            "chennai, tamil nadu": {"latitude": 13.0827, "longitude": 80.2707},
-            "kolkata, west bengal": {"latitude": 22.5726, "longitude": 88.3639},
-            "hyderabad, telangana": {"latitude": 17.3850, "longitude": 78.4867},
-            "goa": {"latitude": 15.2993, "longitude": 74.1240},
-            "pune, maharashtra": {"latitude": 18.5204, "longitude": 73.8567},
-            "ahmedabad, gujarat": {"latitude": 23.0225, "longitude": 72.5714},
-            "dubai, uae": {"latitude": 25.2048, "longitude": 55.2708},
-            "london": {"latitude": 51.5074, "longitude": -0.1278},
-            "paris": {"latitude": 48.8566, "longitude": 2.3522},
-            "singapore": {"latitude": 1.3521, "longitude": 103.8198},
-            "bangkok, thailand": {"latitude": 13.7563, "longitude": 100.5018}
-        }
+        # Resolve destination name to coordinates for Amadeus API
+        place = get_gazetteer().lookup(destination)
+        if not place:
+            return {
+                "success": False,
+                "error": f"Unknown destination: {destination}",
+                "hotels": []
+            }
+        latitude = place.latitude
+        longitude = place.longitude
         
-        # Get destination configuration from mapping, fallback to Mumbai
-        dest_config = destination_mapping.get(destination.lower(), {"latitude": 19.0760, "longitude": 72.8777})
-        latitude = dest_config["latitude"]
-        longitude = dest_config["longitude"]
+        hotel_agent = HotelAgent()
         
         logging.info(f"Searching hotels for destination: {destination} -> lat: {latitude}, lng: {longitude}")
         hotel_data = await hotel_agent.search_hotels(
@@ -444,20 +893,30 @@ async def search_hotels_api(request: dict):
             checkin=check_in,
             checkout=check_out,
             adults=adults,
-            radius=50  # 50km radius
+            radius=50,  # 50km radius
+            # Prices and availability for the nearest hotels, fetched in batched parallel calls
+            with_offers=request.get("with_offers", True),
+            rooms=rooms
         )
         
-        logging.info(f"Hotel search result: {hotel_data}")
-        
-        # Check if we have hotel data from Amadeus API
-        hotels = hotel_data.get("data", []) if hotel_data.get("data") else []
+        logging.info(f"Hotel search result: {len(hotel_data.get('data') or [])} hotels")
         
-        # No fallback needed - API is working and returning real data
+        # Rank by distance, rating and price and return only the requested page; distances
+        # are from the destination centre unless the client picks another point
+        try:
+            hotels, next_cursor, total = rank_hotels(
+                hotel_data.get("data") or [], request.get("sort", "best"), request.get("cursor"),
+                request.get("limit", HOTEL_PAGE_SIZE), request.get("latitude"), request.get("longitude")
+            )
+        except ValueError as e:
+            return {"success": False, "error": str(e), "hotels": []}
         
         # Format the response for frontend
         formatted_response = {
             "success": True,
             "hotels": hotels,
+            "next_cursor": next_cursor,
+            "total": total,
             "meta": hotel_data.get("meta", {}),
             "search_params": {
                 "destination": destination,
@@ -467,10 +926,10 @@ async def search_hotels_api(request: dict):
                 "adults": adults,
                 "children": children
             },
-            "message": f"Found {len(hotels)} hotels for {destination}" if hotels else f"No hotels available for {destination} on the selected dates"
+            "message": f"Found {total} hotels for {destination}" if hotels else f"No hotels available for {destination} on the selected dates"
         }
         
-        return formatted_response
+        return project(formatted_response, request.get("fields"))
         
     except Exception as e:
         logging.error(f"Hotel search API error: {e}")
@@ -11,8 +11,12 @@ from datetime import datetime, timedelta
 import re
 
 from agents.flight_agent.flight_agent import FlightAgent
+from agents.flight_agent.offers import offers_for, sort_offers
 from agents.hotel_agent.hotel_agent import HotelAgent
+from agents.hotel_agent.ranking import top_hotels
 from agents.rag_agent.rag_agent import RAGAgent
+from core.tracing import traced
+from geo.gazetteer import Place, get_gazetteer
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -24,6 +28,7 @@ class ChatbotOrchestrator:
         self.rag_agent = RAGAgent()
         self.conversation_history = []
         
+    @traced("orchestrator.detect_intent")
     def _detect_intent(self, user_message: str) -> Dict[str, Any]:
         """Detect user intent and extract entities"""
         message_lower = user_message.lower()
@@ -69,23 +74,28 @@ class ChatbotOrchestrator:
         
         # Extract locations (airport codes and cities)
         location_patterns = [
-            r'\b[A-Z]{3}\b',  # Airport codes like JFK, LAX
-            r'\b(?:from|to|in|at|near|for)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',  # City names with prepositions
-            r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:hotels?|accommodation|stay)',  # City names before hotel keywords
-            r'\b(?:hotels?|accommodation|stay)\s+(?:in|at|for)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',  # City names after hotel keywords
+            (r'\b[A-Z]{3}\b', 0),  # Airport codes like JFK, LAX (upper case only, so "the" is not a code)
+            (r'\b(?:from|to|in|at|near|for)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', re.IGNORECASE),  # City names with prepositions
+            (r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:hotels?|accommodation|stay)', re.IGNORECASE),  # City names before hotel keywords
+            (r'\b(?:hotels?|accommodation|stay)\s+(?:in|at|for)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', re.IGNORECASE),  # City names after hotel keywords
         ]
         
         locations = []
-        for pattern in location_patterns:
-            matches = re.findall(pattern, message, re.IGNORECASE)
-            locations.extend(matches)
+        for pattern, flags in location_patterns:
+            matches = re.findall(pattern, message, flags)
+            # Case-insensitive matching lets a capture run on ("Paris To Tokyo"); split it back up
+            for match in matches:
+                parts = re.split(r'\s+(?:from|to|in|at|near|for|on|and|with)(?=\s|$)', match, flags=re.IGNORECASE)
+                locations.extend(part for part in parts if part.strip())
         
         # Clean up and normalize locations
         if locations:
             cleaned_locations = []
             for loc in locations:
-                # Remove extra whitespace and normalize case
-                clean_loc = ' '.join(loc.split()).title()
+                # Remove extra whitespace and normalize case (keep airport codes upper case)
+                clean_loc = ' '.join(loc.split())
+                if not re.fullmatch(r'[A-Z]{3}', clean_loc):
+                    clean_loc = clean_loc.title()
                 if clean_loc and clean_loc not in cleaned_locations:
                     cleaned_locations.append(clean_loc)
             entities["locations"] = cleaned_locations
@@ -106,6 +116,7 @@ class ChatbotOrchestrator:
         
         return entities
     
+    @traced("orchestrator.process_message")
     async def process_message(self, user_message: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Process user message and coordinate between agents"""
         try:
@@ -188,6 +199,7 @@ Just tell me what you need! For example:
 
 What can I help you with today?"""
     
+    @traced("orchestrator.flight_search")
     async def _handle_flight_search(self, message: str, entities: Dict[str, Any]) -> str:
         """Handle flight search requests"""
         try:
@@ -221,14 +233,14 @@ What can I help you with today?"""
             # Search for flights
             flight_results = await self.flight_agent.search_flights(origin, destination, departure_date)
             
-            if "data" in flight_results and flight_results["data"]:
-                flights = flight_results["data"][:3]  # Show top 3 results
+            offers = offers_for(flight_results)
+            if offers:
+                flights = sort_offers(offers, "cheapest")[:3]  # Show the 3 cheapest
                 response = f"Found {len(flights)} flights from {origin} to {destination} on {departure_date}:\n\n"
                 
                 for i, flight in enumerate(flights, 1):
-                    response += f"{i}. {flight.get('itineraries', [{}])[0].get('segments', [{}])[0].get('carrierCode', 'N/A')} "
-                    response += f"{flight.get('itineraries', [{}])[0].get('segments', [{}])[0].get('number', 'N/A')}\n"
-                    response += f"   Price: {flight.get('price', {}).get('total', 'N/A')} {flight.get('price', {}).get('currency', 'USD')}\n\n"
+                    response += f"{i}. {flight.carrier} {flight.flight_number}\n"
+                    response += f"   Price: {flight.total} {flight.currency}\n\n"
                 
                 return response
             else:
@@ -238,6 +250,7 @@ What can I help you with today?"""
             logger.error(f"Error in flight search: {e}")
             return "I encountered an error searching for flights. Please try again with a different query."
     
+    @traced("orchestrator.hotel_search")
     async def _handle_hotel_search(self, message: str, entities: Dict[str, Any]) -> str:
         """Handle hotel search requests"""
         try:
@@ -277,39 +290,32 @@ What can I help you with today?"""
             
             adults = int(numbers[0]) if numbers else 1
             
-            # Get destination ID for hotel search
-            dest_id = self._get_destination_id(destination)
-            if not dest_id:
-                return f"Sorry, I don't have hotel data for {destination}. Please try a major city like New York, London, Paris, or Tokyo."
+            # Resolve destination coordinates for hotel search
+            place = self._resolve_destination(destination)
+            if not place:
+                return f"Sorry, I couldn't find a place called {destination}. Please check the spelling or try a nearby major city."
             
             # Search for hotels
             hotel_results = await self.hotel_agent.search_hotels(
-                dest_id=dest_id,
-                search_type="CITY",
-                arrival_date=arrival_date,
-                departure_date=departure_date,
-                adults=adults,
-                currency_code="USD",
-                price_min=50,
-                price_max=500
+                latitude=place.latitude,
+                longitude=place.longitude,
+                checkin=arrival_date,
+                checkout=departure_date,
+                adults=adults
             )
             
-            if "data" in hotel_results and hotel_results["data"].get("hotels"):
-                hotels = hotel_results["data"]["hotels"][:3]  # Show top 3 results
-                response = f"Found {len(hotels)} hotels in {destination} from {arrival_date} to {departure_date}:\n\n"
+            if hotel_results.get("data"):
+                hotels = top_hotels(hotel_results["data"], 3)  # Best 3 by distance, rating and price
+                response = f"Found {len(hotels)} hotels in {place.display_name} from {arrival_date} to {departure_date}:\n\n"
                 
                 for i, hotel in enumerate(hotels, 1):
-                    # Extract hotel information from the complex structure
-                    property_info = hotel.get('property', {})
-                    name = property_info.get('name', 'N/A')
-                    rating = property_info.get('reviewScore', 'N/A')
-                    price_info = property_info.get('priceBreakdown', {})
-                    price = price_info.get('grossPrice', {}).get('value', 'N/A')
-                    currency = price_info.get('grossPrice', {}).get('currency', 'USD')
+                    name = hotel.get('name', 'N/A')
+                    distance = hotel.get('distance', {})
                     
                     response += f"{i}. {name}\n"
-                    response += f"   Rating: {rating}/10\n"
-                    response += f"   Price: {price} {currency}\n\n"
+                    if distance.get('value') is not None:
+                        response += f"   Distance from center: {distance.get('value')} {distance.get('unit', 'KM')}\n"
+                    response += "\n"
                 
                 return response
             else:
@@ -319,6 +325,7 @@ What can I help you with today?"""
             logger.error(f"Error in hotel search: {e}")
             return "I encountered an error searching for hotels. Please try again with a different query."
     
+    @traced("orchestrator.itinerary")
     async def _handle_itinerary_request(self, message: str) -> str:
         """Handle itinerary generation requests with integrated flight and hotel data"""
         try:
@@ -330,48 +337,44 @@ What can I help you with today?"""
             # Try to search for flights and hotels if we have location info
             flight_data = None
             hotel_data = None
+            # Without an origin there is nothing to search flights from; ask instead of guessing
+            origin_missing = len(locations) < 2
+            self.rag_agent.set_flight_data(None)
             
             if locations:
                 # Search for flights
-                try:
-                    if len(locations) >= 2:
+                if not origin_missing:
+                    try:
                         origin = locations[0]
                         destination = locations[1]
-                    else:
-                        # Use a default origin if only destination is provided
-                        origin = "NYC"  # Default origin
-                        destination = locations[0]
-                    
-                    departure_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
-                    flight_data = await self.flight_agent.search_flights(origin, destination, departure_date)
-                    self.rag_agent.set_flight_data(flight_data)
-                    logger.info("Flight data integrated with RAG agent")
-                except Exception as e:
-                    logger.warning(f"Could not fetch flight data: {e}")
+                        
+                        departure_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+                        flight_data = await self.flight_agent.search_flights(origin, destination, departure_date)
+                        self.rag_agent.set_flight_data(flight_data)
+                        logger.info("Flight data integrated with RAG agent")
+                    except Exception as e:
+                        logger.warning(f"Could not fetch flight data: {e}")
                 
                 # Search for hotels
                 try:
                     arrival_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
                     departure_date = (datetime.now() + timedelta(days=37)).strftime("%Y-%m-%d")
                     
-                    # Use destination ID for hotel search (simplified mapping)
                     # Use the destination city for hotel search, not the origin
                     # If we have multiple locations, use the last one (destination city)
-                    hotel_destination = locations[-1] if locations else "New York"
-                    dest_id = self._get_destination_id(hotel_destination)
-                    if dest_id:
+                    place = self._resolve_destination(locations[-1])
+                    if place:
                         hotel_data = await self.hotel_agent.search_hotels(
-                            dest_id=dest_id,
-                            search_type="CITY",
-                            arrival_date=arrival_date,
-                            departure_date=departure_date,
-                            adults=2,
-                            currency_code="USD",
-                            price_min=50,
-                            price_max=500
+                            latitude=place.latitude,
+                            longitude=place.longitude,
+                            checkin=arrival_date,
+                            checkout=departure_date,
+                            adults=2
                         )
                         self.rag_agent.set_hotel_data(hotel_data)
                         logger.info("Hotel data integrated with RAG agent")
+                    else:
+                        logger.info(f"Skipping hotel search, unknown destination: {locations[-1]}")
                 except Exception as e:
                     logger.warning(f"Could not fetch hotel data: {e}")
             
@@ -393,7 +396,10 @@ What can I help you with today?"""
              # The RAG agent already includes formatted flight and hotel information in the itinerary
             # No need to add additional formatting here
             
-            response += "Would you like me to help you book any of these flights or hotels?"
+            if origin_missing:
+                response += "Where will you be flying from? Tell me your departure city and I'll add flight options."
+            else:
+                response += "Would you like me to help you book any of these flights or hotels?"
             
             return response
             
@@ -401,34 +407,10 @@ What can I help you with today?"""
             logger.error(f"Error in itinerary generation: {e}")
             return "I encountered an error generating your itinerary. Please try again with a different query."
     
-    def _get_destination_id(self, location: str) -> str:
-        """Get destination ID for hotel search based on location name"""
-        # Proper mapping of destinations to their Booking.com destination IDs
-        destination_mapping = {
-            'paris': '-1456928',
-            'london': '-1446900', 
-            'new york': '-1456928',
-            'nyc': '-1456928',
-            'los angeles': '-1456928',
-            'lax': '-1456928',
-            'santa barbara': '-1456928',  # Use LA area ID for Santa Barbara
-            'tokyo': '-1456928',
-            'dubai': '-1456928',
-            'singapore': '-1456928',
-            'bangkok': '-1456928',
-            'rome': '-1456928',
-            'barcelona': '-1456928',
-            'amsterdam': '-1456928',
-            'maldives': '-1456928',
-            'bali': '-1456928',
-            'sydney': '-1456928',
-            'mumbai': '-1456928',
-            'bom': '-1456928',
-            'istanbul': '-1456928'
-        }
-        
-        location_lower = location.lower()
-        return destination_mapping.get(location_lower, None)
+    def _resolve_destination(self, location: str) -> Optional[Place]:
+        """Resolve a location name to a gazetteer place (with coordinates) for hotel search"""
+        gazetteer = get_gazetteer()
+        return gazetteer.lookup(location) or gazetteer.find_in_text(location)
     
     def get_conversation_history(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get conversation history for a user"""
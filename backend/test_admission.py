@@ -0,0 +1,102 @@
+"""
+Test script for per-class admission control and load shedding
+"""
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import FastAPI
+
+from core.admission import AdmissionClass, AdmissionMiddleware, Shed
+
+
+async def _run_limits():
+    admission = AdmissionClass("llm", max_concurrency=2, max_queued=2, queue_timeout=0.2)
+    order = []
+
+    async def request(n, hold):
+        try:
+            await admission.acquire()
+        except Shed as e:
+            order.append((n, e.status))
+            return
+        order.append((n, "in"))
+        await asyncio.sleep(hold)
+        admission.release(hold)
+
+    tasks = [asyncio.create_task(request(n, 0.05)) for n in range(4)]
+    await asyncio.sleep(0)
+    assert admission.stats()["in_flight"] == 2 and admission.queued == 2
+    await request(4, 0)  # queue full
+    await asyncio.gather(*tasks)
+    first_pass = list(order)
+
+    # A slot that stays busy past the queue timeout sheds the waiter with a 503
+    blocker = AdmissionClass("llm", max_concurrency=1, max_queued=1, queue_timeout=0.05)
+    await blocker.acquire()
+    try:
+        await blocker.acquire()
+        timed_out = None
+    except Shed as e:
+        timed_out = e
+    blocker.release()
+    return first_pass, admission.stats(), timed_out, blocker.stats()
+
+
+def test_limits_and_shedding():
+    order, stats, timed_out, blocker = asyncio.run(_run_limits())
+    assert order[:3] == [(0, "in"), (1, "in"), (4, 429)]
+    assert order[3:] == [(2, "in"), (3, "in")]  # queued requests run in FIFO order
+    assert stats["admitted"] == 4 and stats["shed_queue_full"] == 1 and stats["in_flight"] == 0
+    assert timed_out.status == 503 and timed_out.retry_after >= 1
+    assert blocker["shed_queue_timeout"] == 1 and blocker["in_flight"] == 0 and blocker["queued"] == 0
+    print("✓ Requests queue in FIFO order up to the limit and are shed with 429/503 beyond it")
+
+
+async def _run_middleware():
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/rag")
+    async def rag():
+        await release.wait()
+        return {"success": True}
+
+    @app.get("/api/search-flights")
+    async def search():
+        return {"success": True}
+
+    llm = AdmissionClass("llm", max_concurrency=1, max_queued=0, queue_timeout=1.0)
+    read = AdmissionClass("read", max_concurrency=10, max_queued=10, queue_timeout=1.0)
+    app.add_middleware(AdmissionMiddleware, classes=[llm, read], endpoint_classes={"/rag": "llm"},
+                       default_class="read", exempt=("/ready",))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        slow = asyncio.create_task(client.get("/rag"))
+        while llm.active == 0:
+            await asyncio.sleep(0.01)
+        shed = await client.get("/rag")
+        cheap = await client.get("/api/search-flights")
+        release.set()
+        finished = await slow
+    return shed, cheap, finished, llm.stats(), read.stats()
+
+
+def test_middleware_keeps_cheap_traffic_flowing():
+    shed, cheap, finished, llm, read = asyncio.run(_run_middleware())
+    assert shed.status_code == 429 and int(shed.headers["Retry-After"]) >= 1
+    assert shed.json() == {"success": False, "error": "Too many llm requests in progress"}
+    assert cheap.status_code == 200 and finished.status_code == 200
+    assert llm["shed_queue_full"] == 1 and llm["in_flight"] == 0 and read["admitted"] == 1
+    print("✓ A saturated LLM class sheds its own requests while other classes keep serving")
+
+
+if __name__ == "__main__":
+    test_limits_and_shedding()
+    test_middleware_keeps_cheap_traffic_flowing()
+    print("\n✅ All admission control tests passed!")
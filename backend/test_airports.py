@@ -0,0 +1,124 @@
+"""
+Test script for the local IATA airport resolver
+"""
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from geo.airports import get_airport_index
+from agents.flight_agent.flight_agent import FlightAgent
+from orchestrator.chatbot_orchestrator import ChatbotOrchestrator
+
+
+def test_resolve():
+    airports = get_airport_index()
+    assert airports.resolve_code("JFK") == "JFK"
+    assert airports.resolve_code("From Paris") == "PAR"
+    assert airports.resolve_code("new york") == "NYC"
+    assert airports.resolve_code("Bombay") == "BOM"
+    assert airports.resolve_code("Bali") == "DPS"
+    assert airports.resolve("Qwxyzville") == []
+    print("✓ Codes, city names and aliases resolve to IATA codes")
+
+
+def test_names_before_codes():
+    airports = get_airport_index()
+    # Three-letter names are places first, codes only when written as codes
+    assert airports.resolve_code("Goa") in ("GOI", "GOX")
+    assert airports.resolve_code("GOA") == "GOA"
+    assert airports.resolve_code("Bar") != "BAR"
+    assert airports.resolve_code("jfk") == "JFK"
+    print("✓ Place names that are also IATA codes resolve as places")
+
+
+def test_nearest_airports():
+    airports = get_airport_index()
+    assert airports.resolve_code("Santorini") == "JTR"
+    assert airports.resolve_code("Agra") == "AGR"
+    assert airports.resolve_code("Oxford") == "OXF"
+    assert all(airports.airports[code].country_code == "GB" for code in airports.resolve("Oxford"))
+    assert all(airports.airports[code].country_code == "CH" for code in airports.resolve("Swiss Alps"))
+    # Monaco has no airport of its own, so the nearest one abroad is used
+    assert airports.resolve_code("Monaco") == "NCE"
+    print("✓ Places without a named airport use the nearest ones in their own country")
+
+
+def test_major_airports():
+    airports = get_airport_index()
+    assert airports.resolve_code("Frankfurt") == "FRA"
+    # Tegel closed in 2020 and no longer appears at all
+    assert airports.resolve("Berlin") == ["BER"]
+    # YVR is filed under Richmond; Vancouver's own airport is a seaplane base
+    assert airports.resolve_code("Vancouver") == "YVR"
+    assert airports.resolve_code("Long Beach") == "LGB"
+    print("✓ Cities resolve to their major airports, not closed or minor ones")
+
+
+def test_rejects_locally():
+    agent = FlightAgent()
+    next_month = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+    result = asyncio.run(agent.search_flights("Qwxyzville", "Tokyo", next_month))
+    assert result["offers"] == [] and "Unknown origin" in result["error"]
+    result = asyncio.run(agent.search_flights("Paris", "Tokyo", "2001-01-01"))
+    assert "past" in result["error"]
+    result = asyncio.run(agent.search_flights("Paris", "Tokyo", next_month, adults=1, infants=2))
+    assert "infant" in result["error"]
+    assert agent.tokens.fetches == 0  # No upstream call was made
+    print("✓ Invalid searches are rejected before any upstream call")
+
+
+class RecordingFlightAgent:
+    def __init__(self):
+        self.searches = []
+
+    async def search_flights(self, origin, destination, departure_date):
+        self.searches.append((origin, destination))
+        return {"data": []}
+
+
+class NoHotels:
+    async def search_hotels(self, **kwargs):
+        return {"data": []}
+
+
+class FakeRAGAgent:
+    flight_data = None
+
+    def set_flight_data(self, flight_data):
+        self.flight_data = flight_data
+
+    def set_hotel_data(self, hotel_data):
+        pass
+
+    async def generate_itinerary(self, message):
+        return {"itinerary": "# Goa Itinerary", "location": "Goa"}
+
+
+def test_itinerary_asks_for_origin():
+    orchestrator = ChatbotOrchestrator.__new__(ChatbotOrchestrator)
+    orchestrator.flight_agent, orchestrator.hotel_agent = RecordingFlightAgent(), NoHotels()
+    orchestrator.rag_agent = FakeRAGAgent()
+    orchestrator.rag_agent.flight_data = {"data": ["from an earlier request"]}
+
+    response = asyncio.run(orchestrator._handle_itinerary_request("Plan a 3 day trip to Goa"))
+    assert orchestrator.flight_agent.searches == [] and orchestrator.rag_agent.flight_data is None
+    assert "Where will you be flying from?" in response
+
+    response = asyncio.run(orchestrator._handle_itinerary_request("Plan a trip from Mumbai to Goa"))
+    assert orchestrator.flight_agent.searches == [("Mumbai", "Goa")]
+    assert "Where will you be flying from?" not in response
+    print("✓ Itineraries without an origin ask for one instead of searching from a default")
+
+
+if __name__ == "__main__":
+    test_resolve()
+    test_names_before_codes()
+    test_nearest_airports()
+    test_major_airports()
+    test_rejects_locally()
+    test_itinerary_asks_for_origin()
+    print("✅ All airport resolver tests passed!")
@@ -0,0 +1,141 @@
+"""
+Test script for day-by-day generation of long itineraries
+"""
+import sys
+import os
+import asyncio
+import re
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.rag_agent.day_plan import DAY_CONCURRENCY, assemble, day_section, parse_outline
+from agents.rag_agent.mmap_index import Chunk
+from agents.rag_agent.rag_agent import RAGAgent
+
+OUTLINE = """# 🗼 Tokyo Itinerary
+
+## Day 1: Asakusa and Senso-ji
+## Day 2: **Shibuya & Harajuku**
+### Day 4 - Day trip to Nikko
+
+## 🍽️ Restaurant & Dining
+• Ichiran - ramen, ¥1,000
+## 💰 Budget Estimates
+• Food: ¥5,000 a day"""
+
+
+def test_parse_outline():
+    outline = parse_outline(OUTLINE, 4, "Tokyo")
+    assert outline.title == "# 🗼 Tokyo Itinerary"
+    assert outline.themes == {1: "Asakusa and Senso-ji", 2: "Shibuya & Harajuku", 3: "Exploring Tokyo",
+                              4: "Day trip to Nikko"}
+    assert outline.shared.startswith("## 🍽️ Restaurant & Dining") and outline.shared.endswith("¥5,000 a day")
+
+    assert day_section(2, "Shibuya", "## Day 2: Shibuya\n\n• ⏰ Morning: Meiji Shrine") == \
+        "## Day 2: Shibuya\n• ⏰ Morning: Meiji Shrine"
+    itinerary = assemble(outline, [day_section(day, theme, "• Walk") for day, theme in outline.themes.items()])
+    assert itinerary.index("## Day 1") < itinerary.index("## Day 4") < itinerary.index("## 🍽️")
+    print("✓ Outlines are split into a title, per-day themes and shared sections")
+
+
+class FakeLLM:
+    """Answers outline and day prompts after a fixed delay, tracking how many run at once"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        days = re.search(r"planning a (\d+)-day trip", prompt)
+        if days:
+            lines = "\n".join(f"## Day {day}: Theme {day}" for day in range(1, int(days.group(1)) + 1))
+            return f"# Goa Itinerary\n\n{lines}\n\n## 💰 Budget Estimates\n• Food: ₹1,500 a day"
+        day = re.search(r"Write Day (\d+) only", prompt).group(1)
+        if day == "3":
+            raise RuntimeError("rate limited")
+        return f"• ⏰ Morning: Plan for day {day}"
+
+
+class FakePrompt:
+    def format(self, **values):
+        return "Write Day 1 only"
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, query):
+        return [1.0, 0.0]
+
+
+class FakeIndex:
+    def similarity_search_by_vector(self, embedding, k=4):
+        return [Chunk("Goa beaches", {"source": "guide.pdf", "page": 3})][:k]
+
+
+def _agent(llm):
+    # Skip __init__: no provider or PDF index is needed with the fakes
+    agent = RAGAgent.__new__(RAGAgent)
+    agent.llm, agent.llm_provider = llm, "fake"
+    agent.embeddings, agent.vectorstore = FakeEmbeddings(), FakeIndex()
+    agent.retriever = agent.vectorstore
+    agent.flight_data = agent.hotel_data = None
+    return agent
+
+
+def test_long_trip_days_run_concurrently():
+    llm = FakeLLM(delay=0.1)
+    agent = _agent(llm)
+    assert agent._extract_duration("Plan 14 days in Goa") == 14
+    assert agent._extract_duration("Two weeks in Goa") == 14
+    assert agent._extract_duration("4 days in Goa") == 4
+    agent._extract_location("Goa")  # load the gazetteer outside the timing
+
+    started = time.perf_counter()
+    result = asyncio.run(agent.generate_itinerary("Plan a 10-day trip to Goa"))
+    elapsed = time.perf_counter() - started
+    itinerary = result["itinerary"]
+
+    headings = re.findall(r"^## Day (\d+): Theme \1$", itinerary, flags=re.MULTILINE)
+    assert headings == [str(day) for day in range(1, 11)]
+    assert itinerary.startswith("# Goa Itinerary") and itinerary.endswith("₹1,500 a day")
+    assert "Plan for day 10" in itinerary and "Details for this day are unavailable" in itinerary
+    assert result["sources"] == ["guide.pdf#page=3"]
+    # 1 outline + 10 days a few at a time: about three rounds of calls, not eleven
+    assert len(llm.prompts) == 11 and llm.peak == min(DAY_CONCURRENCY, 10) and elapsed < 0.6, elapsed
+    assert all("Goa beaches" in prompt for prompt in llm.prompts)
+
+    short = FakeLLM(delay=0)
+    short_agent = _agent(short)
+    short_agent.qa_prompt = FakePrompt()
+    asyncio.run(short_agent.generate_itinerary("3 days in Goa"))
+    assert len(short.prompts) == 1
+    print(f"✓ A 10-day itinerary is written day by day in {elapsed:.2f}s, in order, "
+          f"with a failed day filled in")
+
+
+async def _stream(agent):
+    return [piece async for piece in agent.stream_itinerary("Plan a 10-day trip to Goa")]
+
+
+def test_stream_yields_days_in_order():
+    pieces = asyncio.run(_stream(_agent(FakeLLM(delay=0.01))))
+    assert pieces[0] == "# Goa Itinerary" and len(pieces) == 12
+    assert [piece.split(":")[0].strip() for piece in pieces[1:11]] == [f"## Day {day}" for day in range(1, 11)]
+    print("✓ Streaming yields the title, each day in order, then the shared sections")
+
+
+if __name__ == "__main__":
+    test_parse_outline()
+    test_long_trip_days_run_concurrently()
+    test_stream_yields_days_in_order()
+    print("\n✅ All day-by-day itinerary tests passed!")
@@ -0,0 +1,117 @@
+"""
+Test script for request deadline propagation and enforcement
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core import deadline
+from core.single_flight import SingleFlight
+
+
+async def _run_nested_deadlines():
+    with deadline.deadline(5):
+        outer = deadline.remaining()
+        with deadline.deadline(60):
+            # An inner, looser deadline cannot extend the outer one
+            inner = deadline.remaining()
+        capped = deadline.timeout(30)
+        with deadline.detached():
+            unbounded = deadline.remaining()
+    return outer, inner, capped, unbounded
+
+
+def test_nested_deadlines():
+    outer, inner, capped, unbounded = asyncio.run(_run_nested_deadlines())
+    assert 4.9 < outer <= 5 and inner <= outer
+    assert capped <= 5
+    assert unbounded is None
+    assert deadline.remaining() is None
+    print("✓ Nested deadlines keep the tightest bound and cap per-call timeouts")
+
+
+async def _run_wait_for_expiry():
+    with deadline.deadline(0.05):
+        try:
+            await deadline.wait_for(asyncio.sleep(1))
+        except deadline.DeadlineExceeded:
+            return True
+    return False
+
+
+def test_wait_for_expiry():
+    started = time.perf_counter()
+    assert asyncio.run(_run_wait_for_expiry())
+    assert time.perf_counter() - started < 0.5
+    print("✓ Work awaited under a deadline is cancelled when it expires")
+
+
+async def _run_single_flight_with_deadlines():
+    single_flight = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.2)
+        return "offers"
+
+    async def impatient():
+        with deadline.deadline(0.05):
+            return await single_flight.do("key", fetch)
+
+    async def patient():
+        with deadline.deadline(5):
+            return await single_flight.do("key", fetch)
+
+    return await asyncio.gather(impatient(), patient(), return_exceptions=True)
+
+
+def test_single_flight_respects_each_callers_deadline():
+    impatient, patient = asyncio.run(_run_single_flight_with_deadlines())
+    assert isinstance(impatient, deadline.DeadlineExceeded)
+    assert patient == "offers"
+    print("✓ A caller's expired deadline does not cancel the shared upstream call")
+
+
+def _build_app():
+    app = FastAPI()
+    app.add_middleware(deadline.DeadlineMiddleware, endpoint_deadlines={"/slow": 0.2})
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(2)
+        return {"success": True}
+
+    @app.get("/budget")
+    async def budget():
+        return {"remaining": deadline.remaining()}
+
+    return app
+
+
+def test_middleware_enforces_deadline():
+    client = TestClient(_build_app())
+    started = time.perf_counter()
+    response = client.get("/slow")
+    assert response.status_code == 504
+    assert response.json()["error"] == "Request deadline exceeded"
+    assert time.perf_counter() - started < 1.5
+
+    remaining = client.get("/budget").json()["remaining"]
+    assert 0 < remaining <= deadline.DEFAULT_DEADLINE_SECONDS
+    remaining = client.get("/budget", headers={"X-Request-Timeout": "2.5"}).json()["remaining"]
+    assert 0 < remaining <= 2.5
+    print("✓ Middleware applies endpoint budgets, client headers and returns 504 on expiry")
+
+
+if __name__ == "__main__":
+    test_nested_deadlines()
+    test_wait_for_expiry()
+    test_single_flight_respects_each_callers_deadline()
+    test_middleware_enforces_deadline()
+    print("✅ All deadline tests passed!")
@@ -19,7 +19,7 @@ async def test_detailed_response():
     rag_agent = RAGAgent(use_gemini=True)
     
     print(f"\n✓ LLM Available: {rag_agent.llm is not None}")
-    print(f"✓ QA Chain Available: {rag_agent.qa_chain is not None}")
+    print(f"✓ Retriever Available: {rag_agent.retriever is not None}")
     print(f"✓ Initialization Error: {rag_agent.initialization_error}")
     
     # Test query
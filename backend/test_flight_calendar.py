@@ -0,0 +1,83 @@
+"""
+Test script for the flexible-date price calendar
+"""
+import sys
+import os
+import asyncio
+from datetime import date, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.flight_agent import flight_agent as flight_module
+from agents.flight_agent.flight_agent import CALENDAR_CONCURRENCY, FlightAgent, calendar_dates
+
+
+def test_calendar_dates():
+    center = date.today() + timedelta(days=40)
+    dates = calendar_dates(center.isoformat(), window_days=3)
+    assert len(dates) == 7 and dates[3] == center.isoformat()
+    assert calendar_dates(month="2031-02") == [f"2031-02-{d:02d}" for d in range(1, 29)]
+    # Days before today are dropped from the window
+    assert calendar_dates(date.today().isoformat(), window_days=2)[0] == date.today().isoformat()
+    print("✓ Windows and month grids expand to future dates")
+
+
+async def _run_calendar(dates):
+    agent = FlightAgent()
+    in_flight = 0
+    peak = 0
+
+    async def fake_fetch(params):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        day = int(params["departureDate"][-2:])
+        if day == 2:
+            return {"data": []}
+        return {"data": [
+            {"price": {"grandTotal": str(1000 + day)}, "validatingAirlineCodes": ["AI"],
+             "itineraries": [{"segments": [{"carrierCode": "AI"}]}]},
+            {"price": {"grandTotal": str(900 + day)}, "validatingAirlineCodes": ["6E"],
+             "itineraries": [{"segments": [{"carrierCode": "6E"}, {"carrierCode": "6E"}]}]},
+        ]}
+
+    agent._fetch_flight_offers = fake_fetch
+    result = await agent.search_price_calendar("Delhi", "Mumbai", dates)
+    return result, peak
+
+
+def test_price_calendar():
+    flight_module.flight_offer_cache.clear()
+    dates = calendar_dates(month="2031-03")
+    result, peak = asyncio.run(_run_calendar(dates))
+    assert result["origin"] == "DEL" and result["destination"] == "BOM"
+    assert result["dates"] == dates
+    assert result["prices"][0] == 901.0 and result["carriers"][0] == "6E" and result["stops"][0] == 1
+    assert result["prices"][1] is None
+    assert result["cheapest_date"] == "2031-03-01"
+    assert peak <= CALENDAR_CONCURRENCY
+    print(f"✓ {len(dates)} days searched with at most {peak} concurrent upstream calls")
+
+
+def test_invalid_parameters():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    request = {"origin": "DEL", "destination": "BOM", "departure_date": "2031-03-10"}
+    for window_days in ("abc", 2.5, -1, True):
+        response = client.post("/api/flight-calendar", json={**request, "window_days": window_days})
+        assert response.status_code == 400 and "window_days" in response.json()["error"], window_days
+    response = client.post("/api/flight-calendar", json={**request, "departure_date": "10/03/2031"})
+    assert response.status_code == 400 and "YYYY-MM-DD" in response.json()["error"]
+    print("✓ A bad window_days or date is a 400 naming the parameter")
+
+
+if __name__ == "__main__":
+    test_calendar_dates()
+    test_price_calendar()
+    test_invalid_parameters()
+    print("✅ All price calendar tests passed!")
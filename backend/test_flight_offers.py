@@ -0,0 +1,79 @@
+"""
+Test script for the compact flight-offer model
+"""
+import sys
+import os
+import json
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.flight_agent.offers import compact_result, offers_for, parse_duration, query_offers, serialize_result
+
+
+def _offer(carrier, number, price, duration, departure, arrival, stops=0):
+    segments = [{"carrierCode": carrier, "number": number, "aircraft": {"code": "320"},
+                 "departure": {"iataCode": "DEL", "at": f"2031-03-01T{departure}:00"},
+                 "arrival": {"iataCode": "BOM", "at": f"2031-03-01T{arrival}:00"}}]
+    segments += [dict(segments[0]) for _ in range(stops)]
+    return {"price": {"total": price, "grandTotal": price, "currency": "INR"},
+            "itineraries": [{"duration": duration, "segments": segments}]}
+
+
+RAW_RESULT = {"data": [
+    _offer("AI", "101", "5400.00", "PT2H10M", "06:00", "08:10"),
+    _offer("6E", "202", "4200.00", "PT4H45M", "13:30", "18:15", stops=1),
+    _offer("UK", "303", "6100.00", "PT2H05M", "20:00", "22:05"),
+    _offer("6E", "404", "4200.00", "PT2H20M", "09:15", "11:35"),
+], "dictionaries": {"carriers": {"AI": "AIR INDIA"}}}
+SEARCH_RESULT = compact_result(RAW_RESULT)
+
+
+def test_parse():
+    offers = offers_for(SEARCH_RESULT)
+    assert set(SEARCH_RESULT) == {"offers"} and offers is offers_for(SEARCH_RESULT)
+    assert offers == offers_for(RAW_RESULT)  # Raw results still parse, e.g. from /rag/set-flight-data
+    first = offers[0]
+    assert (first.carrier, first.flight_number, first.origin, first.destination) == ("AI", "101", "DEL", "BOM")
+    assert first.price == 5400.0 and first.total == "5400.00" and first.duration_minutes == 130
+    assert first.departure_time == "06:00" and offers[1].stops == 1
+    assert parse_duration("P1DT2H") == 1560 and parse_duration("N/A") == 0
+    print("✓ Amadeus offers parse into flat records; only those are kept")
+
+
+def test_persisted_round_trip():
+    # The persistent cache tier stores JSON, so tuples come back as lists
+    restored = json.loads(json.dumps(SEARCH_RESULT))
+    assert offers_for(restored) == offers_for(SEARCH_RESULT)
+    assert offers_for(restored) is offers_for(restored)  # Converted once
+    payload = serialize_result(SEARCH_RESULT)
+    assert payload["offers"][0]["carrier"] == "AI" and "index" not in payload["offers"][0]
+    assert compact_result({"data": [], "error": "timeout"}) == {"offers": [], "error": "timeout"}
+    print("✓ Compact results survive the persistent cache and serialize as objects")
+
+
+def test_sort_filter_paginate():
+    page, cursor, total = query_offers(SEARCH_RESULT, "cheapest", limit=2)
+    assert [o.flight_number for o in page] == ["404", "202"] and total == 4  # tie broken by duration
+    page, cursor, _ = query_offers(SEARCH_RESULT, "cheapest", cursor, limit=2)
+    assert [o.flight_number for o in page] == ["101", "303"] and cursor is None
+    page, _, _ = query_offers(SEARCH_RESULT, "fastest")
+    assert page[0].flight_number == "303"
+    page, _, _ = query_offers(SEARCH_RESULT, "earliest", carriers="6e", max_stops=0)
+    assert [o.flight_number for o in page] == ["404"]
+    page, _, total = query_offers(SEARCH_RESULT, "earliest", depart_after="09:00", arrive_before="21:00")
+    assert [o.flight_number for o in page] == ["404", "202"] and total == 2
+    for bad in ({"sort": "random"}, {"cursor": "not-a-cursor"}, {"depart_after": "9am"}):
+        try:
+            query_offers(SEARCH_RESULT, **bad)
+            assert False, bad
+        except ValueError:
+            pass
+    print("✓ Offers sort, filter and page with stable cursors")
+
+
+if __name__ == "__main__":
+    test_parse()
+    test_persisted_round_trip()
+    test_sort_filter_paginate()
+    print("✅ All flight offer tests passed!")
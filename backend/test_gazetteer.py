@@ -0,0 +1,103 @@
+"""
+Test script for the in-memory gazetteer
+"""
+import sys
+import os
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from geo.gazetteer import get_gazetteer
+
+
+def test_lookup():
+    gazetteer = get_gazetteer()
+    assert gazetteer.lookup("Paris").display_name == "Paris, France"
+    assert gazetteer.lookup("Mumbai, Maharashtra").display_name == "Mumbai, India"
+    assert gazetteer.lookup("Bombay").display_name == "Mumbai, India"
+    assert gazetteer.lookup("Paris, USA").country_code == "US"
+    assert gazetteer.lookup("Nowhereville") is None
+    print("✓ Exact, alias and qualified lookups")
+
+
+def test_region_qualifiers():
+    gazetteer = get_gazetteer()
+    paris = gazetteer.lookup("Paris, Texas")
+    assert (paris.country_code, paris.region_code) == ("US", "TX")
+    assert gazetteer.lookup("Paris, TX") == gazetteer.lookup("Paris, Texas, USA") == gazetteer.lookup("Paris, Texas")
+    assert gazetteer.lookup("London, England").display_name == "London, UK"
+    assert gazetteer.lookup("Paris, Texas, France") is None
+    # An unknown qualifier is not dropped in favour of the best-known Paris
+    assert gazetteer.lookup("Paris, Narnia") is None
+    print("✓ State and province qualifiers narrow the match; unknown qualifiers match nothing")
+
+
+def test_alias_against_typo():
+    gazetteer = get_gazetteer()
+    # "sydny" is a GeoNames alias of Sidney, Ohio, but a typo of a far bigger city
+    assert gazetteer.lookup("Sydny").display_name == "Sydney, Australia"
+    assert gazetteer.lookup("Sidney").display_name == "Sidney, USA"
+    assert gazetteer.lookup("Bombay").display_name == "Mumbai, India"
+    print("✓ Exact aliases of small places lose to typos of much bigger ones")
+
+
+def test_short_names():
+    gazetteer = get_gazetteer()
+    # GeoNames calls it "Frankfurt am Main"; a fuzzy match would find Frankfort, Kentucky
+    assert gazetteer.lookup("Frankfurt").display_name == "Frankfurt am Main, Germany"
+    assert gazetteer.lookup("Cebu").display_name == "Cebu City, Philippines"
+    assert gazetteer.lookup("Frankfort, Kentucky").display_name == "Frankfort, USA"
+    print("✓ Common short names of big places match exactly")
+
+
+def test_fuzzy_and_prefix():
+    gazetteer = get_gazetteer()
+    assert gazetteer.lookup("Barcelonna").display_name == "Barcelona, Spain"
+    assert gazetteer.lookup("Tokio").display_name == "Tokyo, Japan"
+    assert "San Francisco, USA" in [p.display_name for p in gazetteer.search_prefix("san fran")]
+    print("✓ Typo-tolerant and prefix lookups")
+
+
+def test_find_in_text():
+    gazetteer = get_gazetteer()
+    assert gazetteer.find_in_text("Plan a 5-day luxury trip to Tokyo").display_name == "Tokyo, Japan"
+    assert gazetteer.find_in_text("3 days in new york with family").display_name == "New York, USA"
+    assert gazetteer.find_in_text("Plan a 10 day trip") is None
+    # Stopwords that are also place names count when capitalized
+    assert gazetteer.find_in_text("Plan a trip to Nice").display_name == "Nice, France"
+    assert gazetteer.find_in_text("a nice trip to Goa in March").display_name == "Goa, India"
+    assert gazetteer.find_in_text("have a nice weekend") is None
+    print("✓ Destination extraction from free text")
+
+
+def test_nearest():
+    gazetteer = get_gazetteer()
+    place, distance_km = gazetteer.nearest(48.8566, 2.3522)[0]
+    assert place.country_code == "FR" and distance_km < 5
+    print("✓ Nearest-place lookup")
+
+
+def test_lookup_speed():
+    gazetteer = get_gazetteer()
+    gazetteer.warm()
+    queries = ["Paris", "London, UK", "Bangalore", "Barcelonna", "Nowhereville"]
+    start = time.perf_counter()
+    for _ in range(200):
+        for query in queries:
+            gazetteer.lookup(query)
+    per_lookup_ms = (time.perf_counter() - start) * 1000 / (200 * len(queries))
+    print(f"✓ Average lookup: {per_lookup_ms:.3f} ms")
+    assert per_lookup_ms < 1
+
+
+if __name__ == "__main__":
+    test_lookup()
+    test_region_qualifiers()
+    test_alias_against_typo()
+    test_short_names()
+    test_fuzzy_and_prefix()
+    test_find_in_text()
+    test_nearest()
+    test_lookup_speed()
+    print("✅ All gazetteer tests passed!")
@@ -0,0 +1,85 @@
+"""
+Test script for batched hotel-offer enrichment
+"""
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from agents.hotel_agent import hotel_agent as hotel_module
+from agents.hotel_agent.hotel_agent import HOTEL_OFFERS_BATCH_SIZE, HotelAgent
+from loadtest.fake_upstream import fake_upstream
+
+HOTELS = {"data": [{"hotelId": f"HT{i:04d}", "name": f"Hotel {i}"} for i in range(45)], "meta": {"count": 45}}
+
+
+def _fake_offers_api(fail_batches=0):
+    """Serve hotel offers in-process; hotels with odd ids have no availability"""
+    async def handler(request):
+        nonlocal fail_batches
+        hotel_ids = request.url.params["hotelIds"].split(",")
+        await asyncio.sleep(0.25)  # slower than the Amadeus rate-limit spacing, so batches overlap
+        if fail_batches:
+            fail_batches -= 1
+            return httpx.Response(400, json={"errors": [{"code": 3664}]})
+        data = [{"type": "hotel-offers", "available": True, "hotel": {"hotelId": hotel_id},
+                 "offers": [{"price": {"total": str(5000 + int(hotel_id[2:])), "currency": "INR"}}]}
+                for hotel_id in hotel_ids if int(hotel_id[2:]) % 2 == 0]
+        return httpx.Response(200, json={"data": data})
+
+    return fake_upstream(handler)
+
+
+async def _run_enrichment():
+    hotel_module.hotel_offer_cache.clear()
+    agent = HotelAgent()
+    async with _fake_offers_api() as upstream:
+        first = await agent.enrich_with_offers(HOTELS, "2031-03-01", "2031-03-03", 2, 1, "token")
+        first_batches = len(upstream.requests)
+        # Same dates and occupancy: served from the per-hotel cache, so no token is needed
+        second = await agent.enrich_with_offers(HOTELS, "2031-03-01", "2031-03-03", 2, 1)
+        cached_batches = len(upstream.requests) - first_batches
+        # Different occupancy is a different cache key
+        await agent.enrich_with_offers(HOTELS, "2031-03-01", "2031-03-03", 3, 1, "token")
+    return first, second, first_batches, cached_batches, len(upstream.requests), upstream.peak
+
+
+def test_batched_enrichment():
+    first, second, first_batches, cached_batches, total_batches, peak = asyncio.run(_run_enrichment())
+    expected_batches = -(-len(HOTELS["data"]) // HOTEL_OFFERS_BATCH_SIZE)
+    assert first_batches == expected_batches
+    assert peak > 1  # batches went out concurrently
+    hotels = first["data"]
+    assert [h["hotelId"] for h in hotels] == [h["hotelId"] for h in HOTELS["data"]]
+    assert hotels[0]["available"] and hotels[0]["offers"][0]["price"]["total"] == "5000"
+    assert hotels[1] == {"hotelId": "HT0001", "name": "Hotel 1", "available": False, "offers": []}
+    assert "offers" not in HOTELS["data"][0]  # shared input left untouched
+    assert first["meta"] == HOTELS["meta"]
+    assert cached_batches == 0 and second == first
+    assert total_batches == 2 * expected_batches
+    print(f"✓ {len(hotels)} hotels priced in {first_batches} concurrent batches, then from cache")
+
+
+async def _run_failed_batch():
+    hotel_module.hotel_offer_cache.clear()
+    async with _fake_offers_api(fail_batches=1):
+        result = await HotelAgent().enrich_with_offers(HOTELS, "2031-04-01", "2031-04-02", 2, 1, "token")
+    return result, hotel_module.hotel_offer_cache.stats()["size"]
+
+
+def test_failed_batch_degrades():
+    result, cached = asyncio.run(_run_failed_batch())
+    unpriced = [h for h in result["data"] if "offers" not in h]
+    assert len(unpriced) == HOTEL_OFFERS_BATCH_SIZE
+    assert cached == len(HOTELS["data"]) - HOTEL_OFFERS_BATCH_SIZE  # failures are not cached
+    print("✓ A failed batch leaves its hotels unpriced instead of failing the search")
+
+
+if __name__ == "__main__":
+    test_batched_enrichment()
+    test_failed_batch_degrades()
+    print("\n✅ All hotel offer tests passed!")
@@ -0,0 +1,118 @@
+"""
+Test script for hotel ranking, top-k selection and keyset pagination
+"""
+import sys
+import os
+import random
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.hotel_agent.ranking import rank_hotels, rank_keys, top_hotels
+from core import pagination
+
+
+def _hotel(hotel_id, km, rating=None, price=None, latitude=19.0, longitude=72.8):
+    hotel = {"hotelId": hotel_id, "name": hotel_id, "distance": {"value": km, "unit": "KM"},
+             "geoCode": {"latitude": latitude, "longitude": longitude}}
+    if rating is not None:
+        hotel["rating"] = rating
+    if price is not None:
+        hotel["offers"] = [{"price": {"total": str(price), "currency": "INR"}}]
+    return hotel
+
+
+HOTELS = [
+    _hotel("FAR_CHEAP", 40, 3, 2000),
+    _hotel("NEAR_PRICEY", 1, 4, 15000),
+    _hotel("NEAR_GOOD", 2, 5, 6000),
+    _hotel("UNPRICED", 0.5),
+    _hotel("MID", 10, 4, 5000),
+]
+
+
+def test_sorts():
+    assert [h["hotelId"] for h in top_hotels(HOTELS, 2, "distance")] == ["UNPRICED", "NEAR_PRICEY"]
+    assert [h["hotelId"] for h in top_hotels(HOTELS, 2, "price")] == ["FAR_CHEAP", "MID"]
+    assert top_hotels(HOTELS, 1, "rating")[0]["hotelId"] == "NEAR_GOOD"
+    assert top_hotels(HOTELS, 1)[0]["hotelId"] == "NEAR_GOOD"
+    assert top_hotels(HOTELS, 10, "price")[-1]["hotelId"] == "UNPRICED"  # unknown prices last
+    assert top_hotels([], 5) == []
+    # Distances can be measured from another point
+    moved = top_hotels(HOTELS[:2] + [_hotel("ELSEWHERE", 30, latitude=28.6, longitude=77.2)], 1, "distance",
+                       latitude=28.61, longitude=77.21)
+    assert moved[0]["hotelId"] == "ELSEWHERE"
+    print("✓ Hotels rank by best score, distance, price and rating")
+
+
+def test_top_k_matches_full_sort():
+    random.seed(3)
+    hotels = [_hotel(f"H{i:04d}", round(random.random() * 50, 2), random.choice([None, 2, 3, 4, 5]),
+                     random.choice([None, random.randint(2000, 20000)])) for i in range(500)]
+    for sort in ("best", "distance", "price", "rating"):
+        keys, _ = rank_keys(hotels, sort)
+        expected = [hotels[i]["hotelId"] for i in sorted(range(len(hotels)), key=keys.__getitem__)]
+        assert [h["hotelId"] for h in top_hotels(hotels, 25, sort)] == expected[:25]
+
+        # Walking every page returns each hotel exactly once, in order
+        seen, cursor = [], None
+        while True:
+            page, cursor, total = rank_hotels(hotels, sort, cursor, limit=60)
+            seen.extend(h["hotelId"] for h in page)
+            if cursor is None:
+                break
+        assert seen == expected and total == 500
+    print("✓ Heap top-k and paged walks match a full sort")
+
+
+def test_stable_cursor():
+    page, cursor, _ = rank_hotels(HOTELS, "distance", limit=2)
+    assert [h["hotelId"] for h in page] == ["UNPRICED", "NEAR_PRICEY"]
+    # A hotel that now ranks first does not shift the next page
+    grown = HOTELS + [_hotel("NEWCOMER", 0.1)]
+    page, cursor, _ = rank_hotels(grown, "distance", cursor, limit=2)
+    assert [h["hotelId"] for h in page] == ["NEAR_GOOD", "MID"]
+    page, cursor, _ = rank_hotels(grown, "distance", cursor, limit=2)
+    assert [h["hotelId"] for h in page] == ["FAR_CHEAP"] and cursor is None
+    best, _, _ = rank_hotels(HOTELS, limit=1)
+    assert 0 < best[0]["score"] <= 1
+    forged = [{"sort": "distance", "after": ["near", "MID"]}, {"sort": "distance", "after": [1.5, 7]},
+              {"sort": "distance", "after": [1.5]}, {"sort": "price", "after": [None, 1.0, "MID"]},
+              {"sort": "distance", "after": [True, "MID"]}]
+    bad_requests = [{"sort": "random"}, {"cursor": "not-a-cursor"}]
+    bad_requests += [{"sort": state["sort"], "cursor": pagination.encode_cursor(state)} for state in forged]
+    for bad in bad_requests:
+        try:
+            rank_hotels(HOTELS, **bad)
+            assert False, bad
+        except ValueError:
+            pass
+    print("✓ Cursors resume after the last hotel seen; malformed ones are rejected")
+
+
+def test_forged_cursor_is_a_bad_request():
+    from fastapi.testclient import TestClient
+    import main
+
+    class FakeHotelAgent:
+        async def search_hotels(self, **kwargs):
+            return {"data": HOTELS}
+
+    real_agent, main.HotelAgent = main.HotelAgent, FakeHotelAgent
+    try:
+        client = TestClient(main.app)
+        cursor = pagination.encode_cursor({"sort": "distance", "after": ["near", "MID"]})
+        response = client.get("/hotel", params={"latitude": 19.07, "longitude": 72.87, "checkin": "2031-03-01",
+                                                "checkout": "2031-03-02", "sort": "distance", "cursor": cursor})
+        assert response.status_code == 400 and response.json()["detail"] == "Invalid cursor"
+    finally:
+        main.HotelAgent = real_agent
+    print("✓ A forged cursor is answered with 400, not 500")
+
+
+if __name__ == "__main__":
+    test_sorts()
+    test_top_k_matches_full_sort()
+    test_stable_cursor()
+    test_forged_cursor_is_a_bad_request()
+    print("\n✅ All hotel ranking tests passed!")
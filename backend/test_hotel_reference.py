@@ -0,0 +1,107 @@
+"""
+Test script for geocell-cached hotel reference data
+"""
+import sys
+import os
+import asyncio
+import random
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from core.token_manager import TokenManager
+from agents.hotel_agent.hotel_agent import HotelAgent
+from agents.hotel_agent.reference import hotel_reference_cache, query_hotels
+from geo import geocell
+from geo.kdtree import haversine_km
+from loadtest.fake_upstream import fake_upstream
+
+MUMBAI = (19.0760, 72.8777)
+
+# A fixed "world" of hotels the fake upstream serves by radius
+random.seed(7)
+WORLD = [{"hotelId": f"HT{i:05d}", "name": f"Hotel {i}",
+          "geoCode": {"latitude": 17.5 + random.random() * 3, "longitude": 71.5 + random.random() * 3}}
+         for i in range(4000)]
+
+
+def test_geocell():
+    assert geocell.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    cell = geocell.encode(*MUMBAI)
+    min_lat, min_lon, max_lat, max_lon = geocell.bounds(cell)
+    assert min_lat <= MUMBAI[0] < max_lat and min_lon <= MUMBAI[1] < max_lon
+    assert geocell.covering(*MUMBAI, 5) == [cell]
+    cells = geocell.covering(*MUMBAI, 50)
+    assert cells[0] == cell and 1 <= len(cells) <= 4
+    assert 100 < geocell.circumradius_km(cell) < 115
+    print(f"✓ Geohash cells encode, bound and cover a 50 km search with {len(cells)} cells")
+
+
+def _fake_amadeus():
+    """An in-process Amadeus serving WORLD by radius; returns it and the radii of its hotel searches"""
+    calls = []
+
+    async def handler(request):
+        if request.url.path.endswith("/oauth2/token"):
+            return httpx.Response(200, json={"access_token": "token", "expires_in": 1799})
+        params = request.url.params
+        calls.append(params["radius"])
+        lat, lon, radius = float(params["latitude"]), float(params["longitude"]), float(params["radius"])
+        data = [hotel for hotel in WORLD
+                if haversine_km(lat, lon, hotel["geoCode"]["latitude"], hotel["geoCode"]["longitude"]) <= radius]
+        return httpx.Response(200, json={"data": data, "meta": {"count": len(data)}})
+
+    return fake_upstream(handler), calls
+
+
+async def _run_searches():
+    hotel_reference_cache.clear()
+    amadeus, calls = _fake_amadeus()
+    agent = HotelAgent()
+    agent.tokens = TokenManager("amadeus_test", "https://amadeus.test/v1/security/oauth2/token", "id", "secret")
+    async with amadeus:
+        first = await agent.search_hotels(*MUMBAI, "2031-03-01", "2031-03-03")
+        first_calls = len(calls)
+        # A nearby search reuses the cached cells, without authenticating
+        cached_agent = HotelAgent()
+        cached_agent.tokens = TokenManager("amadeus_cached", "https://amadeus.test/v1/security/oauth2/token", "id", "secret")
+        second = await cached_agent.search_hotels(19.10, 72.90, "2031-03-01", "2031-03-03", radius=20, limit=5)
+        assert agent.tokens.fetches == 1 and cached_agent.tokens.fetches == 0
+    return first, second, first_calls, len(calls)
+
+
+def test_cached_radius_queries():
+    first, second, first_calls, total_calls = asyncio.run(_run_searches())
+    assert first_calls == len(geocell.covering(*MUMBAI, 50))
+    assert total_calls == first_calls  # second search made no upstream call
+
+    expected = sorted((haversine_km(*MUMBAI, h["geoCode"]["latitude"], h["geoCode"]["longitude"]), h["hotelId"])
+                      for h in WORLD)
+    expected_ids = [hotel_id for km, hotel_id in expected if km <= 50]
+    hotels = first["data"]
+    assert [h["hotelId"] for h in hotels] == expected_ids
+    assert first["meta"]["count"] == len(hotels)
+    assert hotels[0]["distance"]["unit"] == "KM" and hotels[0]["distance"]["value"] <= hotels[-1]["distance"]["value"]
+
+    nearest = [hotel_id for km, hotel_id in sorted(
+        (haversine_km(19.10, 72.90, h["geoCode"]["latitude"], h["geoCode"]["longitude"]), h["hotelId"]) for h in WORLD
+    )[:5]]
+    assert [h["hotelId"] for h in second["data"]] == nearest
+    print(f"✓ {len(hotels)} hotels from {first_calls} cell fetches; repeat searches answered locally "
+          f"without a token")
+
+
+def test_query_edge_cases():
+    cells = [[{"hotelId": "A", "geoCode": {"latitude": 19.0, "longitude": 72.9}}], []]
+    assert [h["hotelId"] for h in query_hotels(cells, *MUMBAI, 50)] == ["A"]
+    assert query_hotels(cells, *MUMBAI, 1) == []
+    print("✓ Empty cells and out-of-radius hotels are skipped")
+
+
+if __name__ == "__main__":
+    test_geocell()
+    test_cached_radius_queries()
+    test_query_edge_cases()
+    print("\n✅ All hotel reference tests passed!")
@@ -0,0 +1,63 @@
+"""
+Test script for the shared upstream HTTP client
+"""
+import sys
+import os
+import asyncio
+
+import httpx
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.http_client import close_http_client, get_http_client, use_transport
+
+
+async def _get_twice_and_close():
+    first = get_http_client()
+    second = get_http_client()
+    await close_http_client()
+    return first, second
+
+
+def test_client_is_shared_and_closed():
+    first, second = asyncio.run(_get_twice_and_close())
+    assert first is second
+    assert first.is_closed
+    print("✓ Agents in one event loop share a single pooled client")
+
+
+async def _get_client():
+    return get_http_client()
+
+
+def test_new_loop_gets_new_client():
+    first = asyncio.run(_get_client())
+    second = asyncio.run(_get_client())
+    assert first is not second
+    asyncio.run(close_http_client())
+    print("✓ A new event loop gets its own client")
+
+
+async def _use_fake_transport():
+    shared = get_http_client()
+    async with use_transport(httpx.MockTransport(lambda request: httpx.Response(204))) as fake:
+        status = (await get_http_client().get("https://upstream.example/")).status_code
+        routed = get_http_client() is fake
+    restored = get_http_client()
+    await close_http_client()
+    return shared, fake, restored, status, routed
+
+
+def test_use_transport_restores_client():
+    shared, fake, restored, status, routed = asyncio.run(_use_fake_transport())
+    assert routed and status == 204
+    assert fake.is_closed and restored is shared
+    print("✓ A test transport is used for its block, then closed and the shared client restored")
+
+
+if __name__ == "__main__":
+    test_client_is_shared_and_closed()
+    test_new_loop_gets_new_client()
+    test_use_transport_restores_client()
+    print("✅ All HTTP client tests passed!")
@@ -0,0 +1,214 @@
+"""
+Test script for the background job queue and the itinerary job API
+"""
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.jobs import PRIORITIES, JobQueue, QueueFull
+
+TMP = tempfile.mkdtemp()
+
+
+async def _run_priority_and_backpressure():
+    queue = JobQueue("test", os.path.join(TMP, "priority.sqlite3"), workers=1, max_queued=3)
+    order = []
+
+    async def handler(params):
+        order.append(params["n"])
+        await asyncio.sleep(0.02)
+        return {"n": params["n"]}
+
+    queue.register("echo", handler)
+    await queue.start()
+    first = await queue.submit("echo", {"n": 0})
+    await asyncio.sleep(0.005)  # the single worker picks it up
+    await queue.submit("echo", {"n": 1}, PRIORITIES["low"])
+    await queue.submit("echo", {"n": 2})
+    last = await queue.submit("echo", {"n": 3}, PRIORITIES["high"])
+    try:
+        await queue.submit("echo", {"n": 4})
+        rejected = None
+    except QueueFull as e:
+        rejected = e
+    done = await _finished(queue, last["id"])
+    await asyncio.sleep(0.1)
+    result = await queue.get(first["id"])
+    stats = queue.stats()
+    await queue.stop()
+    return order, rejected, done, result, stats
+
+
+def test_priority_and_backpressure():
+    order, rejected, done, result, stats = asyncio.run(_run_priority_and_backpressure())
+    assert order == [0, 3, 2, 1]
+    assert rejected is not None and rejected.retry_after >= 1
+    assert done["result"] == {"n": 3} and result["status"] == "succeeded" and result["result"] == {"n": 0}
+    assert stats["rejected"] == 1 and stats["succeeded"] == 4 and stats["queued"] == 0
+    print("✓ Jobs run by priority, and a full queue rejects with a Retry-After estimate")
+
+
+async def _run_failure_and_cancel():
+    queue = JobQueue("test", os.path.join(TMP, "cancel.sqlite3"), workers=1, job_timeout=0.2)
+
+    async def handler(params):
+        if params.get("fail"):
+            raise ValueError("no flights")
+        await asyncio.sleep(params.get("sleep", 0))
+        return "ok"
+
+    queue.register("work", handler)
+    await queue.start()
+    failing = await queue.submit("work", {"fail": True})
+    slow = await queue.submit("work", {"sleep": 5})
+    queued = await queue.submit("work", {})
+    cancelled = await queue.cancel(queued["id"])  # the single worker is still busy
+    failed = await _finished(queue, failing["id"])
+    timed_out = await _finished(queue, slow["id"])
+    long = await queue.submit("work", {"sleep": 0.15})
+    while (await queue.get(long["id"]))["status"] != "running":
+        await asyncio.sleep(0.01)
+    cancelled_running = await queue.cancel(long["id"])
+    await asyncio.sleep(0.05)
+    after = await queue.get(long["id"])
+    await queue.stop()
+    return failed, timed_out, cancelled, cancelled_running, after
+
+
+async def _finished(queue, job_id):
+    job = await queue.get(job_id)
+    while job["status"] not in ("succeeded", "failed", "cancelled"):
+        job = await queue.wait(job_id, 1.0)
+    return job
+
+
+def test_failure_timeout_and_cancel():
+    failed, timed_out, cancelled, cancelled_running, after = asyncio.run(_run_failure_and_cancel())
+    assert failed["status"] == "failed" and failed["error"] == "no flights"
+    assert timed_out["status"] == "failed" and "deadline" in timed_out["error"]
+    assert cancelled["status"] == "cancelled"
+    assert cancelled_running["status"] == "cancelled" and after["status"] == "cancelled"
+    print("✓ Failures, job timeouts and cancellation are recorded")
+
+
+async def _run_restart(path):
+    calls = []
+
+    async def handler(params):
+        calls.append(params["n"])
+        await asyncio.sleep(params.get("sleep", 0))
+        return params["n"]
+
+    first = JobQueue("test", path, workers=1)
+    first.register("work", handler)
+    await first.start()
+    running = await first.submit("work", {"n": 1, "sleep": 10})
+    queued = await first.submit("work", {"n": 2})
+    await asyncio.sleep(0.05)
+    await first.stop()  # as if the process went away mid-job
+
+    second = JobQueue("test", path, workers=1)
+    second.register("work", handler)
+    await second.start()
+    resumed = await second.get(running["id"])
+    await second.cancel(running["id"])
+    finished = await _finished(second, queued["id"])
+    await second.stop()
+    return calls, resumed, finished
+
+
+def test_restart_resumes_jobs():
+    calls, resumed, finished = asyncio.run(_run_restart(os.path.join(TMP, "restart.sqlite3")))
+    assert resumed["status"] in ("queued", "running")
+    assert finished["result"] == 2 and calls.count(1) == 2
+    print("✓ Queued and interrupted jobs are picked up again after a restart")
+
+
+async def _run_two_processes(path):
+    ran_to_end = []
+
+    async def handler(params):
+        await asyncio.sleep(params["sleep"])
+        ran_to_end.append(params["n"])
+        return params.get("result", "ok")
+
+    # Two queues on one store stand in for two worker processes
+    owner, other = JobQueue("test", path, workers=1), JobQueue("test", path, workers=1)
+    for queue in (owner, other):
+        queue.register("work", handler)
+        await queue.start()
+    running = await owner.submit("work", {"n": 1, "sleep": 1.0})
+    while (await other.get(running["id"]))["status"] != "running":
+        await asyncio.sleep(0.01)
+    cancelled = await other.cancel(running["id"])
+    await asyncio.sleep(1.2)
+    after_cancel = await owner.get(running["id"])
+
+    reported = await owner.submit("work", {"n": 2, "sleep": 0.1, "result": {"error": "no itinerary"}})
+    started = asyncio.get_running_loop().time()
+    waited = await other.wait(reported["id"], 5)  # queued -> running
+    while waited["status"] not in ("succeeded", "failed", "cancelled"):
+        waited = await other.wait(reported["id"], 5)
+    elapsed = asyncio.get_running_loop().time() - started
+    for queue in (owner, other):
+        await queue.stop()
+    return ran_to_end, cancelled, after_cancel, waited, elapsed
+
+
+def test_cancel_and_wait_across_processes():
+    ran_to_end, cancelled, after_cancel, waited, elapsed = asyncio.run(
+        _run_two_processes(os.path.join(TMP, "shared.sqlite3")))
+    assert cancelled["status"] == "cancelled" and after_cancel["status"] == "cancelled"
+    assert 1 not in ran_to_end  # the owner stopped the job instead of finishing it
+    assert waited["status"] == "failed" and waited["error"] == "no itinerary"
+    assert elapsed < 2, elapsed  # seen by polling, not at the end of the wait
+    print(f"✓ Cancellation and progress made in one process are seen by the other ({elapsed:.2f}s)")
+
+
+def test_itinerary_job_api():
+    os.environ["ITINERARY_JOB_STORE_PATH"] = os.path.join(TMP, "api.sqlite3")
+    os.environ["STARTUP_WARMUP_TIMEOUT"] = "0"
+    import main
+    from fastapi.testclient import TestClient
+
+    async def fake_itinerary(params):
+        await asyncio.sleep(0.05)
+        return {"itinerary": f"# {params['destination']} Itinerary", "location": params["destination"]}
+
+    with TestClient(main.app) as client:
+        main.itinerary_jobs.register("itinerary", fake_itinerary)
+        assert client.post("/api/itinerary-jobs", json={}).status_code == 400
+        submitted = client.post("/api/itinerary-jobs", json={"query": "3 days in Goa", "destination": "Goa"})
+        assert submitted.status_code == 202
+        job_id = submitted.json()["job_id"]
+        polled = client.get(f"/api/itinerary-jobs/{job_id}", params={"wait": 5}).json()["job"]
+        while polled["status"] != "succeeded":
+            polled = client.get(f"/api/itinerary-jobs/{job_id}", params={"wait": 5}).json()["job"]
+        assert polled["result"]["itinerary"] == "# Goa Itinerary"
+        with client.stream("GET", f"/api/itinerary-jobs/{job_id}/events") as response:
+            events = [line for line in response.iter_lines() if line.startswith("data: ")]
+        assert len(events) == 1 and '"succeeded"' in events[0]
+        assert client.get("/api/itinerary-jobs/missing").status_code == 404
+        projected = client.get(f"/api/itinerary-jobs/{job_id}", params={"fields": "job.status"}).json()
+        assert projected == {"job": {"status": "succeeded"}}
+
+        main.itinerary_jobs.max_queued = 0
+        full = client.post("/api/itinerary-jobs", json={"query": "Plan a trip"})
+        main.itinerary_jobs.max_queued = 100
+        assert full.status_code == 503 and int(full.headers["Retry-After"]) >= 1
+        stats = client.get("/stats/jobs").json()["queues"][0]
+        assert stats["succeeded"] >= 1 and stats["rejected"] == 1
+    print("✓ Itinerary jobs are accepted with 202, polled, streamed and pushed back when full")
+
+
+if __name__ == "__main__":
+    test_priority_and_backpressure()
+    test_failure_timeout_and_cancel()
+    test_restart_resumes_jobs()
+    test_cancel_and_wait_across_processes()
+    test_itinerary_job_api()
+    print("\n✅ All job queue tests passed!")
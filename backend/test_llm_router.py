@@ -0,0 +1,130 @@
+"""
+Test script for latency-aware LLM routing with hedged requests
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.rag_agent import router
+from agents.rag_agent.providers import register_provider, select_providers
+from agents.rag_agent.router import LLMRouter, build_llm
+
+
+class FakeLLM:
+    """Streams a fixed answer after a first-token delay, or fails before the first token"""
+
+    def __init__(self, name: str, delay: float, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.closed = 0
+
+    async def astream(self, prompt):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError(f"{self.name} unavailable")
+            for piece in (self.name, " says ", "hi"):
+                yield piece
+        finally:
+            self.closed += 1
+
+
+def test_hedges_slow_primary_and_cancels_loser():
+    router.HEDGE_MIN_SECONDS, router.HEDGE_MAX_SECONDS = 0.05, 0.05
+    slow, fast = FakeLLM("slow", delay=0.5), FakeLLM("fast", delay=0.01)
+    llm = LLMRouter({"slow": slow, "fast": fast})
+
+    async def run():
+        started = time.perf_counter()
+        answer = await llm.ainvoke("Plan 3 days in Goa")
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.01)  # let the cancelled loser finish unwinding
+        return answer, elapsed
+
+    answer, elapsed = asyncio.run(run())
+    assert answer == "fast says hi" and elapsed < 0.2, elapsed
+    assert slow.calls == fast.calls == 1 and slow.closed == 1
+    stats = {entry["name"]: entry for entry in llm.stats()}
+    assert stats["slow"]["cancelled"] == 1 and stats["slow"]["errors"] == 0
+    assert stats["fast"]["hedges"] == 1 and stats["fast"]["wins"] == 1
+    # The loser's wait counts against it, so the next request goes to the fast provider first
+    assert [backend.name for backend in llm.ranked()] == ["fast", "slow"]
+    asyncio.run(llm.ainvoke("again"))
+    assert fast.calls == 2 and slow.calls == 1
+    print(f"✓ A slow primary is hedged after its threshold; the answer came in {elapsed:.2f}s "
+          f"and the loser was cancelled")
+
+
+def test_fails_over_without_waiting():
+    router.HEDGE_MIN_SECONDS, router.HEDGE_MAX_SECONDS = 1.0, 10.0
+    broken, backup = FakeLLM("broken", delay=0, fail=True), FakeLLM("backup", delay=0.01)
+    llm = LLMRouter({"broken": broken, "backup": backup})
+
+    async def run():
+        return [await llm.ainvoke("Plan 3 days in Goa") for _ in range(5)]
+
+    started = time.perf_counter()
+    answers = asyncio.run(run())
+    assert answers == ["backup says hi"] * 5 and time.perf_counter() - started < 1.0
+    # With only errors on record it is ranked behind the provider that answers
+    assert broken.calls == 1 and backup.calls == 5
+    stats = {entry["name"]: entry for entry in llm.stats()}
+    assert stats["broken"]["errors"] == 1 and stats["broken"]["error_rate"] == 1.0
+
+    everything_broken = LLMRouter({"a": FakeLLM("a", 0, fail=True), "b": FakeLLM("b", 0, fail=True)})
+    try:
+        asyncio.run(everything_broken.ainvoke("hi"))
+        assert False, "expected the last provider's error"
+    except RuntimeError as e:
+        assert str(e) == "b unavailable"
+    print("✓ A provider failing before its first token is replaced by the next one without waiting")
+
+
+def test_hedge_threshold_follows_p95():
+    router.HEDGE_MIN_SECONDS, router.HEDGE_MAX_SECONDS = 1.0, 10.0
+    backend = router.Backend("gemini", FakeLLM("gemini", 0))
+    assert backend.hedge_after() == 10.0  # not enough samples yet
+    backend.first_token.extend([1.5] * 19 + [4.0])
+    assert backend.hedge_after() == 4.0 and backend.percentile(0.5) == 1.5
+    backend.first_token.extend([0.1] * 100)
+    assert backend.hedge_after() == 1.0  # clamped to the minimum
+    print("✓ The hedge threshold is the provider's p95 time to first token, within the configured bounds")
+
+
+def test_build_llm():
+    @register_provider("router-test-a")
+    def _a(options):
+        return "embeddings-a", FakeLLM("a", 0)
+
+    @register_provider("router-test-b")
+    def _b(options):
+        return "embeddings-b", FakeLLM("b", 0)
+
+    provider, embeddings, llm = build_llm(["router-test-a"], {})
+    assert (provider, embeddings) == ("router-test-a", "embeddings-a") and isinstance(llm, FakeLLM)
+    provider, embeddings, llm = build_llm(["missing", "router-test-b", "router-test-a"], {})
+    assert (provider, embeddings) == ("router-test-b", "embeddings-b") and isinstance(llm, LLMRouter)
+    assert [backend.name for backend in llm.backends] == ["router-test-b", "router-test-a"]
+
+    os.environ["LLM_PROVIDERS"] = "Gemini, openai,gemini"
+    try:
+        assert select_providers() == ["gemini", "openai"]
+    finally:
+        del os.environ["LLM_PROVIDERS"]
+    assert len(select_providers()) == 1
+    print("✓ Several configured providers are built into a router; one stays a plain LLM")
+
+
+if __name__ == "__main__":
+    test_hedges_slow_primary_and_cancels_loser()
+    test_fails_over_without_waiting()
+    test_hedge_threshold_follows_p95()
+    test_build_llm()
+    print("\n✅ All LLM router tests passed!")
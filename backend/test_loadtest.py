@@ -0,0 +1,181 @@
+"""
+Test script for the local upstream stand-ins and the load-test harness
+"""
+import sys
+import os
+import asyncio
+import json
+from datetime import date, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.http_client import use_transport
+from core.token_manager import TokenManager
+from agents.flight_agent import flight_agent as flight_module
+from agents.flight_agent.flight_agent import FlightAgent
+from agents.flight_agent.offers import DEFAULT_PAGE_SIZE, offers_for
+from agents.hotel_agent.hotel_agent import HotelAgent
+from agents.hotel_agent.reference import hotel_reference_cache
+from loadtest import fake_llm, harness, mock_amadeus
+from loadtest.profile import Profile
+
+NEXT_MONTH = (date.today() + timedelta(days=30)).isoformat()
+
+
+def test_mock_amadeus():
+    client = TestClient(mock_amadeus.create_app())
+    token = client.post("/v1/security/oauth2/token",
+                        data={"grant_type": "client_credentials", "client_id": "x", "client_secret": "y"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    params = {"originLocationCode": "DEL", "destinationLocationCode": "BOM", "departureDate": NEXT_MONTH, "adults": 1}
+    assert client.get("/v2/shopping/flight-offers", params=params).status_code == 401
+    flights = client.get("/v2/shopping/flight-offers", params=params, headers=headers).json()
+    offers = offers_for(flights)
+    assert len(offers) == mock_amadeus.FLIGHT_OFFERS_PER_SEARCH
+    assert all(o.origin == "DEL" and o.destination == "BOM" and o.price > 0 for o in offers)
+    assert client.get("/v2/shopping/flight-offers", params=params, headers=headers).json() == flights
+
+    near = client.get("/v1/reference-data/locations/hotels/by-geocode",
+                      params={"latitude": 19.07, "longitude": 72.87, "radius": 5}, headers=headers).json()["data"]
+    wide = client.get("/v1/reference-data/locations/hotels/by-geocode",
+                      params={"latitude": 19.10, "longitude": 72.90, "radius": 20}, headers=headers).json()["data"]
+    assert near and {h["hotelId"] for h in near} <= {h["hotelId"] for h in wide}
+    assert all(len(h["hotelId"]) == 8 for h in wide)
+    print(f"✓ Token, flight offers and by-geocode hotels ({len(wide)} in 20 km) are Amadeus-shaped")
+
+
+def test_fault_profiles():
+    client = TestClient(mock_amadeus.create_app(Profile(rate_limit=2, seed=1)))
+    token = client.post("/v1/security/oauth2/token", data={"grant_type": "client_credentials"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    params = {"originLocationCode": "DEL", "destinationLocationCode": "BOM", "departureDate": NEXT_MONTH}
+    statuses = [client.get("/v2/shopping/flight-offers", params=params, headers=headers) for _ in range(4)]
+    assert [r.status_code for r in statuses][:2] == [200, 200]
+    assert statuses[-1].status_code == 429 and float(statuses[-1].headers["Retry-After"]) > 0
+
+    failing = TestClient(mock_amadeus.create_app(Profile(error_rate=1.0)))
+    token = failing.post("/v1/security/oauth2/token", data={"grant_type": "client_credentials"}).json()
+    response = failing.get("/v2/shopping/flight-offers", params=params,
+                           headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 500
+    print("✓ Rate-limit and error profiles produce 429 with Retry-After and 500s")
+
+
+def test_fake_llm():
+    client = TestClient(fake_llm.create_app(tokens_per_second=2000, output_tokens=60, embedding_latency_ms=0))
+    body = {"model": "fake-travel", "messages": [{"role": "user", "content": "Plan a 2-day trip to Goa"}]}
+    completion = client.post("/v1/chat/completions", json=body).json()
+    text = completion["choices"][0]["message"]["content"]
+    assert "## Day 2" in text and completion["usage"]["completion_tokens"] <= 60
+
+    with client.stream("POST", "/v1/chat/completions", json={**body, "stream": True}) as response:
+        events = [line[6:] for line in response.iter_lines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    streamed = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+    assert streamed == text
+
+    vectors = client.post("/v1/embeddings", json={"input": ["goa beaches", "goa beaches", "tokyo"]}).json()["data"]
+    assert vectors[0]["embedding"] == vectors[1]["embedding"] != vectors[2]["embedding"]
+    assert abs(sum(x * x for x in vectors[0]["embedding"]) - 1) < 1e-3
+    print("✓ Fake LLM completes, streams and embeds deterministically")
+
+
+async def _run_agents_against_mock():
+    app = mock_amadeus.create_app()
+    tokens = TokenManager("amadeus_mock", f"{flight_module.AMADEUS_BASE_URL}/v1/security/oauth2/token", "id", "secret")
+    flight_agent = FlightAgent()
+    flight_agent.api_key, flight_agent.api_secret, flight_agent.tokens = "id", "secret", tokens
+    hotel_agent = HotelAgent()
+    hotel_agent.tokens = tokens
+    check_out = (date.today() + timedelta(days=33)).isoformat()
+    async with use_transport(httpx.ASGITransport(app=app)):
+        flights = await flight_agent.search_flights("Delhi", "Mumbai", NEXT_MONTH)
+        hotels = await hotel_agent.search_hotels(19.076, 72.8777, NEXT_MONTH, check_out, radius=10, with_offers=True)
+    return flights, hotels
+
+
+def test_agents_against_mock():
+    flight_module.flight_offer_cache.clear()
+    hotel_reference_cache.clear()
+    flights, hotels = asyncio.run(_run_agents_against_mock())
+    offers = offers_for(flights)
+    assert offers and all(o.origin == "DEL" and o.destination == "BOM" for o in offers)
+    # More offers are requested than fit on one page, so paging has something to page through
+    assert len(offers) == mock_amadeus.FLIGHT_OFFERS_PER_SEARCH > DEFAULT_PAGE_SIZE
+    priced = [h for h in hotels["data"] if h.get("offers")]
+    assert hotels["data"] and priced
+    print(f"✓ Agents run end to end against the stand-in ({len(priced)}/{len(hotels['data'])} hotels priced)")
+
+
+async def _run_harness():
+    app = FastAPI()
+
+    @app.post("/api/search-flights")
+    async def search(request: dict):
+        await asyncio.sleep(0.05)
+        return {"success": request["origin"] != "Paris"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://backend") as client:
+        return await harness.run(client, ["search-flights"], [1, 4], requests=20)
+
+
+def test_harness():
+    assert harness.percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 50) == 5
+    assert harness.percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 95) == 10
+    assert harness.percentile([], 99) == 0.0
+
+    serial, parallel = asyncio.run(_run_harness())
+    assert serial["requests"] == parallel["requests"] == 20
+    assert parallel["throughput_rps"] > serial["throughput_rps"] * 2
+    assert serial["p50_ms"] >= 50 and serial["p50_ms"] <= serial["p95_ms"] <= serial["p99_ms"]
+    assert serial["errors"] == serial["outcomes"].get("app_error", 0)
+    assert "search-flights" in harness.format_report([serial, parallel])
+
+    slower = [{**serial, "p95_ms": serial["p95_ms"] * 2}, parallel]
+    assert harness.compare(slower, [serial, parallel]) and not harness.compare([serial, parallel], slower)
+    print(f"✓ Harness reports {serial['throughput_rps']} -> {parallel['throughput_rps']} rps and flags regressions")
+
+
+class RecordingOrchestrator:
+    def __init__(self):
+        self.messages = []
+
+    async def process_message(self, message, user_id=None):
+        self.messages.append((message, user_id))
+        return {"response": f"Handled: {message}", "intent_analysis": {"intents": ["flight_search"]}}
+
+
+async def _run_orchestrator_scenario(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+        return await harness.run(client, ["orchestrator"], [4], requests=12)
+
+
+def test_orchestrator_scenario():
+    os.environ["STARTUP_WARMUP_TIMEOUT"] = "0"
+    import main
+
+    with TestClient(main.app) as client:
+        main.orchestrator = RecordingOrchestrator()
+        response = client.post("/chat/agents", json={"message": "Find flights from Delhi to Goa"})
+        assert response.json() == {"response": "Handled: Find flights from Delhi to Goa", "intents": ["flight_search"]}
+        result, = asyncio.run(_run_orchestrator_scenario(main.app))
+        recorded = main.orchestrator.messages
+    assert result["requests"] == 12 and result["errors"] == 0
+    assert len(recorded) == 13 and all(user_id and user_id.startswith("load-") for _, user_id in recorded[1:])
+    print("✓ The orchestrator scenario drives messages through /chat/agents to the orchestrator")
+
+
+if __name__ == "__main__":
+    test_mock_amadeus()
+    test_fault_profiles()
+    test_fake_llm()
+    test_agents_against_mock()
+    test_harness()
+    test_orchestrator_scenario()
+    print("\n✅ All load-test tooling tests passed!")
@@ -0,0 +1,117 @@
+"""
+Test script for the streaming markdown normalizer
+"""
+import sys
+import os
+import random
+import re
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.markdown import MarkdownNormalizer, normalize_markdown
+from loadtest.microbench import llm_output
+
+
+def legacy_preprocess_markdown(text: str) -> str:
+    """The regex passes main.preprocess_markdown used to run; the reference output"""
+    text = re.sub(r'^-{3,}$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\*{3,}$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^(#{1,6})([^\s#])', r'\1 \2', text, flags=re.MULTILINE)
+    text = re.sub(r'\n(#{1,6}\s+[^\n]+)\n', r'\n\n\1\n', text)
+    text = re.sub(r'^\*\s+', '• ', text, flags=re.MULTILINE)
+    text = re.sub(r'^-\s+', '• ', text, flags=re.MULTILINE)
+    text = re.sub(r'([^\n])\n(• )', r'\1\n\n\2', text)
+    text = re.sub(r'(• [^\n]+)\n(#{2})', r'\1\n\n\2', text)
+    text = re.sub(r'\*\*\*([^*]+)\*\*\*', r'**\1**', text)
+    text = re.sub(r'(\*\*[^*]+\*\*:)\s*\n', r'\1\n', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = '\n'.join(line.rstrip() for line in text.split('\n'))
+    return text.strip()
+
+
+CASES = [
+    "",
+    "#Tokyo Itinerary\n---\n##Day 1\n* Visit Senso-ji\n- Lunch at a ramen bar\n***Tip:*** carry cash\n\n\n\n**Budget:**   \n\n  ₹5000",
+    "Intro text\n## Day 1\n• Morning walk\n• Lunch\n## Day 2\nMore   \n",
+    "#\n\n  \nfoo\n#\n \n",  # heading without text matching through blank lines
+    "*\n\n* x\n-\n- y\n*",  # bullet whitespace running over newlines
+    "x\n• \n• a\n• b",  # a bare bullet uses up its last character
+    "***a\nb***c***d***",  # *** spanning lines
+    "**a**: x**:\n\n\n  next\n**b**:",  # bold labels
+    "#######Too deep\n###### Six\n#x",
+    "\n\n\n  lead\n\n \n\ntrail \t\n\n",
+    " * nbsp\n* bullet\n# 　wide",
+]
+
+
+def test_matches_legacy_output():
+    for text in CASES + [llm_output(600), llm_output(5000, seed=3)]:
+        assert normalize_markdown(text) == legacy_preprocess_markdown(text), repr(text)
+
+    # Random documents built from the tokens the passes react to
+    rng = random.Random(48)
+    tokens = ["\n", "\n", "\n", " ", " ", "\t", "#", "##", "###", "#######", "*", "**", "***", "-", "---",
+              "• ", "a", "Day 1", ":", " ", "\r"]
+    for _ in range(20000):
+        text = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 30)))
+        assert normalize_markdown(text) == legacy_preprocess_markdown(text), repr(text)
+    print("✓ Output is identical to the original regex passes")
+
+
+def _feed_in_pieces(text: str, rng: random.Random):
+    normalizer = MarkdownNormalizer()
+    pieces, position = [], 0
+    while position < len(text):
+        size = rng.randint(1, 8)
+        pieces.append(normalizer.feed(text[position:position + size]))
+        position += size
+    return pieces, normalizer.close()
+
+
+def test_streaming_matches_one_shot():
+    rng = random.Random(7)
+    for text in CASES + [llm_output(600)]:
+        pieces, tail = _feed_in_pieces(text, rng)
+        assert "".join(pieces) + tail == legacy_preprocess_markdown(text), repr(text)
+
+    # Lines are released while text is still arriving, not only at close()
+    text = llm_output(600)
+    pieces, tail = _feed_in_pieces(text, rng)
+    streamed = "".join(pieces)
+    assert len(streamed) > 0.9 * len(legacy_preprocess_markdown(text)) and len(tail) < 200
+    print(f"✓ Fed in token-sized pieces, {len(streamed)} of {len(streamed) + len(tail)} characters "
+          f"were released before the end")
+
+
+def test_stream_endpoint():
+    os.environ["STARTUP_WARMUP_TIMEOUT"] = "0"
+    import main
+    from fastapi.testclient import TestClient
+
+    text = llm_output(300)
+
+    class StreamingAgent:
+        initialization_error = None
+
+        async def stream_itinerary(self, query):
+            for position in range(0, len(text), 5):
+                yield text[position:position + 5]
+
+    real_agent = main.RAGAgent
+    main.RAGAgent = StreamingAgent
+    try:
+        with TestClient(main.app) as client:
+            response = client.get("/rag/stream", params={"query": "3 days in Goa"})
+    finally:
+        main.RAGAgent = real_agent
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/markdown")
+    assert response.text == legacy_preprocess_markdown(text)
+    print("✓ /rag/stream sends the normalized itinerary as it is generated")
+
+
+if __name__ == "__main__":
+    test_matches_legacy_output()
+    test_streaming_matches_one_shot()
+    test_stream_endpoint()
+    print("\n✅ All markdown normalizer tests passed!")
@@ -0,0 +1,67 @@
+"""
+Test script for the CPU hot-path microbenchmarks
+"""
+import sys
+import os
+import random
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.flight_agent.offers import offers_for
+from agents.hotel_agent.ranking import top_hotels
+from loadtest import microbench
+
+
+def test_generators():
+    payload = microbench.flight_payload(500)
+    assert len(offers_for(payload)) == 500
+
+    hotels = microbench.hotel_list(1000)
+    assert len(hotels) == 1000 and len({h["hotelId"] for h in hotels}) == 1000
+    assert any(h.get("offers") for h in hotels) and not all(h.get("offers") for h in hotels)
+    assert len(top_hotels(hotels, 5)) == 5
+
+    text = microbench.llm_output(5000)
+    assert 5000 <= len(text.split()) < 5500
+    assert "##Day 1" in text and "\n* " in text and "\n- " in text and "\n---" in text
+
+    message = microbench.chat_message(random.Random(1), 2000)
+    assert len(message.split()) >= 2000 and message == microbench.chat_message(random.Random(1), 2000)
+    print("✓ Generators build 500-offer, 1,000-hotel and 5,000-word inputs deterministically")
+
+
+def test_measure_and_skip():
+    result = microbench.measure(lambda: [0] * 10000, min_time=0.02, repeats=2)
+    assert result["ops_per_sec"] > 0 and result["alloc_kb"] >= 70
+
+    def unavailable():
+        raise ImportError("No module named 'langchain'")
+
+    results = microbench.run([microbench.Benchmark("missing", "tiny", unavailable),
+                              microbench.Benchmark("list", "10k", lambda: lambda: [0] * 10000)], min_time=0.02)
+    assert "skipped" in results[0] and results[1]["ops_per_sec"] > 0
+    report = microbench.format_report(results)
+    assert "skipped" in report and "list" in report
+    print(f"✓ measure reports {result['ops_per_sec']:,.0f} ops/sec, {result['alloc_kb']} KB; missing targets skip")
+
+
+def test_compare():
+    baseline = [{"name": "format_hotel_info", "size": "1,000 hotels", "ops_per_sec": 1000.0, "alloc_kb": 100.0},
+                {"name": "detect_intent", "size": "20 words", "skipped": "ImportError"}]
+    same = [dict(baseline[0], ops_per_sec=900.0)]
+    slower = [dict(baseline[0], ops_per_sec=700.0)]
+    hungrier = [dict(baseline[0], alloc_kb=150.0)]
+    assert microbench.compare(same, baseline) == []
+    assert "ops/sec" in microbench.compare(slower, baseline)[0]
+    assert "KB allocated" in microbench.compare(hungrier, baseline)[0]
+    assert microbench.compare([{"name": "detect_intent", "size": "20 words", "ops_per_sec": 1.0,
+                                "alloc_kb": 1.0}], baseline) == []
+    print("✓ compare flags ops/sec drops and allocation growth beyond the tolerance")
+
+
+if __name__ == "__main__":
+    test_generators()
+    test_measure_and_skip()
+    test_compare()
+    print("\n✅ All microbenchmark tests passed!")
@@ -0,0 +1,68 @@
+"""
+Test script for the memory-mapped RAG index
+"""
+import sys
+import os
+import tempfile
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from agents.rag_agent.mmap_index import MmapIndex, fingerprint, open_or_build, write_index
+
+
+def _corpus(n=300, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    texts = [f"Chunk {i}: Goa beaches, Tokyo temples and ₹{i * 100} budgets" for i in range(n)]
+    metadatas = [{"source": "guide.pdf", "page": i // 10} for i in range(n)]
+    return vectors, texts, metadatas
+
+
+def test_search_matches_brute_force():
+    vectors, texts, metadatas = _corpus()
+    with tempfile.TemporaryDirectory() as tmp:
+        write_index(os.path.join(tmp, "index"), vectors, texts, metadatas)
+        index = MmapIndex(os.path.join(tmp, "index"))
+        assert len(index) == 300 and isinstance(index.vectors, np.memmap)
+        query = np.random.default_rng(1).standard_normal(32)
+        expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:5]
+        assert [i for i, _ in index.search(query, 5)] == list(expected)
+        chunks = index.similarity_search_by_vector(query, k=5)
+        assert chunks[0].page_content == texts[expected[0]] and chunks[0].metadata == metadatas[expected[0]]
+        assert index.similarity_search_by_vector(vectors[42], k=1)[0].page_content.startswith("Chunk 42:")
+        assert len(index.search(query, 1000)) == 300
+        del index, chunks
+    print("✓ Memory-mapped search returns the same nearest chunks as a brute-force scan")
+
+
+def test_open_or_build():
+    vectors, texts, metadatas = _corpus(n=20)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return vectors, texts, metadatas
+
+    with tempfile.TemporaryDirectory() as tmp:
+        key = fingerprint(b"pdf bytes", "gemini", "models/text-embedding-004", 400, 20)
+        assert key == fingerprint(b"pdf bytes", "gemini", "models/text-embedding-004", 400, 20)
+        first = open_or_build(tmp, key, build, {"provider": "gemini"})
+        second = open_or_build(tmp, key, build)
+        assert len(builds) == 1 and len(second) == 20 and second.info["provider"] == "gemini"
+
+        changed = fingerprint(b"new pdf bytes", "gemini", "models/text-embedding-004", 400, 20)
+        third = open_or_build(tmp, changed, build)
+        assert len(builds) == 2 and os.listdir(tmp) == [changed]
+        # Pruned files stay readable through existing maps
+        assert first.chunk(3).page_content == texts[3] and third.chunk(3).page_content == texts[3]
+        del first, second, third
+    print("✓ Indexes are built once per source fingerprint and older ones are pruned")
+
+
+if __name__ == "__main__":
+    test_search_matches_brute_force()
+    test_open_or_build()
+    print("\n✅ All memory-mapped index tests passed!")
@@ -0,0 +1,103 @@
+"""
+Test script for upstream rate limiting, retries, bulkheads and circuit breaking
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from core.resilience import CircuitOpenError, TokenBucket, UpstreamProvider
+from loadtest.fake_upstream import fake_upstream
+
+URL = "https://upstream.example/search"
+
+
+def _fake_upstream(statuses=None, delay=0.0):
+    """An in-process upstream answering with the given statuses, then 200s"""
+    async def handler(request):
+        await asyncio.sleep(delay)
+        status = statuses.pop(0) if statuses else 200
+        return httpx.Response(status, json={"ok": status == 200})
+
+    return fake_upstream(handler)
+
+
+async def _run_rate_limited_burst():
+    provider = UpstreamProvider("test", TokenBucket(rate=20, burst=1))
+    async with _fake_upstream():
+        started = time.perf_counter()
+        await asyncio.gather(*[provider.request("GET", URL) for _ in range(5)])
+        return time.perf_counter() - started
+
+
+def test_rate_limiter_queues():
+    elapsed = asyncio.run(_run_rate_limited_burst())
+    assert elapsed >= 0.19  # 4 waits of 50 ms after the first token
+    print(f"✓ A burst of 5 at 20/s is queued, not rejected ({elapsed:.2f}s)")
+
+
+async def _run_retries():
+    provider = UpstreamProvider("test", TokenBucket(rate=1000, burst=10))
+    async with _fake_upstream(statuses=[503, 200]) as upstream:
+        response = await provider.request("GET", URL)
+    async with _fake_upstream(statuses=[503, 200]):
+        post_response = await provider.request("POST", URL)
+    return response, post_response, [request.method for request in upstream.requests], provider
+
+
+def test_retries_idempotent_only():
+    response, post_response, calls, provider = asyncio.run(_run_retries())
+    assert response.status_code == 200 and calls == ["GET", "GET"]
+    assert post_response.status_code == 503  # POST is not retried
+    assert provider.retries == 1
+    print("✓ Idempotent requests are retried with backoff, others are not")
+
+
+async def _run_circuit_breaker():
+    provider = UpstreamProvider("test", TokenBucket(rate=1000, burst=10), max_retries=0,
+                                failure_threshold=2, reset_timeout=0.1)
+    async with _fake_upstream(statuses=[500, 500]) as upstream:
+        for _ in range(2):
+            await provider.request("GET", URL)
+        try:
+            await provider.request("GET", URL)
+            rejected = False
+        except CircuitOpenError:
+            rejected = True
+        calls_while_open = len(upstream.requests)
+        await asyncio.sleep(0.12)
+        probe = await provider.request("GET", URL)  # upstream has recovered
+    return rejected, calls_while_open, probe, provider
+
+
+def test_circuit_breaker():
+    rejected, calls_while_open, probe, provider = asyncio.run(_run_circuit_breaker())
+    assert rejected and calls_while_open == 2
+    assert probe.status_code == 200 and provider.breaker.state == "closed"
+    print("✓ An open circuit fails fast and closes again after a successful probe")
+
+
+async def _run_bulkhead():
+    provider = UpstreamProvider("test", TokenBucket(rate=1000, burst=20), max_concurrency=2)
+    async with _fake_upstream(delay=0.02) as upstream:
+        await asyncio.gather(*[provider.request("GET", URL) for _ in range(8)])
+    return upstream.peak
+
+
+def test_bulkhead():
+    peak = asyncio.run(_run_bulkhead())
+    assert peak == 2
+    print("✓ Concurrent calls are capped by the provider's bulkhead")
+
+
+if __name__ == "__main__":
+    test_rate_limiter_queues()
+    test_retries_idempotent_only()
+    test_circuit_breaker()
+    test_bulkhead()
+    print("✅ All resilience tests passed!")
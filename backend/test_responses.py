@@ -0,0 +1,121 @@
+"""
+Test script for field projection, fast JSON rendering and response compression
+"""
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import json
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from core import compression
+from core.compression import CompressionMiddleware, choose_encoding
+from core.responses import FastJSONResponse, parse_fields, project
+
+HOTELS = {
+    "success": True,
+    "hotels": [{"name": f"Hotel {i}", "hotelId": f"H{i}", "geoCode": {"latitude": 19.0, "longitude": 72.8},
+                "address": {"countryCode": "IN"}, "chainCode": "XX"} for i in range(50)],
+    "meta": {"count": 50},
+}
+
+
+def _app():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/hotels")
+    def hotels(fields: str = None):
+        return project(HOTELS, fields)
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"line {i}\n" * 50 for i in range(5)), media_type="text/plain")
+
+    return app
+
+
+def test_projection():
+    """Dotted paths keep only the requested keys, list elements included"""
+    trimmed = project(HOTELS, "success,hotels.name,hotels.geoCode.latitude")
+    assert trimmed["success"] is True
+    assert "meta" not in trimmed
+    assert trimmed["hotels"][0] == {"name": "Hotel 0", "geoCode": {"latitude": 19.0}}
+    assert len(trimmed["hotels"]) == 50
+    assert project(HOTELS, None) is HOTELS
+    assert project(HOTELS, " , ") is HOTELS
+    # A parent path wins over its children, whichever comes first
+    assert parse_fields("hotels.name,hotels") == {"hotels": {}}
+    assert parse_fields(["hotels", "hotels.name"]) == {"hotels": {}}
+    assert project({"a": 1}, "missing") == {}
+    print("✓ Field projection trims nested dicts and lists")
+
+
+def test_negotiation():
+    """The best supported encoding the client accepts is chosen"""
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip;q=0, deflate") is None
+    if compression.brotli is not None:
+        assert choose_encoding("gzip, deflate, br") == "br"
+        assert choose_encoding("br;q=0.5, gzip;q=0.8") == "gzip"
+        assert choose_encoding("*") == "br"
+    print("✓ Accept-Encoding negotiation honours q-values")
+
+
+def test_compressed_responses():
+    """Large JSON is compressed, small bodies and refused encodings are not; all vary on Accept-Encoding"""
+    client = TestClient(_app())
+    plain = client.get("/hotels", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == json.loads(json.dumps(HOTELS))
+    # Uncompressed variants of compressible responses still vary on Accept-Encoding
+    assert plain.headers["vary"] == "Accept-Encoding"
+    assert client.get("/hotels", headers={"Accept-Encoding": ""}).headers["vary"] == "Accept-Encoding"
+
+    gz = client.get("/hotels", headers={"Accept-Encoding": "gzip"})
+    assert gz.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in gz.headers["vary"]
+    assert int(gz.headers["content-length"]) < len(plain.content)
+    assert gz.json() == plain.json()
+
+    if compression.brotli is not None:
+        br = client.get("/hotels", headers={"Accept-Encoding": "br"})
+        assert br.headers["content-encoding"] == "br"
+        assert br.json() == plain.json()  # httpx decodes br when brotli is installed
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers and small.headers["vary"] == "Accept-Encoding"
+    assert small.json() == {"ok": True}
+
+    projected = client.get("/hotels", params={"fields": "hotels.name"}, headers={"Accept-Encoding": "identity"})
+    assert projected.json()["hotels"][1] == {"name": "Hotel 1"}
+    assert len(projected.content) < len(plain.content) / 3
+    print("✓ Responses compressed per Accept-Encoding, projected bodies shrink")
+
+
+def test_streamed_response():
+    """Streamed bodies are compressed incrementally without a content-length"""
+    client = TestClient(_app())
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "".join(f"line {i}\n" * 50 for i in range(5))
+    print("✓ Streamed bodies compressed chunk by chunk")
+
+
+if __name__ == "__main__":
+    test_projection()
+    test_negotiation()
+    test_compressed_responses()
+    test_streamed_response()
+    print("\n✅ All response encoding tests passed!")
@@ -0,0 +1,78 @@
+"""
+Test script for single-flight coalescing of upstream searches
+"""
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.single_flight import SingleFlight
+
+
+async def _run_concurrent_identical_calls():
+    single_flight = SingleFlight("test")
+    upstream_calls = 0
+
+    async def fetch():
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(0.05)
+        return {"data": ["offer"]}
+
+    results = await asyncio.gather(*[single_flight.do(("PAR", "TYO"), fetch) for _ in range(20)])
+    return single_flight, upstream_calls, results
+
+
+def test_coalesces_identical_calls():
+    single_flight, upstream_calls, results = asyncio.run(_run_concurrent_identical_calls())
+    assert upstream_calls == 1
+    assert all(result == {"data": ["offer"]} for result in results)
+    stats = single_flight.stats()
+    assert stats["calls"] == 1 and stats["hits"] == 19 and stats["in_flight"] == 0
+    print("✓ 20 concurrent identical calls made 1 upstream call")
+
+
+async def _run_failure_and_cancellation():
+    single_flight = SingleFlight("test")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*[single_flight.do("key", failing) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    # The first caller going away must not cancel the call for the second
+    first = asyncio.ensure_future(single_flight.do("slow", slow))
+    second = asyncio.ensure_future(single_flight.do("slow", slow))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == "done"
+
+    # Once the last caller leaves, a caller arriving before the cancelled call has finished
+    # unwinding starts a fresh call instead of joining the cancelled one
+    calls_before = single_flight.calls
+    only = asyncio.ensure_future(single_flight.do("slow", slow))
+    await asyncio.sleep(0.01)
+    only.cancel()
+    await asyncio.sleep(0)  # the waiter leaves; the shared call has not finished unwinding yet
+    assert await single_flight.do("slow", slow) == "done"
+    assert single_flight.calls == calls_before + 2 and single_flight.stats()["in_flight"] == 0
+
+
+def test_failure_and_cancellation():
+    asyncio.run(_run_failure_and_cancellation())
+    print("✓ Errors are shared, one waiter's cancellation doesn't affect others, and a call "
+          "abandoned by every waiter is not joined")
+
+
+if __name__ == "__main__":
+    test_coalesces_identical_calls()
+    test_failure_and_cancellation()
+    print("✅ All single-flight tests passed!")
@@ -0,0 +1,135 @@
+"""
+Test script for lazy provider loading, RAG warm-up and the startup benchmark
+"""
+import sys
+import os
+import subprocess
+import threading
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.rag_agent import providers
+from agents.rag_agent import rag_agent as rag_module
+from loadtest import startup
+
+
+def test_rag_agent_imports_no_sdks():
+    probe = ("import sys; import agents.rag_agent.rag_agent; "
+             "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+             "('langchain', 'langchain_aws', 'langchain_openai', 'langchain_google_genai', 'langchain_community', "
+             "'faiss', 'boto3', 'openai')))")
+    loaded = subprocess.run([sys.executable, "-c", probe], cwd=startup.BACKEND_DIR, capture_output=True,
+                            text=True, check=True).stdout.strip().splitlines()[-1]
+    assert loaded == "[]", loaded
+    print("✓ Importing the RAG agent loads no LLM, embedding or FAISS packages")
+
+
+def test_provider_registry():
+    os.environ.pop("LLM_PROVIDER", None)
+    os.environ.pop("LLM_BASE_URL", None)
+    assert providers.select_provider(True) == "gemini" and providers.select_provider(False) == "bedrock"
+    os.environ["LLM_BASE_URL"] = "http://127.0.0.1:8082/v1"
+    assert providers.select_provider(True) == "openai"
+    os.environ["LLM_PROVIDER"] = "Test"
+    assert providers.select_provider(True) == "test"
+    os.environ.pop("LLM_PROVIDER")
+    os.environ.pop("LLM_BASE_URL")
+
+    @providers.register_provider("test")
+    def _test(options):
+        return "embeddings", f"llm:{options['aws_profile']}"
+
+    assert {"openai", "gemini", "bedrock", "test"} <= set(providers.available_providers())
+    assert providers.build_provider("test", {"aws_profile": "dev"}) == ("embeddings", "llm:dev")
+    try:
+        providers.build_provider("nope")
+        assert False, "unknown provider should raise"
+    except ValueError as e:
+        assert "Available" in str(e)
+    print("✓ Providers are selected from the environment and built by name")
+
+
+def test_failed_rag_build_is_cached():
+    @providers.register_provider("broken-startup")
+    def _broken(options):
+        raise RuntimeError("no credentials")
+
+    builds = []
+    rebuilt = threading.Event()
+    init_components = rag_module.RAGAgent._init_components
+
+    def counting_init(self):
+        builds.append(threading.current_thread().name)
+        try:
+            init_components(self)
+        finally:
+            if len(builds) > 1:
+                rebuilt.set()
+
+    os.environ["LLM_PROVIDER"] = "broken-startup"
+    rag_module.RAGAgent._init_components = counting_init
+    rag_module.RAG_RETRY_SECONDS = 3600
+    try:
+        agents = [rag_module.RAGAgent() for _ in range(3)]
+        assert len(builds) == 1 and all(agent.degraded for agent in agents)
+        assert agents[0].initialization_error
+        # Once the backoff has passed the next agent triggers one rebuild, off the calling thread
+        for shared in rag_module._shared_components.values():
+            shared["retry_at"] = 0
+        rag_module.RAGAgent()
+        rag_module.RAGAgent()
+        assert rebuilt.wait(5) and len(builds) == 2
+        assert builds[1] != threading.current_thread().name
+    finally:
+        rag_module.RAGAgent._init_components = init_components
+        rag_module._shared_components.clear()
+        os.environ.pop("LLM_PROVIDER")
+    print("✓ A failed RAG build is shared and retried in the background after a backoff")
+
+
+def test_unavailable_matches_ready():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    main.chat_agent = main.orchestrator = None
+    main.readiness.clear()
+    main.readiness.update({"rag_index": {"status": "pending"}})
+    assert "still warming up" in client.post("/chat", json={"message": "hi"}).json()["detail"]
+    assert client.get("/ready").status_code == 503
+
+    main.readiness["rag_index"] = {"status": "failed", "detail": "No module named 'langchain'"}
+    response = client.post("/chat/agents", json={"message": "hi"})
+    assert response.status_code == 503 and "rag_index failed: No module named 'langchain'" in response.json()["detail"]
+    assert client.get("/rag", params={"query": "Goa"}).status_code == 503
+    ready = client.get("/ready")
+    assert ready.status_code == 200 and ready.json()["degraded"] == ["rag_index"]
+    main.readiness.clear()
+    print("✓ 503s name the failed warm-up component that /ready lists as degraded")
+
+
+def test_startup_benchmark():
+    result = startup.measure_module("core.pagination", runs=1)
+    assert result["import_ms"] > 0 and result["modules_loaded"] > 0
+    assert "error" in startup.measure_module("no_such_module", runs=1)
+
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   _json\n"
+              "import time:       900 |       1020 | json\n"
+              "import time:      5000 |       5000 | numpy\n")
+    assert startup.parse_importtime(stderr) == [("json", 1020), ("numpy", 5000)]
+
+    baseline = [{"module": "main", "import_ms": 500.0, "rss_mb": 40.0}]
+    assert startup.compare([{"module": "main", "import_ms": 550.0, "rss_mb": 41.0}], baseline) == []
+    assert len(startup.compare([{"module": "main", "import_ms": 900.0, "rss_mb": 80.0}], baseline)) == 2
+    print(f"✓ Startup benchmark measures imports ({result['import_ms']} ms) and flags regressions")
+
+
+if __name__ == "__main__":
+    test_rag_agent_imports_no_sdks()
+    test_provider_registry()
+    test_failed_rag_build_is_cached()
+    test_unavailable_matches_ready()
+    test_startup_benchmark()
+    print("\n✅ All startup tests passed!")
@@ -0,0 +1,86 @@
+"""
+Test script for the shared OAuth token manager
+"""
+import sys
+import os
+import asyncio
+import json
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from core.token_manager import TokenManager
+from loadtest.fake_upstream import fake_upstream
+
+
+def _fake_token_endpoint(expires_in):
+    """An in-process token endpoint; returns it and the list of tokens it issues"""
+    issued = []
+
+    async def handler(request):
+        await asyncio.sleep(0.02)
+        issued.append(f"token-{len(issued) + 1}")
+        return httpx.Response(200, content=json.dumps({"access_token": issued[-1], "expires_in": expires_in}))
+
+    return fake_upstream(handler), issued
+
+
+async def _run_burst():
+    endpoint, issued = _fake_token_endpoint(1799)
+    manager = TokenManager("test", "https://auth.example/token", "id", "secret")
+    async with endpoint:
+        tokens = await asyncio.gather(*[manager.get_token() for _ in range(20)])
+        again = await manager.get_token()
+    return manager, issued, tokens, again
+
+
+def test_burst_makes_one_auth_call():
+    manager, issued, tokens, again = asyncio.run(_run_burst())
+    assert issued == ["token-1"] and manager.fetches == 1
+    assert set(tokens) == {"token-1"} and again == "token-1"
+    print("✓ 20 concurrent requests and a later one share a single token fetch")
+
+
+async def _run_refresh_ahead():
+    # expires_in barely above the safety margin puts the token inside the refresh window at once
+    endpoint, issued = _fake_token_endpoint(61)
+    manager = TokenManager("test", "https://auth.example/token", "id", "secret")
+    async with endpoint:
+        first = await manager.get_token()
+        served_while_refreshing = await manager.get_token()
+        await manager._refresh_task
+        refreshed = await manager.get_token()
+        manager.invalidate(refreshed)
+        after_invalidate = await manager.get_token()
+    return first, served_while_refreshing, refreshed, after_invalidate, issued
+
+
+def test_refresh_ahead_and_invalidate():
+    first, served, refreshed, after_invalidate, issued = asyncio.run(_run_refresh_ahead())
+    assert first == served == "token-1"
+    assert refreshed == "token-2"
+    assert after_invalidate not in (first, refreshed)
+    print("✓ Tokens near expiry are served while refreshed in the background")
+
+
+async def _run_missing_credentials():
+    manager = TokenManager("test", "https://auth.example/token", None, None)
+    try:
+        await manager.get_token()
+    except Exception as e:
+        return e
+
+
+def test_missing_credentials():
+    error = asyncio.run(_run_missing_credentials())
+    assert "Missing test API credentials" in str(error)
+    print("✓ Missing credentials fail without an upstream call")
+
+
+if __name__ == "__main__":
+    test_burst_makes_one_auth_call()
+    test_refresh_ahead_and_invalidate()
+    test_missing_credentials()
+    print("✅ All token manager tests passed!")
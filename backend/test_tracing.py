@@ -0,0 +1,60 @@
+"""
+Test script for span tracing and the metrics registry
+"""
+import sys
+import os
+import json
+import asyncio
+import tempfile
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core import tracing
+from core.tracing import metrics, span, traced
+
+
+@traced("test.upstream_call", upstream="amadeus")
+async def _upstream_call():
+    tracing.set_attribute("status_code", 200)
+    await asyncio.sleep(0.01)
+
+
+async def _pipeline():
+    with span("test.request") as root:
+        await asyncio.gather(_upstream_call(), _upstream_call())
+        with span("test.stage", cache_hit=True):
+            pass
+    return root
+
+
+def test_spans_and_histograms():
+    root = asyncio.run(_pipeline())
+    trace = root._trace
+    assert [s.name for s in trace][-1] == "test.request"
+    assert all(s.trace_id == root.trace_id for s in trace)
+    assert all(s.parent_id == root.span_id for s in trace if s is not root)
+    rendered = metrics.render()
+    assert 'travel_stage_duration_seconds_count{stage="test.stage"} 1' in rendered
+    assert 'operation="test.upstream_call",status="200",upstream="amadeus"' in rendered
+    print("✓ Nested spans share a trace and feed stage/upstream histograms")
+
+
+def test_file_exporter():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracing.TRACE_EXPORT_PATH = path
+        try:
+            asyncio.run(_pipeline())
+        finally:
+            tracing.TRACE_EXPORT_PATH = None
+        with open(path) as f:
+            exported = json.loads(f.readline())
+    assert {s["name"] for s in exported} == {"test.request", "test.upstream_call", "test.stage"}
+    print("✓ Finished traces are exported as JSON lines")
+
+
+if __name__ == "__main__":
+    test_spans_and_histograms()
+    test_file_exporter()
+    print("✅ All tracing tests passed!")
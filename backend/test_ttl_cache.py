@@ -0,0 +1,110 @@
+"""
+Test script for the TTL cache with stale-while-revalidate
+"""
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.ttl_cache import TTLCache
+
+
+def _counting_fetch():
+    calls = []
+
+    async def fetch():
+        calls.append(time.time())
+        await asyncio.sleep(0.01)
+        return {"data": [f"offer-{len(calls)}"]}
+
+    return fetch, calls
+
+
+async def _run_fresh_and_stale():
+    cache = TTLCache("test", ttl=0.1, stale_ttl=1.0)
+    fetch, calls = _counting_fetch()
+    first = await cache.get_or_fetch("PAR-TYO", fetch)
+    fresh = await cache.get_or_fetch("PAR-TYO", fetch)
+    await asyncio.sleep(0.15)
+    stale = await cache.get_or_fetch("PAR-TYO", fetch)
+    await asyncio.sleep(0.05)  # let the background refresh land
+    refreshed = await cache.get_or_fetch("PAR-TYO", fetch)
+    return cache, calls, first, fresh, stale, refreshed
+
+
+def test_fresh_and_stale_while_revalidate():
+    cache, calls, first, fresh, stale, refreshed = asyncio.run(_run_fresh_and_stale())
+    assert first is fresh
+    assert stale is first  # served immediately, not refetched inline
+    assert refreshed == {"data": ["offer-2"]}
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["stale_hits"] == 1 and stats["misses"] == 1
+    print("✓ Fresh entries hit, stale entries are served and refreshed in the background")
+
+
+async def _run_lru_and_errors():
+    cache = TTLCache("test", ttl=60, max_entries=2)
+    fetch, calls = _counting_fetch()
+    for key in ("a", "b", "a", "c"):
+        await cache.get_or_fetch(key, fetch)
+
+    async def failing():
+        return {"data": [], "error": "upstream down"}
+
+    await cache.get_or_fetch("d", failing, cacheable=lambda result: "error" not in result)
+    return cache
+
+
+def test_lru_eviction_and_uncacheable():
+    cache = asyncio.run(_run_lru_and_errors())
+    assert list(cache._entries) == ["a", "c"]  # "b" was least recently used
+    assert cache.stats()["evictions"] == 1
+    print("✓ Memory is bounded by LRU eviction and errors are not cached")
+
+
+async def _run_persistent(path):
+    fetch, calls = _counting_fetch()
+    await TTLCache("offers", ttl=60, persist_path=path).get_or_fetch("PAR-TYO", fetch)
+    # A new instance stands in for a restarted process
+    restarted = TTLCache("offers", ttl=60, persist_path=path)
+    value = await restarted.get_or_fetch("PAR-TYO", fetch)
+    return calls, value
+
+
+def test_persistent_tier():
+    with tempfile.TemporaryDirectory() as tmp:
+        calls, value = asyncio.run(_run_persistent(os.path.join(tmp, "cache.sqlite3")))
+    assert len(calls) == 1 and value == {"data": ["offer-1"]}
+    print("✓ Persisted entries survive a restart")
+
+
+async def _run_prefill(path):
+    writer = TTLCache("test", ttl=60, max_entries=10, persist_path=path)
+    for n in range(5):
+        await writer.put_many({f"route-{n}": {"n": n}})
+    restarted = TTLCache("test", ttl=60, max_entries=3, persist_path=path)
+    loaded = await restarted.prefill()
+    fetch, calls = _counting_fetch()
+    value = await restarted.get_or_fetch("route-4", fetch)
+    return loaded, list(restarted._entries), value, calls
+
+
+def test_prefill():
+    with tempfile.TemporaryDirectory() as tmp:
+        loaded, keys, value, calls = asyncio.run(_run_prefill(os.path.join(tmp, "cache.sqlite3")))
+    assert loaded == 3 and keys == ["route-2", "route-3", "route-4"]
+    assert value == {"n": 4} and not calls
+    print("✓ Prefill loads the newest persisted entries into memory")
+
+
+if __name__ == "__main__":
+    test_fresh_and_stale_while_revalidate()
+    test_lru_eviction_and_uncacheable()
+    test_persistent_tier()
+    test_prefill()
+    print("✅ All TTL cache tests passed!")
@@ -196,13 +196,8 @@ export default function FlightsPage() {
     setTo(temp)
   }
 
-  // Helper function to format real flight data
+  // Helper function to format real flight data (flat offers from /api/search-flights)
   const formatFlightData = (flight: any) => {
-    const itinerary = flight.itineraries?.[0]
-    const segments = itinerary?.segments || []
-    const firstSegment = segments[0]
-    const lastSegment = segments[segments.length - 1]
-    
     // Format duration properly
     const formatDuration = (duration: string) => {
       if (!duration) return 'N/A'
@@ -218,9 +213,12 @@ export default function FlightsPage() {
       return duration.replace('PT', '').replace('H', 'h ').replace('M', 'm')
     }
     
+    const formatTime = (at: string) =>
+      at && at !== 'N/A' ? new Date(at).toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit' }) : 'N/A'
+    
     // Fix price conversion - Amadeus API returns EUR prices
-    let displayPrice = flight.price?.total ? parseFloat(flight.price.total) : 0
-    let displayCurrency = flight.price?.currency || 'EUR'
+    let displayPrice = flight.total ? parseFloat(flight.total) : 0
+    let displayCurrency = flight.currency || 'EUR'
     
     // If price seems too high (likely in cents), divide by 100
     if (displayCurrency === 'EUR' && displayPrice > 1000) {
@@ -234,24 +232,24 @@ export default function FlightsPage() {
     }
     
     return {
-      id: flight.id,
-      airline: flight.validatingAirlineCodes?.[0] || 'Unknown',
-      flightNumber: firstSegment ? `${firstSegment.carrierCode} ${firstSegment.number}` : 'N/A',
+      id: `${flight.carrier}-${flight.flight_number}-${flight.departure}`,
+      airline: flight.carrier || 'Unknown',
+      flightNumber: flight.carrier ? `${flight.carrier} ${flight.flight_number}` : 'N/A',
       departure: {
-        time: firstSegment?.departure?.at ? new Date(firstSegment.departure.at).toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit' }) : 'N/A',
-        airport: firstSegment?.departure?.iataCode || 'N/A',
+        time: formatTime(flight.departure),
+        airport: flight.origin || 'N/A',
         city: from?.city || 'N/A'
       },
       arrival: {
-        time: lastSegment?.arrival?.at ? new Date(lastSegment.arrival.at).toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit' }) : 'N/A',
-        airport: lastSegment?.arrival?.iataCode || 'N/A',
+        time: formatTime(flight.arrival),
+        airport: flight.destination || 'N/A',
         city: to?.city || 'N/A'
       },
-      duration: formatDuration(itinerary?.duration),
+      duration: formatDuration(flight.duration),
       price: displayPrice,
       currency: displayCurrency,
-      stops: segments.length === 1 ? 'Non-stop' : `${segments.length - 1} stop${segments.length > 2 ? 's' : ''}`,
-      aircraft: firstSegment?.aircraft?.code || 'N/A',
+      stops: flight.stops === 0 ? 'Non-stop' : `${flight.stops} stop${flight.stops > 1 ? 's' : ''}`,
+      aircraft: flight.aircraft || 'N/A',
       amenities: ['wifi', 'meals'], // Default amenities
       rating: 4.0 // Default rating
     }
@@ -4,6 +4,7 @@ Startup script for the NLP Travel Chatbot application.
 This script helps users start the backend server easily.
 """
 
+import argparse
 import os
 import sys
 import subprocess
@@ -36,7 +37,29 @@ def check_environment():
     print("✅ All required environment variables found!")
     return True
 
-def start_backend():
+def preload_index(backend_dir):
+    """Build the memory-mapped RAG index once, before any worker starts"""
+    print("📚 Preloading the RAG index...")
+    result = subprocess.run([
+        sys.executable, "-c",
+        "from agents.rag_agent.rag_agent import RAGAgent; "
+        "agent = RAGAgent(); "
+        "print(f'index: {len(agent.vectorstore) if agent.vectorstore is not None else None} chunks')"
+    ], cwd=backend_dir)
+    if result.returncode != 0:
+        print("⚠️ Index preload failed; workers will build it on first start")
+
+def uvicorn_command(args):
+    """The uvicorn command line for development (reload) or production (workers)"""
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", args.host, "--port", str(args.port)]
+    if args.production:
+        # Workers map the same on-disk index, so memory stays roughly flat as workers are added
+        command += ["--workers", str(args.workers), "--no-access-log", "--timeout-keep-alive", "5"]
+    else:
+        command += ["--reload"]
+    return command
+
+def start_backend(args):
     """Start the FastAPI backend server"""
     backend_dir = Path(__file__).parent / "backend"
     
@@ -44,22 +67,20 @@ def start_backend():
         print("❌ Backend directory not found!")
         return False
     
-    print("🚀 Starting backend server...")
-    print("📍 Backend will be available at: http://localhost:8000")
-    print("📖 API documentation at: http://localhost:8000/docs")
+    if args.production and args.preload:
+        preload_index(backend_dir)
+    
+    mode = f"production, {args.workers} workers" if args.production else "development, auto-reload"
+    print(f"🚀 Starting backend server ({mode})...")
+    print(f"📍 Backend will be available at: http://localhost:{args.port}")
+    print(f"📖 API documentation at: http://localhost:{args.port}/docs")
     print("🛑 Press Ctrl+C to stop the server")
     print("-" * 50)
     
     try:
         # Change to backend directory and start uvicorn
         os.chdir(backend_dir)
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", 
-            "main:app", 
-            "--reload", 
-            "--host", "0.0.0.0", 
-            "--port", "8000"
-        ])
+        subprocess.run(uvicorn_command(args))
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
     except Exception as e:
@@ -78,8 +99,22 @@ def open_frontend():
     else:
         print("❌ Frontend file not found!")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Start the NLP Travel Chatbot backend")
+    parser.add_argument("--production", action="store_true",
+                        help="run several workers without auto-reload")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1,
+                        help="worker processes in production mode (default: WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="skip building the RAG index before the workers start")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    return parser.parse_args(argv)
+
 def main():
     """Main function"""
+    args = parse_args()
     print("🛫 NLP Travel Chatbot - Startup Script")
     print("=" * 40)
     
@@ -99,7 +134,7 @@ def main():
     print("\n🎯 Starting application...")
     
     # Start backend
-    start_backend()
+    start_backend(args)
 
 if __name__ == "__main__":
     main()